@@ -12,15 +12,29 @@ except ImportError:
     except ImportError:
         pass
 
-import joblib
 import numpy as np
 import pandas as pd
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from coalescer import batcher_from_env, batcher_for
+from model_registry import registry, get_model, DEFAULT_MODEL_PATH
+from prediction_cache import cache_from_env, cached_predict_async, cached_predict_both_async
+from inference_policy import inference_policy
+from executors import executor_stats, run_inference
+from feature_schema import SCHEMA
+from batch_engine import predict_matrix
+from forest_engine import predict_anytime
+from heatmap import HeatmapStore, HeatmapNotReadyError
+from road_index import road_index_from_env
+from sweep import run_sweep
+from warmup import Readiness
+from fast_json import JSON_BACKEND, loads as json_loads, dumps as json_dumps, json_response
+from binary_codec import OCTET_STREAM, ARROW_STREAM, ARROW_CONTENT_TYPES, decode_matrix, encode_matrix, decode_arrow, encode_arrow
+
 # Set UTF-8 encoding for Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -55,46 +69,159 @@ day_type_labels = {
 jam_model = None
 day_model = None
 
+# The registry loads each artifact once, so both names share one forest
 try:
-    jam_model = joblib.load("models/rf_model.pkl")
+    jam_model = get_model(DEFAULT_MODEL_PATH)
     print("[OK] Traffic Jam model loaded successfully")
 except Exception as e:
     print(f"[ERROR] Cannot load Traffic Jam model: {e}")
     jam_model = None
 
 try:
-    day_model = joblib.load("models/rf_model.pkl")
+    day_model = get_model(DEFAULT_MODEL_PATH)
     print("[OK] Day Type model loaded successfully")
 except Exception as e:
     print(f"[ERROR] Cannot load Day Type model: {e}")
     day_model = None
 
+registry.mark_startup_complete()
+
+# Micro-batching of concurrent single-row requests (enable with COALESCE_ENABLED=1)
+jam_batcher = batcher_from_env(jam_model, "jam")
+day_batcher = batcher_from_env(day_model, "day")
+
+# Quantized-feature result cache (opt-in with PREDICTION_CACHE_SIZE), cleared whenever the model version changes
+prediction_cache = cache_from_env(lambda: registry.version(DEFAULT_MODEL_PATH))
+
+# ===== Model hot reload =====
+def _swap_models(path, backend, model):
+    """Rebind the module-level models after the registry swapped in a new artifact"""
+    global jam_model, day_model, jam_batcher, day_batcher
+    if os.path.abspath(path) != os.path.abspath(DEFAULT_MODEL_PATH):
+        return
+    jam_model = day_model = model
+    jam_batcher = batcher_for(jam_batcher, model, "jam")
+    day_batcher = batcher_for(day_batcher, model, "day")
+    # A model that failed to load at startup becomes ready once it has been warmed up
+    readiness.start(_current_models)
+
+registry.subscribe(_swap_models)
+registry.watch(DEFAULT_MODEL_PATH)
+registry.start_watcher()
+
+@app.middleware("http")
+async def model_version_headers(request: Request, call_next):
+    """Report the model version serving this request (taken when the request arrives)"""
+    headers = registry.version_headers(DEFAULT_MODEL_PATH)
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
 # ===== Feature Engineering =====
+# Same feature order / aliases as columns.json, with this API's own defaults for missing fields
+API_SCHEMA = SCHEMA.with_defaults({"density": 50, "volume": 1500, "capacity": 2000, "speed": 45})
+
+# Snap GPS points to monitored road segments (enabled when ROAD_SEGMENTS_PATH exists)
+road_index = road_index_from_env(API_SCHEMA)
+
+# ===== Warm-up / readiness =====
+# Synthetic batches run through every loaded model in the background; /ready returns 503 until done
+def _current_models():
+    return {"jam": jam_model, "day": day_model}
+
+readiness = Readiness(API_SCHEMA)
+readiness.start(_current_models)
+
 def create_jam_features(data):
     """สร้างฟีเจอร์สำหรับการทำนายการจราจรติด/ไม่ติด"""
     # Required features: latitude, longitude, density, volume, capacity, hour, speed, v/c
-    latitude = float(data.get("latitude", 13.7563))
-    longitude = float(data.get("longitude", 100.5018))
-    density = float(data.get("density", 50))
-    volume = float(data.get("volume", 1500))
-    capacity = float(data.get("capacity", 2000))
-    hour = int(data.get("hour", 12))
-    speed = float(data.get("speed", 45))
-    vc_ratio = float(data.get("vc_ratio", 0.75))
-    
-    # Create feature array matching the model's expected format
-    features = [
-        latitude, longitude, density, volume, capacity, 
-        hour, speed, vc_ratio
-    ]
-    
-    return np.array(features).reshape(1, -1)
+    return API_SCHEMA.extract_dict(data)
 
 def create_day_features(data):
     """สร้างฟีเจอร์สำหรับการทำนายประเภทวัน"""
     # Use the same features as jam model
     return create_jam_features(data)
 
+# ===== Batch API =====
+# Upper bound on rows per /predict/batch request
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", "100000"))
+
+def _payload_rows(payload):
+    """Number of rows in a records array or a columnar object"""
+    if isinstance(payload, list):
+        return len(payload)
+    if isinstance(payload, dict) and payload and all(isinstance(values, list) for values in payload.values()):
+        return max(len(values) for values in payload.values())
+    raise ValueError("body ต้องเป็น JSON array ของ records หรือ object ของ arrays")
+
+def _batch_features(payload):
+    """Feature matrix (float32) and valid-row mask for a records array or a columnar object"""
+    if isinstance(payload, dict):
+        # Columnar: {"latitude": [...], "longitude": [...], ...}
+        return API_SCHEMA.extract_frame(pd.DataFrame(payload))
+    try:
+        X = API_SCHEMA.extract_records(payload)
+        return X, np.isfinite(X).all(axis=1)
+    except (TypeError, ValueError):
+        # Some rows cannot be converted: the column path marks just those rows invalid
+        return API_SCHEMA.extract_frame(pd.DataFrame.from_records(payload))
+
+def _scatter_predictions(valid, labels, proba):
+    """Per-row arrays for all rows: label -1 and probabilities NaN (null) for invalid rows"""
+    pred = np.full(len(valid), -1, dtype=np.int64)
+    pred[valid] = labels
+    full_proba = np.full((len(valid), 2), np.nan)
+    if proba is not None:
+        full_proba[valid] = proba
+    return pred, full_proba
+
+def _encode_batch_result(X, batch, compact):
+    """Encode a /predict/batch response to JSON bytes (runs in the inference pool)"""
+    valid = batch["valid"]
+    jam_pred, jam_proba = _scatter_predictions(valid, batch["jam_pred"], batch["jam_proba"])
+    day_pred, day_proba = _scatter_predictions(valid, batch["day_pred"], batch["day_proba"])
+    invalid_rows = np.flatnonzero(~valid)
+
+    if compact:
+        # Numeric columns only: no label strings, one array per output
+        return json_dumps({
+            "n_rows": len(valid),
+            "invalid_rows": invalid_rows,
+            "traffic_prediction": jam_pred,
+            "traffic_proba": np.ascontiguousarray(jam_proba[:, 1]),
+            "day_type_prediction": day_pred,
+            "day_type_proba": np.ascontiguousarray(day_proba[:, 1]),
+            "status": "success"
+        })
+
+    results = []
+    for i, (jp, (jf, jc), dp, (dw, dh)) in enumerate(zip(jam_pred.tolist(), jam_proba.tolist(), day_pred.tolist(), day_proba.tolist())):
+        if jp < 0:
+            bad = [name for name, ok in zip(API_SCHEMA.names, np.isfinite(X[i])) if not ok]
+            results.append({"row": i, "error": f"ค่าไม่ถูกต้องในคอลัมน์: {', '.join(bad)}", "status": "error"})
+            continue
+        results.append({
+            "row": i,
+            "traffic_jam": {
+                "prediction": jp,
+                "label": traffic_labels[str(jp)],
+                "confidence": max(jf, jc),
+                "probabilities": {"free_flow": jf, "congested": jc}
+            },
+            "day_type": {
+                "prediction": dp,
+                "label": day_type_labels[str(dp)],
+                "confidence": max(dw, dh),
+                "probabilities": {"weekday": dw, "weekend": dh}
+            }
+        })
+    return json_dumps({
+        "n_rows": len(valid),
+        "invalid_rows": invalid_rows,
+        "results": results,
+        "status": "success"
+    })
+
 # ===== API Endpoints =====
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -108,34 +235,88 @@ def health():
         "status": "ok", 
         "jam_model": "loaded" if jam_model is not None else "not_loaded",
         "day_model": "loaded" if day_model is not None else "not_loaded",
-        "numpy_version": np.__version__
+        "model": registry.describe(DEFAULT_MODEL_PATH),
+        "readiness": readiness.stats(),
+        "numpy_version": np.__version__,
+        "json_backend": JSON_BACKEND,
+        "registry": registry.info(),
+        "executors": executor_stats(),
+        "inference_policy": inference_policy.stats(),
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else "disabled",
+        "heatmap": heatmap_store.stats(),
+        "road_index": road_index.stats() if road_index is not None else "disabled",
+        "coalescer": {
+            "jam": jam_batcher.stats() if jam_batcher is not None else "disabled",
+            "day": day_batcher.stats() if day_batcher is not None else "disabled"
+        }
+    }
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the models are loaded and warmed up, 503 before that"""
+    stats = readiness.stats()
+    stats["status"] = "ready" if stats["ready"] else "not_ready"
+    return json_response(stats, status_code=200 if stats["ready"] else 503)
+
+def _traffic_result(prediction, probability):
+    """Response body of a single traffic prediction"""
+    return {
+        "prediction": int(prediction),
+        "label": traffic_labels[str(prediction)],
+        "confidence": float(max(probability)),
+        "probabilities": {
+            "free_flow": float(probability[0]),
+            "congested": float(probability[1])
+        },
+        "status": "success"
+    }
+
+def _day_type_result(prediction, probability):
+    """Response body of a single day-type prediction"""
+    return {
+        "prediction": int(prediction),
+        "label": day_type_labels[str(prediction)],
+        "confidence": float(max(probability)),
+        "probabilities": {
+            "weekday": float(probability[0]),
+            "weekend": float(probability[1])
+        },
+        "status": "success"
     }
 
 @app.post("/predict-traffic")
-async def predict_traffic(data: dict):
-    """ทำนายการจราจรติด/ไม่ติด"""
+async def predict_traffic(data: dict, anytime: bool = False, max_trees: int = None, budget_ms: float = None):
+    """ทำนายการจราจรติด/ไม่ติด
+
+    ?anytime=true ประเมินทีละ tree และหยุดเมื่อผลแน่นอนแล้ว หรือครบ max_trees / budget_ms
+    (response มี evaluation บอกจำนวน tree ที่ประเมินและผลตรงกับการประเมินครบทุก tree หรือไม่)
+    """
     try:
         if jam_model is None:
             return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
         
+        # Snap to the nearest road segment so nearby points share one cache key
+        road_segment = None
+        if road_index is not None:
+            data, road_segment = road_index.snap_dict(data)
+        
         # สร้างฟีเจอร์
         features = create_jam_features(data)
         
         # ทำนาย
-        prediction = jam_model.predict(features)[0]
-        probability = jam_model.predict_proba(features)[0]
+        evaluation = None
+        if anytime:
+            # ไม่ผ่าน cache / batcher เพราะผลขึ้นกับงบของแต่ละ request
+            prediction, probability, evaluation = await run_inference(predict_anytime, jam_model, features, max_trees, budget_ms)
+        else:
+            prediction, probability = await cached_predict_async(prediction_cache, "jam", jam_model, jam_batcher, features)
         
         # แปลงผลลัพธ์
-        result = {
-            "prediction": int(prediction),
-            "label": traffic_labels[str(prediction)],
-            "confidence": float(max(probability)),
-            "probabilities": {
-                "free_flow": float(probability[0]),
-                "congested": float(probability[1])
-            },
-            "status": "success"
-        }
+        result = _traffic_result(prediction, probability)
+        if road_segment is not None:
+            result["road_segment"] = road_segment
+        if evaluation is not None:
+            result["evaluation"] = evaluation
         
         return result
         
@@ -158,22 +339,10 @@ async def predict_day_type(data: dict):
         features = create_day_features(data)
         
         # ทำนาย
-        prediction = day_model.predict(features)[0]
-        probability = day_model.predict_proba(features)[0]
+        prediction, probability = await cached_predict_async(prediction_cache, "day", day_model, day_batcher, features)
         
         # แปลงผลลัพธ์
-        result = {
-            "prediction": int(prediction),
-            "label": day_type_labels[str(prediction)],
-            "confidence": float(max(probability)),
-            "probabilities": {
-                "weekday": float(probability[0]),
-                "weekend": float(probability[1])
-            },
-            "status": "success"
-        }
-        
-        return result
+        return _day_type_result(prediction, probability)
         
     except Exception as e:
         return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
@@ -182,8 +351,22 @@ async def predict_day_type(data: dict):
 async def predict_both(data: dict):
     """ทำนายทั้งการจราจรติดและประเภทวัน"""
     try:
-        jam_result = await predict_traffic(data)
-        day_result = await predict_day_type(data)
+        if jam_model is None or day_model is None:
+            return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
+        
+        road_segment = None
+        if road_index is not None:
+            data, road_segment = road_index.snap_dict(data)
+        
+        # One feature vector, both models in a single combined pass (one run if they are the same model)
+        features = create_jam_features(data)
+        (jam_pred, jam_proba), (day_pred, day_proba) = await cached_predict_both_async(
+            prediction_cache, jam_model, day_model, jam_batcher, day_batcher, features
+        )
+        jam_result = _traffic_result(jam_pred, jam_proba)
+        if road_segment is not None:
+            jam_result["road_segment"] = road_segment
+        day_result = _day_type_result(day_pred, day_proba)
         
         return {
             "traffic_jam": jam_result,
@@ -194,6 +377,154 @@ async def predict_both(data: dict):
     except Exception as e:
         return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request, compact: bool = False):
+    """ทำนายหลายแถวในครั้งเดียว: JSON array ของ records หรือ object ของ column arrays"""
+    try:
+        if jam_model is None or day_model is None:
+            return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
+
+        # Parse and encode outside the event loop; the body skips pydantic validation entirely
+        payload = await run_inference(json_loads, await request.body())
+        n_rows = _payload_rows(payload)
+        if n_rows > BATCH_MAX_ROWS:
+            return {"error": f"จำนวนแถวเกินกำหนด ({BATCH_MAX_ROWS:,} แถวต่อ request)", "status": "error"}
+
+        X, valid = await run_inference(_batch_features, payload)
+        batch = await run_inference(predict_matrix, X, valid, jam_model, day_model)
+        content = await run_inference(_encode_batch_result, X, batch, compact)
+        return Response(content=content, media_type="application/json")
+
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
+
+# Output columns of /predict/binary, in order
+BINARY_OUTPUT_COLUMNS = ["traffic_free_flow", "traffic_congested", "day_weekday", "day_weekend"]
+
+def _decode_binary(body, content_type):
+    """Feature matrix + valid mask from a raw float32 matrix or an Arrow IPC body"""
+    if content_type in ARROW_CONTENT_TYPES:
+        return decode_arrow(body, API_SCHEMA)
+    # Zero-copy view of the request body, passed straight to the model
+    X = decode_matrix(body, API_SCHEMA.n_features)
+    return X, np.isfinite(X).all(axis=1)
+
+def _encode_binary(batch, arrow):
+    """Probabilities (rows x 4, NaN for invalid rows) in the same binary form as the request"""
+    _, jam_proba = _scatter_predictions(batch["valid"], batch["jam_pred"], batch["jam_proba"])
+    _, day_proba = _scatter_predictions(batch["valid"], batch["day_pred"], batch["day_proba"])
+    if arrow:
+        return encode_arrow(dict(zip(BINARY_OUTPUT_COLUMNS, [
+            jam_proba[:, 0].astype(np.float32), jam_proba[:, 1].astype(np.float32),
+            day_proba[:, 0].astype(np.float32), day_proba[:, 1].astype(np.float32)
+        ])))
+    return encode_matrix(np.hstack([jam_proba, day_proba]))
+
+@app.post("/predict/binary")
+async def predict_binary(request: Request):
+    """ทำนายจาก feature matrix แบบ binary (float32 octet-stream หรือ Arrow IPC)"""
+    try:
+        if jam_model is None or day_model is None:
+            return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
+
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type != OCTET_STREAM and content_type not in ARROW_CONTENT_TYPES:
+            return {"error": f"Content-Type ต้องเป็น {OCTET_STREAM} หรือ {ARROW_STREAM}", "status": "error"}
+        arrow = content_type in ARROW_CONTENT_TYPES
+
+        body = await request.body()
+        X, valid = await run_inference(_decode_binary, body, content_type)
+        if len(X) > BATCH_MAX_ROWS:
+            return {"error": f"จำนวนแถวเกินกำหนด ({BATCH_MAX_ROWS:,} แถวต่อ request)", "status": "error"}
+        batch = await run_inference(predict_matrix, X, valid, jam_model, day_model)
+        content = await run_inference(_encode_binary, batch, arrow)
+        return Response(
+            content=content,
+            media_type=ARROW_STREAM if arrow else OCTET_STREAM,
+            headers={
+                "X-Columns": ",".join(BINARY_OUTPUT_COLUMNS),
+                "X-Feature-Order": ",".join(API_SCHEMA.names)
+            }
+        )
+
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
+
+# ===== What-if sweep =====
+@app.post("/predict/sweep")
+async def predict_sweep(payload: dict):
+    """ไล่ค่าฟีเจอร์ 1–2 ตัวจาก record ตั้งต้น แล้วคืน probability surface ของทั้งสองโมเดล"""
+    try:
+        if jam_model is None or day_model is None:
+            return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
+
+        base = payload.get("base", {})
+        road_segment = None
+        if road_index is not None:
+            base, road_segment = road_index.snap_dict(base)
+        # Whole grid as one matrix, one predict_proba call per model
+        result = await run_inference(run_sweep, base, payload.get("sweep"), jam_model, day_model, API_SCHEMA)
+        result.update(road_segment=road_segment, status="success")
+        return json_response(result)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        # Invalid sweep spec, including grids over SWEEP_MAX_POINTS
+        return json_response({"error": str(e), "status": "error"}, status_code=400)
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
+
+# ===== Congestion heatmap =====
+# Grid over lat/lon x 24 hours, precomputed once per model version (other features use API defaults)
+heatmap_store = HeatmapStore(schema=API_SCHEMA)
+
+def _refresh_heatmap(path, backend, model):
+    """Precompute the grid of a swapped-in model in the background (queries keep the previous grid)"""
+    if os.path.abspath(path) == os.path.abspath(DEFAULT_MODEL_PATH):
+        heatmap_store.start(model, registry.version(path, backend))
+
+registry.subscribe(_refresh_heatmap)
+heatmap_store.start(jam_model, registry.version(DEFAULT_MODEL_PATH))
+
+@app.get("/heatmap")
+async def heatmap(request: Request, hour: int, bbox: str = None):
+    """ความน่าจะเป็นที่รถติดบน grid ในชั่วโมงที่ระบุ (bbox = min_lat,min_lon,max_lat,max_lon)
+
+    ถ้า header Accept เป็น application/octet-stream จะตอบเป็น float32 matrix (n_lat x n_lon)
+    ในรูปแบบเดียวกับ /predict/binary
+    """
+    try:
+        if jam_model is None:
+            return {"error": "โมเดลยังไม่พร้อมใช้งาน", "status": "error"}
+
+        # Serves the last completed grid; precompute runs in the background after a model swap
+        latitudes, longitudes, congestion = await run_inference(heatmap_store.query, hour, bbox)
+        if OCTET_STREAM in request.headers.get("accept", ""):
+            return Response(
+                content=encode_matrix(congestion),
+                media_type=OCTET_STREAM,
+                headers={
+                    "X-Latitudes": f"{latitudes[0]:.6f}:{heatmap_store.step}:{len(latitudes)}" if len(latitudes) else "",
+                    "X-Longitudes": f"{longitudes[0]:.6f}:{heatmap_store.step}:{len(longitudes)}" if len(longitudes) else ""
+                }
+            )
+        return Response(
+            content=json_dumps({
+                "hour": hour,
+                "step": heatmap_store.step,
+                "latitudes": np.round(latitudes, 6),
+                "longitudes": np.round(longitudes, 6),
+                "congestion": congestion.astype(np.float64).round(4),
+                "model_version": heatmap_store.stats()["model_version"],
+                "status": "success"
+            }),
+            media_type="application/json"
+        )
+
+    except HeatmapNotReadyError as e:
+        return json_response({"error": str(e), "status": "not_ready"}, status_code=503)
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}", "status": "error"}
+
 # ===== Additional endpoints =====
 @app.get("/api/info")
 def api_info():
@@ -208,10 +539,15 @@ def api_info():
                 "path": "/health",
                 "description": "ตรวจสอบสถานะของ API"
             },
+            "ready": {
+                "method": "GET",
+                "path": "/ready",
+                "description": "Readiness probe: 503 จนกว่าโมเดลจะโหลดและ warm-up เสร็จ (พร้อมผล self-benchmark)"
+            },
             "predict_traffic": {
                 "method": "POST",
                 "path": "/predict-traffic",
-                "description": "ทำนายการจราจรติด/ไม่ติด"
+                "description": "ทำนายการจราจรติด/ไม่ติด (?anytime=true&max_trees=&budget_ms= สำหรับการประเมินแบบหยุดก่อนเมื่อผลแน่นอน)"
             },
             "predict_jam": {
                 "method": "POST",
@@ -227,6 +563,28 @@ def api_info():
                 "method": "POST",
                 "path": "/predict/both",
                 "description": "ทำนายทั้งการจราจรติดและประเภทวัน"
+            },
+            "predict_batch": {
+                "method": "POST",
+                "path": "/predict/batch",
+                "description": "ทำนายหลายแถว (JSON array ของ records หรือ object ของ arrays, ?compact=true สำหรับผลลัพธ์แบบตัวเลข)"
+            },
+            "predict_binary": {
+                "method": "POST",
+                "path": "/predict/binary",
+                "description": "ทำนายจาก float32 matrix (header uint32 rows, uint32 cols) หรือ Arrow IPC; ตอบกลับเป็น rows x 4 ในรูปแบบเดียวกัน",
+                "feature_order": API_SCHEMA.names,
+                "output_columns": BINARY_OUTPUT_COLUMNS
+            },
+            "predict_sweep": {
+                "method": "POST",
+                "path": "/predict/sweep",
+                "description": "What-if: {\"base\": {...}, \"sweep\": {\"hour\": {\"start\": 0, \"stop\": 23, \"step\": 1}, \"speed\": [0, 20, 40]}} คืนความน่าจะเป็นทั้ง grid"
+            },
+            "heatmap": {
+                "method": "GET",
+                "path": "/heatmap",
+                "description": "ความน่าจะเป็นที่รถติดบน grid lat/lon (?hour=8&bbox=min_lat,min_lon,max_lat,max_lon)"
             }
         },
         "example_request": {
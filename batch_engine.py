@@ -0,0 +1,223 @@
+"""
+Batch inference engine สำหรับ Traffic Congestion Predictor
+
+สร้าง feature matrix ครั้งเดียวสำหรับทั้ง DataFrame แล้วเรียก predict_proba
+หนึ่งครั้งต่อโมเดล แทนการวนทีละแถวด้วย df.iterrows()
+
+ทั้งสองโมเดลอ่าน buffer float32 เดียวกัน (predict_pair): ถ้าเป็นโมเดลเดียวกันจะทำนายครั้งเดียว
+และ batch ที่มีอย่างน้อย DUAL_PARALLEL_ROWS แถว (ค่าเริ่มต้น 20000) ทำนายสองโมเดลพร้อมกัน
+เมื่อเครื่องมีมากกว่าหนึ่ง CPU
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import SCHEMA
+from inference_policy import inference_policy
+
+DUAL_PARALLEL_ROWS = int(os.environ.get("DUAL_PARALLEL_ROWS", "20000"))
+
+_dual_pool = None
+
+# ลำดับฟีเจอร์และค่าเริ่มต้นมาจาก columns.json (feature_schema)
+FEATURE_NAMES = SCHEMA.names
+FEATURE_DEFAULTS = SCHEMA.defaults
+
+
+def build_feature_matrix(df, schema=None):
+    """สร้าง feature matrix float32 (n_rows, 8) จาก DataFrame พร้อม mask ของแถวที่ใช้งานได้"""
+    return (schema or SCHEMA).extract_frame(df)
+
+
+def predict_model(model, X):
+    """ทำนาย label และความน่าจะเป็นของทั้ง batch ด้วยการเรียกโมเดลครั้งเดียว"""
+    if len(X) == 0:
+        return np.empty(0, dtype=np.int64), None
+    if hasattr(model, "predict_proba"):
+        proba = inference_policy.predict_proba(model, X)
+        labels = model.classes_.take(np.argmax(proba, axis=1), axis=0)
+        return labels.astype(np.int64), proba
+    return np.asarray(inference_policy.predict(model, X)).astype(np.int64), None
+
+
+def _dual_executor():
+    global _dual_pool
+    if _dual_pool is None:
+        _dual_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dual-model")
+    return _dual_pool
+
+
+def predict_pair(X, jam_model, day_model):
+    """ทำนายทั้งสองโมเดลจาก buffer เดียวกัน คืน (jam_pred, jam_proba, day_pred, day_proba)"""
+    if day_model is jam_model:
+        # registry คืน object เดียวกันสำหรับ artifact เดียวกัน: ทำนายครั้งเดียวแล้วใช้ผลร่วมกัน
+        pred, proba = predict_model(jam_model, X)
+        return pred, proba, pred, proba
+    if len(X) >= DUAL_PARALLEL_ROWS and (os.cpu_count() or 1) > 1:
+        # sklearn ปล่อย GIL ระหว่างเดิน tree: day model ทำงานใน thread อื่นพร้อมกัน
+        day_future = _dual_executor().submit(predict_model, day_model, X)
+        jam_pred, jam_proba = predict_model(jam_model, X)
+        day_pred, day_proba = day_future.result()
+    else:
+        jam_pred, jam_proba = predict_model(jam_model, X)
+        day_pred, day_proba = predict_model(day_model, X)
+    return jam_pred, jam_proba, day_pred, day_proba
+
+
+def predict_matrix(X, valid, jam_model, day_model):
+    """ทำนาย feature matrix ทั้งสองโมเดล (ผลลัพธ์มีเฉพาะแถวที่ valid ตามลำดับเดิม)"""
+    X_valid = X[valid] if not valid.all() else X
+
+    jam_pred, jam_proba, day_pred, day_proba = predict_pair(X_valid, jam_model, day_model)
+    return {
+        "valid": valid,
+        "jam_pred": jam_pred,
+        "jam_proba": jam_proba,
+        "day_pred": day_pred,
+        "day_proba": day_proba,
+    }
+
+
+def predict_frame(df, jam_model, day_model):
+    """ทำนายทั้ง DataFrame แบบ vectorized และคืนผลลัพธ์เป็น array"""
+    X, valid = build_feature_matrix(df)
+    batch = predict_matrix(X, valid, jam_model, day_model)
+
+    # เกณฑ์ v/c > 1 หรือ speed < 20 km/h (คอลัมน์ v/c หรือ vc_ratio, ค่าตามไฟล์แบบ float64)
+    vc_ratio = SCHEMA.column(df, "vc_ratio")
+    speed = SCHEMA.column(df, "speed")
+    vc_over_1 = vc_ratio > 1.0
+    speed_under_20 = speed < 20
+
+    batch.update({
+        "vc_ratio": vc_ratio,
+        "vc_over_1": vc_over_1,
+        "speed_under_20": speed_under_20,
+        "actual_congested": (vc_over_1 | speed_under_20).astype(np.int64),
+    })
+    return batch
+
+
+def _invalid_columns(row_X):
+    """หาชื่อฟีเจอร์ที่มีค่าไม่ถูกต้องในแถวหนึ่ง"""
+    return [name for name, value in zip(FEATURE_NAMES, row_X) if not np.isfinite(value)]
+
+
+def format_results(df, batch, traffic_labels, day_type_labels, start=0, stop=None):
+    """สร้าง dict ผลลัพธ์ต่อแถว (เฉพาะช่วง start:stop) ในรูปแบบเดิมของ /upload-traffic-excel"""
+    stop = len(df) if stop is None else min(stop, len(df))
+    valid = batch["valid"]
+    # ตำแหน่งของแต่ละแถวใน array ผลลัพธ์ (ซึ่งมีเฉพาะแถวที่ valid)
+    pred_pos = np.cumsum(valid) - 1
+
+    # ค่าว่าง (NaN) ใน input_data แสดงเป็น None เพื่อให้ serialize เป็น JSON ได้
+    frame = df.iloc[start:stop]
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    row_numbers = df.index[start:stop]
+    X = None
+
+    results = []
+    for offset, (index, input_data) in enumerate(zip(row_numbers, records)):
+        i = start + offset
+        if not valid[i]:
+            if X is None:
+                X, _ = build_feature_matrix(df.iloc[start:stop])
+            bad = _invalid_columns(X[offset])
+            results.append({
+                "row": index + 1,
+                "error": f"ค่าไม่ถูกต้องในคอลัมน์: {', '.join(bad)}",
+                "input_data": input_data
+            })
+            continue
+
+        p = pred_pos[i]
+        jam_pred = int(batch["jam_pred"][p])
+        day_pred = int(batch["day_pred"][p])
+
+        if batch["jam_proba"] is not None:
+            jam_proba = batch["jam_proba"][p]
+            jam_proba_dict = {
+                "ไม่ติด": f"{jam_proba[0]*100:.2f}%",
+                "ติด": f"{jam_proba[1]*100:.2f}%"
+            }
+        else:
+            jam_proba_dict = {"ไม่ติด": "N/A", "ติด": "N/A"}
+
+        if batch["day_proba"] is not None:
+            day_proba = batch["day_proba"][p]
+            day_proba_dict = {
+                "วันทำงาน": f"{day_proba[0]*100:.2f}%",
+                "วันหยุด": f"{day_proba[1]*100:.2f}%"
+            }
+        else:
+            day_proba_dict = {"วันทำงาน": "N/A", "วันหยุด": "N/A"}
+
+        results.append({
+            "row": index + 1,
+            "input_data": input_data,
+            "traffic_prediction": jam_pred,
+            "traffic_label": traffic_labels[str(jam_pred)],
+            "traffic_probabilities": jam_proba_dict,
+            "day_type_prediction": day_pred,
+            "day_type_label": day_type_labels[str(day_pred)],
+            "day_type_probabilities": day_proba_dict,
+            "actual_congested": int(batch["actual_congested"][i]),
+            "vc_ratio": float(batch["vc_ratio"][i]),
+            "criteria_met": {
+                "vc_ratio_over_1": bool(batch["vc_over_1"][i]),
+                "speed_under_20": bool(batch["speed_under_20"][i])
+            }
+        })
+
+    return results
+
+
+def _scatter(values, valid):
+    """กระจายค่าของแถวที่ valid กลับไปยังตำแหน่งเดิม (แถวที่ไม่ valid เป็น NaN)"""
+    out = np.full(len(valid), np.nan, dtype=np.float64)
+    if values is not None:
+        out[valid] = values
+    return out
+
+
+def result_frame(df, batch, traffic_labels, day_type_labels):
+    """ผลลัพธ์แบบ flat columnar (หนึ่งแถวต่อ input) สำหรับ result writers
+
+    ความน่าจะเป็นเป็นตัวเลข 0-1 แทนข้อความ "xx.xx%" และ input_data / criteria_met
+    ถูกแตกเป็นคอลัมน์ ไม่มี dict ซ้อน
+    """
+    valid = batch["valid"]
+    out = {"row": df.index.to_numpy() + 1}
+    for name in df.columns:
+        out[str(name)] = df[name].to_numpy()
+
+    jam_pred = pd.Series(_scatter(batch["jam_pred"], valid)).astype("Int64")
+    day_pred = pd.Series(_scatter(batch["day_pred"], valid)).astype("Int64")
+    jam_proba = batch["jam_proba"]
+    day_proba = batch["day_proba"]
+
+    out["traffic_prediction"] = jam_pred.array
+    out["traffic_label"] = jam_pred.map({int(k): v for k, v in traffic_labels.items()}).to_numpy()
+    out["traffic_proba_not_jam"] = _scatter(None if jam_proba is None else jam_proba[:, 0], valid)
+    out["traffic_proba_jam"] = _scatter(None if jam_proba is None else jam_proba[:, 1], valid)
+    out["day_type_prediction"] = day_pred.array
+    out["day_type_label"] = day_pred.map({int(k): v for k, v in day_type_labels.items()}).to_numpy()
+    out["day_type_proba_weekday"] = _scatter(None if day_proba is None else day_proba[:, 0], valid)
+    out["day_type_proba_holiday"] = _scatter(None if day_proba is None else day_proba[:, 1], valid)
+    out["actual_congested"] = batch["actual_congested"]
+    out["vc_ratio"] = batch["vc_ratio"]
+    out["vc_ratio_over_1"] = batch["vc_over_1"]
+    out["speed_under_20"] = batch["speed_under_20"]
+
+    # ข้อความ error เฉพาะแถวที่ไม่ valid (ปกติมีน้อย)
+    error = np.full(len(df), None, dtype=object)
+    if not valid.all():
+        X, _ = build_feature_matrix(df)
+        for i in np.flatnonzero(~valid):
+            error[i] = f"ค่าไม่ถูกต้องในคอลัมน์: {', '.join(_invalid_columns(X[i]))}"
+    out["error"] = error
+
+    return pd.DataFrame(out)
@@ -0,0 +1,144 @@
+"""
+Input readers สำหรับ batch prediction
+
+รองรับไฟล์ Excel (.xlsx, .xls), CSV (.csv, .csv.gz), Parquet (.parquet) และ
+Arrow IPC (.arrow, .feather, .ipc) โดยเลือกจากนามสกุลหรือ content type
+และใช้ reader แบบ columnar ที่เร็วที่สุดที่มีในเครื่อง (pyarrow ถ้าติดตั้งไว้)
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow เป็น optional dependency
+    pa = None
+
+from feature_schema import SCHEMA
+
+# จำนวนแถวต่อ chunk เมื่ออ่านไฟล์แบบ streaming
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "1000"))
+
+EXTENSION_FORMATS = {
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".csv": "csv",
+    ".csv.gz": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+CONTENT_TYPE_FORMATS = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "excel",
+    "application/vnd.ms-excel": "excel",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.arrow.stream": "arrow",
+}
+
+
+def file_extension(filename):
+    """นามสกุลของไฟล์ (รวม .csv.gz แบบสองชั้น)"""
+    name = (filename or "").lower()
+    if name.endswith(".csv.gz"):
+        return ".csv.gz"
+    return os.path.splitext(name)[1]
+
+
+def detect_format(filename, content_type=None):
+    """เลือก reader จากนามสกุลก่อน แล้วจึงดู content type (None ถ้าไม่รองรับ)"""
+    fmt = EXTENSION_FORMATS.get(file_extension(filename))
+    if fmt is None and content_type:
+        fmt = CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+    return fmt
+
+
+def _require_pyarrow(fmt):
+    if pa is None:
+        raise ValueError(f"ต้องติดตั้ง pyarrow เพื่ออ่านไฟล์ {fmt}")
+
+
+def _read_arrow(path):
+    """อ่าน Arrow IPC ได้ทั้งแบบ file (feather v2) และแบบ stream"""
+    with pa.memory_map(path) as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+    return table.to_pandas()
+
+
+def read_table(path, fmt):
+    """อ่านไฟล์เป็น DataFrame ตามรูปแบบที่ระบุ"""
+    if fmt == "excel":
+        return pd.read_excel(path)
+    if fmt == "csv":
+        if pa is not None:
+            return pd.read_csv(path, engine="pyarrow", compression="infer")
+        return pd.read_csv(path, compression="infer")
+    if fmt == "parquet":
+        _require_pyarrow("Parquet")
+        return pq.read_table(path, memory_map=True).to_pandas()
+    if fmt == "arrow":
+        _require_pyarrow("Arrow IPC")
+        return _read_arrow(path)
+    raise ValueError(f"ไม่รองรับไฟล์รูปแบบ {fmt}")
+
+
+def _iter_arrow_batches(path):
+    with pa.memory_map(path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+        except pa.ArrowInvalid:
+            source.seek(0)
+            yield from pa.ipc.open_stream(source)
+
+
+def _iter_raw_chunks(path, fmt, chunk_rows):
+    if fmt == "csv":
+        with pd.read_csv(path, chunksize=chunk_rows, compression="infer") as reader:
+            yield from reader
+    elif fmt == "parquet":
+        _require_pyarrow("Parquet")
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        _require_pyarrow("Arrow IPC")
+        for batch in _iter_arrow_batches(path):
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield batch.slice(start, chunk_rows).to_pandas()
+    else:
+        # Excel อ่านแบบ streaming ไม่ได้: อ่านทั้งไฟล์แล้วแบ่ง
+        df = read_table(path, fmt)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+
+def iter_table_chunks(path, fmt, chunk_rows=STREAM_CHUNK_ROWS):
+    """อ่านไฟล์ทีละ chunk โดย index ของแถวต่อเนื่องกันทั้งไฟล์ (เริ่มที่ 0)
+
+    CSV, Parquet และ Arrow ถูกอ่านแบบ streaming จึงใช้หน่วยความจำคงที่ตามขนาด chunk
+    """
+    offset = 0
+    for chunk in _iter_raw_chunks(path, fmt, chunk_rows):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def missing_columns(df, schema=SCHEMA):
+    """ฟีเจอร์ใน columns.json ที่ไม่พบใน DataFrame (ยอมรับชื่อใดชื่อหนึ่งของ aliases)"""
+    return schema.missing_columns(df)
@@ -0,0 +1,77 @@
+"""
+Binary feature matrix codec
+
+รูปแบบ application/octet-stream (little-endian ทั้งหมด):
+    uint32 rows, uint32 cols   header 8 bytes
+    float32[rows * cols]       ข้อมูลแบบ row-major (C order)
+
+request ใช้ cols = จำนวนฟีเจอร์ตามลำดับใน columns.json และ response ใช้รูปแบบเดียวกัน
+body ถูกห่อด้วย np.frombuffer โดยไม่คัดลอก แล้วส่งให้โมเดลโดยตรง
+
+รองรับ Arrow IPC (stream หรือ file) ด้วย ถ้าติดตั้ง pyarrow: คอลัมน์ตั้งชื่อตาม schema
+(รวม aliases) และ response เป็น Arrow IPC stream (แบบนี้มีการคัดลอกเป็น row-major หนึ่งครั้ง)
+"""
+
+import struct
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow เป็น optional dependency
+    pa = None
+
+OCTET_STREAM = "application/octet-stream"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_CONTENT_TYPES = (ARROW_STREAM, "application/vnd.apache.arrow.file")
+
+_HEADER = struct.Struct("<II")
+_FLOAT32_LE = np.dtype("<f4")
+
+
+def decode_matrix(body, n_features):
+    """body แบบ octet-stream เป็น array (rows, n_features) float32 แบบ read-only ที่ชี้ไปยัง body"""
+    if len(body) < _HEADER.size:
+        raise ValueError("body สั้นกว่า header (8 bytes: uint32 rows, uint32 cols)")
+    rows, cols = _HEADER.unpack_from(body)
+    if cols != n_features:
+        raise ValueError(f"จำนวนคอลัมน์ต้องเป็น {n_features} (ได้ {cols})")
+    expected = _HEADER.size + rows * cols * _FLOAT32_LE.itemsize
+    if len(body) != expected:
+        raise ValueError(f"ขนาด body ไม่ตรงกับ header (ต้องเป็น {expected} bytes, ได้ {len(body)})")
+    return np.frombuffer(body, dtype=_FLOAT32_LE, count=rows * cols, offset=_HEADER.size).reshape(rows, cols)
+
+
+def encode_matrix(matrix):
+    """array 2 มิติเป็น bytes แบบ octet-stream (header + float32 little-endian)"""
+    matrix = np.ascontiguousarray(matrix, dtype=_FLOAT32_LE)
+    rows, cols = matrix.shape
+    return _HEADER.pack(rows, cols) + matrix.tobytes()
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("ต้องติดตั้ง pyarrow เพื่อใช้ Arrow IPC")
+
+
+def decode_arrow(body, schema):
+    """Arrow IPC เป็น (feature matrix float32, mask ของแถวที่ valid) ตามลำดับฟีเจอร์ของ schema"""
+    _require_pyarrow()
+    buffer = pa.py_buffer(body)
+    try:
+        table = pa.ipc.open_stream(buffer).read_all()
+    except pa.ArrowInvalid:
+        table = pa.ipc.open_file(buffer).read_all()
+    # ผ่าน extractor เดียวกับ DataFrame: aliases, defaults และ null เป็นแถวที่ไม่ valid
+    return schema.extract_frame(table.to_pandas())
+
+
+def encode_arrow(columns):
+    """dict ของ array เป็น Arrow IPC stream (bytes)"""
+    _require_pyarrow()
+    batch = pa.record_batch({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
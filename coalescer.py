@@ -0,0 +1,157 @@
+"""
+Micro-batching request coalescer
+
+รวม request แบบแถวเดียวที่เข้ามาในช่วงเวลาสั้น ๆ (window) ให้เป็น matrix เดียว
+แล้วเรียก predict_proba ครั้งเดียว จากนั้นแจกผลลัพธ์คืนให้แต่ละ request
+"""
+
+import os
+import queue
+import threading
+import time
+import asyncio
+from concurrent.futures import Future
+
+import numpy as np
+
+from executors import run_inference
+from inference_policy import inference_policy
+
+
+class MicroBatcher:
+    """รวมแถวจากหลาย request แล้วประมวลผลเป็น batch เดียว"""
+
+    def __init__(self, predict_fn, window_ms=2.0, max_batch=64, name="model"):
+        self.predict_fn = predict_fn
+        self.window_ms = float(window_ms)
+        self.max_batch = int(max_batch)
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_seen = 0
+        self._histogram = {}
+
+        self._thread = threading.Thread(target=self._run, name=f"coalescer-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """ส่งแถวเดียว (array 1 มิติ) เข้าคิว คืนค่าเป็น Future ของผลลัพธ์แถวนั้น"""
+        future = Future()
+        self._queue.put((np.asarray(row).ravel(), future))
+        return future
+
+    def predict(self, row):
+        """เรียกแบบ blocking (สำหรับ endpoint ที่เป็น def ธรรมดา)"""
+        return self.submit(row).result()
+
+    async def predict_async(self, row):
+        """เรียกแบบ async โดยไม่ block event loop"""
+        return await asyncio.wrap_future(self.submit(row))
+
+    def _collect(self):
+        """รอแถวแรก แล้วเก็บแถวต่อไปจนครบ window หรือ max_batch"""
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_ms / 1000.0
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            # ข้าม request ที่ถูกยกเลิกไปแล้ว
+            items = [(row, f) for row, f in self._collect() if f.set_running_or_notify_cancel()]
+            if not items:
+                continue
+            try:
+                result = self.predict_fn(np.vstack([row for row, _ in items]))
+                for i, (_, future) in enumerate(items):
+                    future.set_result(result[i])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+            self._record(len(items))
+
+    def _record(self, size):
+        # bucket เป็นเลขยกกำลังสอง: 1, 2, 4, 8, ...
+        bucket = 1 << (size - 1).bit_length()
+        with self._lock:
+            self._batches += 1
+            self._rows += size
+            self._max_seen = max(self._max_seen, size)
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+
+    def stats(self):
+        """สถิติขนาด batch ที่รวมได้"""
+        with self._lock:
+            return {
+                "window_ms": self.window_ms,
+                "max_batch": self.max_batch,
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_seen,
+                "batch_size_histogram": {f"<={k}": v for k, v in sorted(self._histogram.items())},
+                "queue_depth": self._queue.qsize(),
+            }
+
+
+def _model_predict_fn(model):
+    return lambda X: inference_policy.predict_proba(model, X)
+
+
+def batcher_for(batcher, model, name):
+    """batcher สำหรับโมเดลใหม่หลัง hot reload: ใช้ thread เดิมโดยเปลี่ยน predict_fn (batch ถัดไปเป็นต้นไป)"""
+    if batcher is None:
+        return batcher_from_env(model, name)
+    batcher.predict_fn = _model_predict_fn(model)
+    return batcher
+
+
+def batcher_from_env(model, name):
+    """สร้าง MicroBatcher จาก environment variables (ปิดไว้เป็นค่าเริ่มต้น)
+
+    COALESCE_ENABLED=1     เปิดใช้งาน
+    COALESCE_WINDOW_MS=2   เวลารอรวม request (มิลลิวินาที)
+    COALESCE_MAX_BATCH=64  จำนวนแถวสูงสุดต่อ batch
+    """
+    if model is None or os.environ.get("COALESCE_ENABLED", "0") != "1":
+        return None
+    return MicroBatcher(
+        _model_predict_fn(model),
+        window_ms=float(os.environ.get("COALESCE_WINDOW_MS", "2")),
+        max_batch=int(os.environ.get("COALESCE_MAX_BATCH", "64")),
+        name=name,
+    )
+
+
+def predict_one(model, batcher, features):
+    """ทำนายแถวเดียว คืน (label, proba) โดยผ่าน batcher ถ้าเปิดใช้งาน"""
+    if not hasattr(model, "predict_proba"):
+        return inference_policy.predict(model, features)[0], None
+    if batcher is not None:
+        proba = batcher.predict(features)
+    else:
+        proba = inference_policy.predict_proba(model, features)[0]
+    return model.classes_[np.argmax(proba)], proba
+
+
+async def predict_one_async(model, batcher, features):
+    """เหมือน predict_one แต่ไม่ block event loop (ผ่าน batcher หรือ inference pool)
+
+    โมเดลที่มีโค้ดที่ generate (forest_codegen) ทำนายใน event loop ได้เลย เพราะเร็วกว่าการส่งงานข้าม thread
+    """
+    if inference_policy.is_inline(model):
+        return predict_one(model, None, features)
+    if batcher is None or not hasattr(model, "predict_proba"):
+        return await run_inference(predict_one, model, None, features)
+    proba = await batcher.predict_async(features)
+    return model.classes_[np.argmax(proba)], proba
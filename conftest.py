@@ -0,0 +1,64 @@
+"""
+fixture ที่ใช้ร่วมกันของ test (โมเดล Random Forest ขนาดเล็กและข้อมูลตัวอย่าง)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# ML_Model_Predictor เป็นสำเนาที่ deploy แยก มี test_rf.py ของตัวเอง (รันจากในโฟลเดอร์นั้น)
+collect_ignore = ["ML_Model_Predictor"]
+
+
+def train_test_model(seed=0):
+    """สร้างโมเดล Random Forest ขนาดเล็กสำหรับการทดสอบ (ไม่ต้องใช้ models/rf_model.pkl)"""
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(13.6, 13.9, 500),
+        rng.uniform(100.4, 100.7, 500),
+        rng.uniform(0, 100, 500),
+        rng.uniform(0, 3000, 500),
+        rng.uniform(500, 3000, 500),
+        rng.integers(0, 24, 500),
+        rng.uniform(0, 120, 500),
+        rng.uniform(0, 2, 500),
+    ])
+    y = ((X[:, 7] > 1.0) | (X[:, 6] < 20)).astype(int)
+    return RandomForestClassifier(n_estimators=10, max_depth=6, random_state=seed).fit(X, y)
+
+
+def sample_frame(n=50, seed=1):
+    """สร้าง DataFrame ตัวอย่างในรูปแบบเดียวกับไฟล์ Excel ที่อัปโหลด"""
+    rng = np.random.default_rng(seed)
+    volume = rng.uniform(0, 3000, n)
+    capacity = rng.uniform(500, 3000, n)
+    return pd.DataFrame({
+        "latitude": rng.uniform(13.6, 13.9, n),
+        "longitude": rng.uniform(100.4, 100.7, n),
+        "density": rng.uniform(0, 100, n),
+        "volume": volume,
+        "capacity": capacity,
+        "hour": rng.integers(0, 24, n),
+        "speed": rng.uniform(0, 120, n),
+        "v/c": volume / capacity,
+    })
+
+
+@pytest.fixture
+def model():
+    """โมเดลทดสอบ seed 0 (สร้างใหม่ทุก test)"""
+    return train_test_model()
+
+
+@pytest.fixture
+def make_model():
+    """make_model(seed): โมเดลทดสอบตาม seed"""
+    return train_test_model
+
+
+@pytest.fixture
+def make_frame():
+    """make_frame(n, seed): DataFrame ตัวอย่าง"""
+    return sample_frame
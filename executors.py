@@ -0,0 +1,117 @@
+"""
+Bounded executor layer
+
+แยก thread pool สำหรับงาน inference (CPU-bound: sklearn / numpy) และงาน file I/O
+(pd.read_excel, to_excel, การเขียนไฟล์) ออกจาก event loop ของ asyncio
+เพื่อให้ request อื่น (รวมถึง /health) ไม่ต้องรอเมื่อมีงานหนักกำลังทำงาน
+
+ตั้งค่าผ่าน environment variables:
+    INFERENCE_POOL_SIZE   จำนวน thread สำหรับ inference (ค่าเริ่มต้น: จำนวน CPU)
+    INFERENCE_QUEUE_MAX   จำนวนงานที่รอได้สูงสุดใน pool inference
+    IO_POOL_SIZE          จำนวน thread สำหรับ file I/O (ค่าเริ่มต้น: 4)
+    IO_QUEUE_MAX          จำนวนงานที่รอได้สูงสุดใน pool I/O
+"""
+
+import os
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolBusyError(RuntimeError):
+    """คิวของ pool เต็ม (เกิน queue_max)"""
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor ที่จำกัดจำนวนงานค้างในคิว และเก็บสถิติ"""
+
+    def __init__(self, name, max_workers, queue_max):
+        self.name = name
+        self.max_workers = int(max_workers)
+        self.queue_max = int(queue_max)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queued_seen = 0
+        self._busy_seconds = 0.0
+
+    def _wrap(self, fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._busy_seconds += time.perf_counter() - started
+        return run
+
+    def submit(self, fn, *args, **kwargs):
+        """ส่งงานเข้า pool คืน concurrent.futures.Future (PoolBusyError ถ้าคิวเต็ม)"""
+        with self._lock:
+            if self._queued >= self.queue_max:
+                self._rejected += 1
+                raise PoolBusyError(f"{self.name} pool queue is full ({self.queue_max})")
+            self._queued += 1
+            self._max_queued_seen = max(self._max_queued_seen, self._queued)
+        try:
+            return self._executor.submit(self._wrap(fn), *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+    async def run(self, fn, *args, **kwargs):
+        """รันงานใน pool แล้ว await ผลลัพธ์โดยไม่ block event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_max": self.queue_max,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "max_queue_depth_seen": self._max_queued_seen,
+                "busy_seconds": round(self._busy_seconds, 3),
+            }
+
+
+inference_pool = BoundedExecutor(
+    "inference",
+    max_workers=int(os.environ.get("INFERENCE_POOL_SIZE", str(os.cpu_count() or 1))),
+    queue_max=int(os.environ.get("INFERENCE_QUEUE_MAX", "256")),
+)
+
+io_pool = BoundedExecutor(
+    "io",
+    max_workers=int(os.environ.get("IO_POOL_SIZE", "4")),
+    queue_max=int(os.environ.get("IO_QUEUE_MAX", "64")),
+)
+
+
+async def run_inference(fn, *args, **kwargs):
+    """รันงาน sklearn / numpy ใน inference pool"""
+    return await inference_pool.run(fn, *args, **kwargs)
+
+
+async def run_io(fn, *args, **kwargs):
+    """รันงานอ่าน/เขียนไฟล์ใน I/O pool"""
+    return await io_pool.run(fn, *args, **kwargs)
+
+
+def executor_stats():
+    """สถิติของทุก pool สำหรับ /health"""
+    return {"inference": inference_pool.stats(), "io": io_pool.stats()}
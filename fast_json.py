@@ -0,0 +1,55 @@
+"""
+Fast JSON encode / decode
+
+ใช้ orjson ถ้าติดตั้งไว้ (serialize numpy array ได้โดยตรง และ NaN เป็น null)
+ไม่เช่นนั้นใช้ json ของ standard library โดยแปลง numpy เป็น list ก่อน
+"""
+
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson เป็น optional dependency
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """bytes / str เป็น Python object"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _float_list(array):
+    # NaN เป็น null เหมือน orjson
+    values = array.tolist()
+    if np.isnan(array).any():
+        return [None if value != value else value for value in values]
+    return values
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            return _float_list(obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Python object (รวม numpy array) เป็น JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def json_response(obj, status_code=200):
+    """Response ที่ encode แล้ว (ข้ามการแปลงของ FastAPI / pydantic)"""
+    return Response(content=dumps(obj), status_code=status_code, media_type="application/json")
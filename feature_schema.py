@@ -0,0 +1,141 @@
+"""
+Feature schema จาก columns.json
+
+นิยามลำดับฟีเจอร์ ชื่อเรียกอื่น (aliases เช่น v/c ↔ vc_ratio) ค่าเริ่มต้น และชนิดข้อมูล
+ไว้ที่เดียว แล้ว compile เป็น extractor ที่เติมค่าลง buffer float32 แบบ C-contiguous
+ที่จองไว้ครั้งเดียว (dtype เดียวกับที่ sklearn ใช้ภายใน จึงไม่ต้องแปลงซ้ำตอน predict)
+
+extractor เดียวกันใช้ได้กับ dict แถวเดียว, list ของ dict และ DataFrame
+"""
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+COLUMNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "columns.json")
+
+FEATURE_DTYPE = np.float32
+
+
+class FeatureSchema:
+    """ลำดับฟีเจอร์ + aliases + defaults + dtypes ที่ compile แล้ว"""
+
+    def __init__(self, features):
+        self.features = [dict(spec) for spec in features]
+        self.names = [spec["name"] for spec in self.features]
+        self.defaults = {spec["name"]: spec["default"] for spec in self.features}
+        self.n_features = len(self.names)
+        # (ตำแหน่ง, ชื่อที่ยอมรับตามลำดับความสำคัญ, ค่าเริ่มต้น, ตัดทศนิยมหรือไม่)
+        self._fields = tuple(
+            (j, tuple([spec["name"]] + list(spec.get("aliases", []))), spec["default"], spec.get("dtype") == "int")
+            for j, spec in enumerate(self.features)
+        )
+        self._fill_row = self._compile()
+
+    def _compile(self):
+        """สร้างฟังก์ชันเติมหนึ่งแถวเฉพาะ schema นี้ (ไม่มี loop / list ต่อ call)
+
+        ตัวอย่างที่ได้: out[row] = (float(get('latitude', 13.7563)), ..., int(get('hour', 12)), ...)
+        """
+        values = []
+        for _, keys, default, as_int in self._fields:
+            expr = f"get({keys[-1]!r}, {default!r})"
+            for key in reversed(keys[:-1]):
+                expr = f"(data[{key!r}] if {key!r} in data else {expr})"
+            values.append(f"{'int' if as_int else 'float'}({expr})")
+        source = (
+            "def fill_row(data, out, row):\n"
+            "    get = data.get\n"
+            f"    out[row] = ({', '.join(values)},)\n"
+        )
+        namespace = {}
+        exec(compile(source, "<feature_schema>", "exec"), namespace)
+        return namespace["fill_row"]
+
+    def with_defaults(self, overrides):
+        """schema เดิมแต่เปลี่ยนค่าเริ่มต้นบางฟีเจอร์"""
+        return FeatureSchema([dict(spec, default=overrides.get(spec["name"], spec["default"])) for spec in self.features])
+
+    def keys(self, name):
+        """ชื่อคอลัมน์ / key ที่ยอมรับสำหรับฟีเจอร์หนึ่ง (ชื่อหลักก่อน แล้วจึง aliases)"""
+        return self._fields[self.names.index(name)][1]
+
+    def value(self, data, name):
+        """ค่าดิบของฟีเจอร์จาก dict (ผ่าน aliases, ไม่มี key = ค่าเริ่มต้น)"""
+        _, keys, default, _ = self._fields[self.names.index(name)]
+        for key in keys:
+            if key in data:
+                return data[key]
+        return default
+
+    def empty(self, n_rows):
+        """buffer (n_rows, n_features) float32 แบบ C-contiguous"""
+        return np.empty((n_rows, self.n_features), dtype=FEATURE_DTYPE)
+
+    def extract_dict(self, data, out=None, row=0):
+        """เติมฟีเจอร์ของ dict หนึ่งแถวลง out[row] (ValueError ถ้าแปลงค่าไม่ได้)"""
+        out = self.empty(1) if out is None else out
+        self._fill_row(data, out, row)
+        return out
+
+    def extract_records(self, records, out=None):
+        """list ของ dict เป็น feature matrix (ValueError ถ้าแปลงค่าไม่ได้)"""
+        out = self.empty(len(records)) if out is None else out
+        fill_row = self._fill_row
+        for i, data in enumerate(records):
+            fill_row(data, out, i)
+        return out
+
+    def column(self, df, name, dtype=np.float64):
+        """คอลัมน์ของฟีเจอร์จาก DataFrame (ผ่าน aliases) เป็นตัวเลข ค่าที่แปลงไม่ได้เป็น NaN"""
+        j = self.names.index(name)
+        _, keys, default, _ = self._fields[j]
+        return _numeric_column(df, keys, default, dtype)
+
+    def extract_frame(self, df, out=None):
+        """DataFrame เป็น feature matrix พร้อม mask ของแถวที่ค่าครบ (ไม่ใช่ NaN / inf)"""
+        out = self.empty(len(df)) if out is None else out
+        for j, keys, default, as_int in self._fields:
+            # assign ลง buffer float32 โดยตรง ไม่สร้าง array float32 ชั่วคราว
+            out[:, j] = _numeric_column(df, keys, default)
+            if as_int:
+                np.trunc(out[:, j], out=out[:, j])
+        valid = np.isfinite(out).all(axis=1)
+        return out, valid
+
+    def extract(self, data, out=None):
+        """dict / list ของ dict / DataFrame เป็น feature matrix float32 (n_rows, n_features)"""
+        if isinstance(data, pd.DataFrame):
+            return self.extract_frame(data, out)[0]
+        if isinstance(data, dict):
+            return self.extract_dict(data, out)
+        return self.extract_records(data, out)
+
+    def missing_columns(self, df):
+        """ฟีเจอร์ที่ไม่พบใน DataFrame ทั้งชื่อหลักและ aliases"""
+        return [" / ".join(keys) for _, keys, _, _ in self._fields if not any(key in df.columns for key in keys)]
+
+
+def _numeric_column(df, keys, default, dtype=np.float64):
+    """คอลัมน์แรกที่พบจาก keys เป็นตัวเลข (ไม่มีคอลัมน์ = ค่าเริ่มต้นทั้งคอลัมน์)"""
+    for key in keys:
+        if key in df.columns:
+            column = df[key]
+            break
+    else:
+        return np.full(len(df), float(default), dtype=dtype)
+    if not pd.api.types.is_numeric_dtype(column):
+        column = pd.to_numeric(column, errors="coerce")
+    # คอลัมน์ตัวเลข (เช่นจาก Parquet / Arrow) แปลงเป็น array โดยตรง ไม่ผ่าน Python object
+    return column.to_numpy(dtype=dtype, na_value=np.nan)
+
+
+def load_schema(path=COLUMNS_PATH):
+    """โหลด FeatureSchema จาก columns.json"""
+    with open(path, encoding="utf-8") as f:
+        return FeatureSchema(json.load(f)["features"])
+
+
+SCHEMA = load_schema()
@@ -0,0 +1,247 @@
+"""
+Code-generated decision functions
+
+แปลงแต่ละ tree ของ forest เป็นโค้ด Python แบบ if / else ตรง ๆ บน float ธรรมดา
+(tree ที่ลึกเกิน CODEGEN_MAX_NESTING ใช้ decision list แบบ tuple แทน) สำหรับการทำนาย
+แถวเดียวในระดับไมโครวินาที โดยไม่ต้องสร้าง array หรือผ่าน joblib ของ sklearn
+
+ผลลัพธ์ตรงกับ predict_proba แบบ bit-for-bit: input ถูกปัดเป็น float32 เหมือน sklearn,
+threshold / leaf value เขียนด้วย repr() ของ float64 และผลรวมบวกตามลำดับ tree เดียวกัน
+แถวที่มี NaN / inf ไม่ผ่านโค้ดนี้ (ใช้โมเดลเดิมซึ่งจัดการ missing value / error เอง)
+
+โมดูลที่ generate ถูกเก็บใน models/.mmap/ ตาม fingerprint ของ artifact เหมือน cache อื่น
+ของ model_registry (generate ใหม่เมื่อโมเดลเปลี่ยน) ก่อนใช้งานต้องผ่าน parity check
+กับ predict_proba ของโมเดลเดิม
+
+ตั้งค่าผ่าน environment variables:
+    CODEGEN_ENABLED     0 เพื่อปิด (ค่าเริ่มต้น 1)
+    CODEGEN_MAX_NODES   จำนวน node สูงสุดของ forest ที่จะ generate (ค่าเริ่มต้น 200000)
+    CODEGEN_MAX_ROWS    จำนวนแถวสูงสุดต่อการเรียกที่ใช้โค้ดนี้ (ค่าเริ่มต้น 8)
+"""
+
+import os
+import uuid
+import weakref
+import importlib.util
+from importlib.machinery import SourceFileLoader
+
+import numpy as np
+
+from forest_engine import CompiledForest, equivalence_samples
+
+CODEGEN_ENABLED = os.environ.get("CODEGEN_ENABLED", "1") == "1"
+CODEGEN_MAX_NODES = int(os.environ.get("CODEGEN_MAX_NODES", "200000"))
+CODEGEN_MAX_ROWS = int(os.environ.get("CODEGEN_MAX_ROWS", "8"))
+
+# tree ที่ลึกกว่านี้ใช้ decision list (if ซ้อนลึกมากทำให้ parser ของ Python ล้มเหลว)
+CODEGEN_MAX_NESTING = 40
+
+# จำนวนแถวสุ่มของ parity check (รวมแถวที่ค่าตรง threshold พอดี)
+PARITY_ROWS = 2000
+
+_HEADER = "# generated by forest_codegen from {fingerprint}: do not edit\n"
+
+
+def _tree_depth(forest, node):
+    depth = 0
+    stack = [(int(node), 0)]
+    while stack:
+        node, d = stack.pop()
+        left = int(forest.left[node])
+        if left == node:
+            depth = max(depth, d)
+        else:
+            stack.append((left, d + 1))
+            stack.append((int(forest.right[node]), d + 1))
+    return depth
+
+
+def _leaf(forest, node):
+    return "(" + ", ".join(repr(float(v)) for v in forest.value[node]) + ",)"
+
+
+def _nested_source(forest, node, indent, lines):
+    pad = "    " * indent
+    left = int(forest.left[node])
+    if left == node:
+        lines.append(f"{pad}return {_leaf(forest, node)}")
+        return
+    lines.append(f"{pad}if x[{int(forest.feature[node])}] <= {float(forest.threshold[node])!r}:")
+    _nested_source(forest, left, indent + 1, lines)
+    lines.append(f"{pad}else:")
+    _nested_source(forest, int(forest.right[node]), indent + 1, lines)
+
+
+def _packed_source(forest, root, t, lines):
+    # (feature, threshold, left, right, leaf value หรือ None) โดย index นับจาก root ของ tree
+    order, index = [], {}
+    stack = [int(root)]
+    while stack:
+        node = stack.pop()
+        index[node] = len(order)
+        order.append(node)
+        if int(forest.left[node]) != node:
+            stack.append(int(forest.right[node]))
+            stack.append(int(forest.left[node]))
+    entries = []
+    for node in order:
+        left = int(forest.left[node])
+        if left == node:
+            entries.append(f"(0, 0.0, 0, 0, {_leaf(forest, node)})")
+        else:
+            entries.append(
+                f"({int(forest.feature[node])}, {float(forest.threshold[node])!r}, "
+                f"{index[left]}, {index[int(forest.right[node])]}, None)"
+            )
+    lines.append(f"_NODES_{t} = (" + ", ".join(entries) + ",)")
+    lines.append(f"def _tree_{t}(x):")
+    lines.append(f"    return _walk(_NODES_{t}, x)")
+
+
+def generate_source(forest, fingerprint):
+    """source ของโมดูลที่มี predict_proba_row(x) สำหรับ x เป็น list ของ float (ค่า float32)"""
+    n_classes = forest.value.shape[1]
+    lines = [
+        _HEADER.format(fingerprint=fingerprint).rstrip("\n"),
+        f"FINGERPRINT = {fingerprint!r}",
+        f"CLASSES = {tuple(forest.classes_.tolist())!r}",
+        f"N_FEATURES = {forest.n_features_in_}",
+        "",
+        "def _walk(nodes, x):",
+        "    node = nodes[0]",
+        "    while node[4] is None:",
+        "        node = nodes[node[2] if x[node[0]] <= node[1] else node[3]]",
+        "    return node[4]",
+        "",
+    ]
+    for t in range(forest.n_trees):
+        root = int(forest.roots[t])
+        if _tree_depth(forest, root) > CODEGEN_MAX_NESTING:
+            _packed_source(forest, root, t, lines)
+        else:
+            lines.append(f"def _tree_{t}(x):")
+            _nested_source(forest, root, 1, lines)
+        lines.append("")
+
+    sums = [f"a{c}" for c in range(n_classes)]
+    lines.append("def predict_proba_row(x):")
+    lines.append(f"    {' = '.join(sums)} = 0.0")
+    for t in range(forest.n_trees):
+        lines.append(f"    v = _tree_{t}(x)")
+        lines.append("    " + "; ".join(f"a{c} += v[{c}]" for c in range(n_classes)))
+    # ลำดับการหารเดียวกับ CompiledForest.predict_proba
+    scale = f" / {forest.value_scale!r}" if forest.value_scale != 1.0 else ""
+    lines.append(f"    return [{', '.join(f'{s} / {forest.n_trees}{scale}' for s in sums)}]")
+    return "\n".join(lines) + "\n"
+
+
+class CodegenForest:
+    """ตัวทำนายจากโมดูลที่ generate (predict_proba / predict สำหรับแถวที่มีค่าจำกัดเท่านั้น)"""
+
+    def __init__(self, module, path=None):
+        self.module = module
+        self.path = path
+        self.fingerprint = module.FINGERPRINT
+        self.classes_ = np.asarray(module.CLASSES)
+        self.n_features_in_ = module.N_FEATURES
+        self._predict_row = module.predict_proba_row
+
+    def predict_proba(self, X):
+        """ความน่าจะเป็นของทุกแถว (ValueError ถ้ามี NaN / inf หรือจำนวนฟีเจอร์ไม่ตรง)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_ or not np.isfinite(X).all():
+            raise ValueError("CodegenForest รับเฉพาะแถวที่มีค่าจำกัดและจำนวนฟีเจอร์ถูกต้อง")
+        predict_row = self._predict_row
+        return np.array([predict_row(row) for row in X.tolist()], dtype=np.float64)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def _cached_fingerprint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            first = f.readline()
+    except OSError:
+        return None
+    prefix, _, rest = first.partition(" from ")
+    return rest.rsplit(":", 1)[0] if prefix == "# generated by forest_codegen" else None
+
+
+def load_module(path):
+    """import โมดูลที่ generate จาก path (ชื่อไฟล์ไม่จำเป็นต้องลงท้ายด้วย .py)"""
+    name = f"forest_codegen_{uuid.uuid4().hex}"
+    spec = importlib.util.spec_from_file_location(name, path, loader=SourceFileLoader(name, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def check_parity(reference, candidate, X=None):
+    """predict_proba ต้องเท่ากับโมเดลเดิมทุกค่า (ไม่ยอมให้ต่างแม้แต่ ulp เดียว)"""
+    if X is None:
+        X = equivalence_samples(_as_compiled(reference), n_random=PARITY_ROWS)
+    return bool(np.array_equal(reference.predict_proba(X), candidate.predict_proba(X)))
+
+
+def _as_compiled(model):
+    return model if isinstance(model, CompiledForest) else CompiledForest.from_sklearn(model)
+
+
+def load_or_generate(model, path, fingerprint):
+    """CodegenForest ของโมเดลจากไฟล์ path: ใช้ไฟล์เดิมถ้า fingerprint ตรง ไม่เช่นนั้น generate ใหม่
+
+    คืน None ถ้า forest ใหญ่เกิน CODEGEN_MAX_NODES, เขียนไฟล์ไม่ได้ หรือไม่ผ่าน parity check
+    """
+    forest = _as_compiled(model)
+    if len(forest.left) > CODEGEN_MAX_NODES:
+        return None
+    if _cached_fingerprint(path) != fingerprint:
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(generate_source(forest, fingerprint))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] Cannot write generated forest code {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+    candidate = CodegenForest(load_module(path), path)
+    if not check_parity(model, candidate, equivalence_samples(forest, n_random=PARITY_ROWS)):
+        print(f"[WARN] Generated forest code {path} does not match predict_proba; not using it")
+        return None
+    return candidate
+
+
+# CodegenForest ของโมเดลที่โหลดแล้ว (หายไปเองเมื่อ model ถูกปล่อย)
+_codegen_forests = weakref.WeakKeyDictionary()
+
+
+def register(model, codegen):
+    """ผูก CodegenForest กับ model เพื่อให้การเรียกแถวเดียวใช้โค้ดที่ generate"""
+    _codegen_forests[model] = codegen
+
+
+def codegen_for(model):
+    """CodegenForest ที่ผูกกับ model (None ถ้าไม่มี)"""
+    try:
+        return _codegen_forests.get(model)
+    except TypeError:
+        return None
+
+
+def predict_proba_rows(model, X):
+    """predict_proba ผ่านโค้ดที่ generate สำหรับ batch เล็กที่มีค่าจำกัด (None = ใช้โมเดลเดิม)"""
+    codegen = codegen_for(model)
+    if codegen is None or len(X) > CODEGEN_MAX_ROWS:
+        return None
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim != 2 or X.shape[1] != codegen.n_features_in_ or not np.isfinite(X).all():
+        return None
+    predict_row = codegen._predict_row
+    return np.array([predict_row(row) for row in X.tolist()], dtype=np.float64)
@@ -0,0 +1,411 @@
+"""
+Compiled forest engine
+
+แปลง RandomForestClassifier ที่โหลดแล้วให้เป็น array แบบ flat และต่อเนื่อง
+(feature, threshold, left, right, leaf value) ของทุก tree รวมกัน แล้วเดิน tree
+ทุกต้นพร้อมกันสำหรับทั้ง batch ด้วย NumPy แทนการเรียก predict_proba ของ sklearn
+
+ผลลัพธ์ตรงกับ sklearn แบบ bit-for-bit: input ถูกแปลงเป็น float32 เหมือน sklearn,
+leaf value ตรงกับที่ DecisionTreeClassifier.predict_proba คืนค่า
+และผลรวมของแต่ละ tree ถูกบวกตามลำดับ estimator เดียวกัน
+
+CompiledForest.compact() ลดขนาดลงอีก: threshold เป็น float32 (ปัดลง ทำให้การตัดสินใจ
+ทุก node เหมือนเดิมสำหรับ input float32), index เป็น integer ขนาดเล็กที่สุดที่พอ
+และ leaf value เป็น float32 หรือ uint16 โดยตรวจความเท่ากันกับโมเดลเดิมด้วย
+check_equivalence()
+
+predict_anytime() ทำนายแถวเดียวทีละ tree และหยุดก่อนเมื่อคลาสที่นำอยู่ชนะแน่นอนแล้ว
+(tree ที่เหลือโหวตอย่างไรก็พลิกผลไม่ได้) หรือเมื่อหมดงบจำนวน tree / เวลา
+"""
+
+import os
+import json
+import time
+import shutil
+import weakref
+
+import numpy as np
+
+# จำนวนแถวต่อรอบการเดิน tree (จำกัดขนาด array ชั่วคราว n_rows x n_trees)
+CHUNK_ROWS = 4096
+
+def _sklearn_values_are_fractions():
+    """sklearn >= 1.4 เก็บ tree_.value เป็นสัดส่วนของคลาสอยู่แล้ว (predict_proba ไม่ normalize ซ้ำ)"""
+    import sklearn
+
+    major, minor = (int(part) for part in sklearn.__version__.split(".")[:2])
+    return (major, minor) >= (1, 4)
+
+
+_VALUES_ARE_FRACTIONS = _sklearn_values_are_fractions()
+
+_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+
+# ค่าเต็มของ leaf value แบบ uint16 (สัดส่วน 1.0)
+UINT16_SCALE = 65535.0
+
+
+class CompiledForest:
+    """Random forest ในรูปแบบ array ที่ใช้แทน sklearn model ได้ (predict / predict_proba / classes_)"""
+
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes, n_features, max_depth,
+                 value_scale=1.0):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        # leaf value ที่เก็บ = สัดส่วน * value_scale (1.0 สำหรับ float, 65535 สำหรับ uint16)
+        self.value_scale = float(value_scale)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compile RandomForestClassifier (n_outputs == 1) เป็น flat arrays"""
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("CompiledForest รองรับเฉพาะโมเดลที่มี output เดียว")
+
+        n_classes = len(model.classes_)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # leaf ชี้กลับมาที่ตัวเอง ทำให้เดิน tree ได้ครบ max_depth รอบโดยไม่ต้องแยกกรณี
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(np.asarray(tree.threshold, dtype=np.float64))
+
+            nodes = tree.__getstate__()["nodes"]
+            if "missing_go_to_left" in nodes.dtype.names:
+                missing.append(nodes["missing_go_to_left"].astype(bool))
+            else:
+                missing.append(np.zeros(n_nodes, dtype=bool))
+
+            proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+            if not _VALUES_ARE_FRACTIONS:
+                # normalize แบบเดียวกับ DecisionTreeClassifier.predict_proba (sklearn < 1.4)
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            left=np.ascontiguousarray(np.concatenate(lefts)),
+            right=np.ascontiguousarray(np.concatenate(rights)),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int64),
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+            max_depth=max_depth,
+        )
+
+    def compact(self, value_dtype="float32"):
+        """CompiledForest ขนาดเล็ก: threshold float32, index ขนาดเล็กที่สุด, leaf value float32 หรือ uint16"""
+        if value_dtype not in ("float32", "uint16"):
+            raise ValueError(f"value_dtype ต้องเป็น float32 หรือ uint16 (ได้ {value_dtype})")
+
+        # ปัด threshold ลงเป็น float32 ตัวที่ใหญ่ที่สุดที่ไม่เกินค่าเดิม: สำหรับ x ที่เป็น float32
+        # x <= t  ก็ต่อเมื่อ  x <= floor32(t) จึงไม่มี node ใดเปลี่ยนทิศทาง
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        node_dtype = np.min_scalar_type(len(self.left) - 1)
+        feature_dtype = np.min_scalar_type(max(self.n_features_in_ - 1, 0))
+
+        if value_dtype == "uint16":
+            value = np.rint(self.value * UINT16_SCALE).astype(np.uint16)
+            value_scale = UINT16_SCALE
+        else:
+            value = self.value.astype(np.float32)
+            value_scale = 1.0
+
+        return CompiledForest(
+            feature=self.feature.astype(feature_dtype),
+            threshold=threshold,
+            left=self.left.astype(node_dtype),
+            right=self.right.astype(node_dtype),
+            missing_left=np.asarray(self.missing_left, dtype=bool),
+            value=np.ascontiguousarray(value),
+            roots=self.roots.astype(node_dtype),
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+            max_depth=self.max_depth,
+            value_scale=value_scale,
+        )
+
+    def _validate(self, X):
+        # sklearn แปลง input เป็น float32 ก่อนเดิน tree
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but CompiledForest is expecting {self.n_features_in_} features as input."
+            )
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        return np.ascontiguousarray(X)
+
+    def apply(self, X):
+        """index ของ leaf (global node id) ที่แต่ละแถวตกในแต่ละ tree: shape (n_rows, n_trees)"""
+        X = self._validate(X)
+        has_nan = np.isnan(X).any()
+        leaves = np.empty((len(X), self.n_trees), dtype=self.roots.dtype)
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            leaves[start:start + len(chunk)] = self._apply_chunk(chunk, has_nan)
+        return leaves
+
+    def _apply_chunk(self, X, has_nan):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        # หนึ่งช่องต่อคู่ (แถว, tree) เรียงแบบ row-major
+        idx = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        # เดินเฉพาะคู่ที่ยังไม่ถึง leaf (leaf คือ node ที่ left ชี้กลับมาที่ตัวเอง)
+        active = np.flatnonzero(self.left.take(idx) != idx)
+        while len(active):
+            node = idx.take(active)
+            x = flat_X.take(row_base.take(active) + self.feature.take(node))
+            go_left = x <= self.threshold.take(node)
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left.take(node), go_left)
+            node = np.where(go_left, self.left.take(node), self.right.take(node))
+            idx[active] = node
+            active = active[self.left.take(node) != node]
+        return idx.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """ความน่าจะเป็นของแต่ละคลาส (ตรงกับ RandomForestClassifier.predict_proba)"""
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        # บวกตามลำดับ tree เหมือน sklearn (_accumulate_prediction)
+        for t in range(self.n_trees):
+            proba += self.value.take(leaves[:, t], axis=0)
+        proba /= self.n_trees
+        if self.value_scale != 1.0:
+            proba /= self.value_scale
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def _leaf(self, root, x):
+        """เดิน tree หนึ่งต้นสำหรับแถวเดียว (x เป็น list ของ float)"""
+        left, right, feature, threshold, missing_left = self.left, self.right, self.feature, self.threshold, self.missing_left
+        node = root
+        while left.item(node) != node:
+            value = x[feature.item(node)]
+            if value != value:
+                go_left = missing_left.item(node)
+            else:
+                go_left = value <= threshold.item(node)
+            node = left.item(node) if go_left else right.item(node)
+        return node
+
+    def predict_one_anytime(self, x, max_trees=None, deadline=None):
+        """ทำนายแถวเดียวทีละ tree ตามลำดับ และหยุดเมื่อผลแน่นอนแล้วหรือหมดงบ
+
+        หยุดเมื่อ (1) คะแนนของคลาสที่นำอยู่มากกว่าคลาสอื่นแม้ tree ที่เหลือจะโหวตให้คลาสอื่นทั้งหมด
+        (2) ครบ max_trees หรือ (3) time.perf_counter() เกิน deadline
+        คืน (label, proba, trees_evaluated, exact) โดย exact=True หมายถึง label ตรงกับการประเมิน
+        ครบทุก tree แน่นอน; proba เป็นค่าเฉลี่ยของ tree ที่ประเมินแล้ว (ตรงกับ predict_proba เมื่อครบ)
+        """
+        x = self._validate(x)[0].tolist()
+        n_trees = self.n_trees
+        limit = n_trees if max_trees is None else min(n_trees, max(1, int(max_trees)))
+        sums = [0.0] * self.value.shape[1]
+        evaluated = 0
+        certain = False
+        for t in range(n_trees):
+            leaf_value = self.value[self._leaf(self.roots.item(t), x)].tolist()
+            for c, v in enumerate(leaf_value):
+                sums[c] += v
+            evaluated += 1
+
+            # ทุก tree ที่เหลือให้คะแนนรวมได้ไม่เกิน value_scale
+            remaining = (n_trees - evaluated) * self.value_scale
+            winner = sums.index(max(sums))
+            certain = all(sums[winner] > s + remaining for c, s in enumerate(sums) if c != winner)
+            if certain or evaluated >= limit or (deadline is not None and time.perf_counter() >= deadline):
+                break
+
+        if evaluated == n_trees:
+            # ลำดับการหารเดียวกับ predict_proba
+            proba = [s / n_trees / self.value_scale for s in sums]
+        else:
+            proba = [s / evaluated / self.value_scale for s in sums]
+        label = self.classes_[int(np.argmax(proba))]
+        return label, np.asarray(proba), evaluated, certain or evaluated == n_trees
+
+    def save(self, directory):
+        """บันทึกเป็นไฟล์ .npy แยกต่อ array (memory-map ได้) แบบ atomic"""
+        tmp_dir = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({
+                "classes": self.classes_.tolist(),
+                "n_features": self.n_features_in_,
+                "max_depth": self.max_depth,
+                "value_scale": self.value_scale,
+            }, f)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # worker อื่นบันทึกไว้ก่อนแล้ว
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """โหลดจากไฟล์ .npy (mmap_mode="r" เพื่อแชร์ page cache ระหว่าง worker)"""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in _ARRAYS}
+        return cls(
+            classes=meta["classes"],
+            n_features=meta["n_features"],
+            max_depth=meta["max_depth"],
+            value_scale=meta.get("value_scale", 1.0),
+            **arrays,
+        )
+
+
+# CompiledForest ของ sklearn model ที่ใช้ในโหมด anytime (หายไปเองเมื่อ model ถูกปล่อย)
+_anytime_forests = weakref.WeakKeyDictionary()
+
+
+def as_compiled(model):
+    """CompiledForest ของ model (compile จาก sklearn ครั้งแรกแล้วเก็บไว้)"""
+    if isinstance(model, CompiledForest):
+        return model
+    compiled = _anytime_forests.get(model)
+    if compiled is None:
+        compiled = _anytime_forests[model] = CompiledForest.from_sklearn(model)
+    return compiled
+
+
+def predict_anytime(model, features, max_trees=None, budget_ms=None):
+    """ทำนายแถวเดียวแบบ early-exit คืน (label, proba, ข้อมูลการประเมิน)"""
+    deadline = time.perf_counter() + budget_ms / 1000.0 if budget_ms is not None else None
+    forest = as_compiled(model)
+    label, proba, evaluated, exact = forest.predict_one_anytime(features, max_trees=max_trees, deadline=deadline)
+    return label, proba, {
+        "mode": "anytime",
+        "trees_evaluated": evaluated,
+        "trees_total": forest.n_trees,
+        "exact": bool(exact),
+    }
+
+
+def sklearn_forest_nbytes(model):
+    """ขนาดของ node arrays และ value arrays ใน sklearn forest (ไม่รวม overhead ของ Python object)"""
+    total = 0
+    for estimator in model.estimators_:
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def equivalence_samples(forest, n_random=10000, seed=0):
+    """input สำหรับตรวจความเท่ากัน: สุ่มในช่วงของ threshold และแถวที่มีค่าตรง threshold พอดี"""
+    rng = np.random.default_rng(seed)
+    is_split = forest.left != np.arange(len(forest.left))
+    features = np.asarray(forest.feature)[is_split].astype(np.int64)
+    thresholds = np.asarray(forest.threshold, dtype=np.float64)[is_split]
+
+    low = np.zeros(forest.n_features_in_)
+    high = np.ones(forest.n_features_in_)
+    for j in range(forest.n_features_in_):
+        values = thresholds[features == j]
+        if len(values):
+            span = max(values.max() - values.min(), 1.0)
+            low[j], high[j] = values.min() - 0.1 * span, values.max() + 0.1 * span
+    X = rng.uniform(low, high, size=(n_random, forest.n_features_in_))
+
+    # ค่า float32 ที่อยู่รอบ threshold (ตรงจุดที่การปัดเศษจะเปลี่ยนผลถ้าทำผิด)
+    edge = rng.uniform(low, high, size=(3 * len(thresholds), forest.n_features_in_))
+    around = thresholds.astype(np.float32)
+    for k, values in enumerate((around, np.nextafter(around, np.float32(-np.inf)), np.nextafter(around, np.float32(np.inf)))):
+        edge[np.arange(k, len(edge), 3), features] = values
+    return np.vstack([X, edge]).astype(np.float32)
+
+
+def check_equivalence(reference, candidate, X=None, atol=None):
+    """เทียบ candidate กับโมเดลเดิม: label ต้องตรงทุกแถว และความน่าจะเป็นต่างกันไม่เกิน atol
+
+    atol เริ่มต้น: 1e-6 สำหรับ float32 และครึ่งหนึ่งของขั้น quantization สำหรับ uint16
+    """
+    if X is None:
+        X = equivalence_samples(candidate)
+    if atol is None:
+        atol = 1e-6 if candidate.value_scale == 1.0 else 0.5 / candidate.value_scale
+    expected = reference.predict_proba(X)
+    actual = candidate.predict_proba(X)
+    labels_match = np.array_equal(reference.predict(X), candidate.predict(X))
+    max_diff = float(np.abs(expected - actual).max()) if len(X) else 0.0
+    return {
+        "rows": len(X),
+        "labels_match": bool(labels_match),
+        "max_abs_proba_diff": max_diff,
+        "atol": atol,
+        "equivalent": bool(labels_match and max_diff <= atol),
+    }
+
+
+def compaction_report(model, compact):
+    """จำนวน bytes ที่ลดลงเมื่อเทียบกับ sklearn forest เดิม"""
+    original = sklearn_forest_nbytes(model)
+    return {
+        "sklearn_bytes": original,
+        "compact_bytes": compact.nbytes,
+        "saved_bytes": original - compact.nbytes,
+        "saved_percent": round(100.0 * (original - compact.nbytes) / original, 1) if original else 0.0,
+        "dtypes": {name: str(getattr(compact, name).dtype) for name in _ARRAYS},
+    }
+
+
+if __name__ == "__main__":
+    # python forest_engine.py models/rf_model.pkl [float32|uint16] [output_dir]
+    import sys
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "models/rf_model.pkl"
+    value_dtype = sys.argv[2] if len(sys.argv) > 2 else "float32"
+    output_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(model_path)[0] + f".compact-{value_dtype}"
+
+    sklearn_model = joblib.load(model_path)
+    compact_forest = CompiledForest.from_sklearn(sklearn_model).compact(value_dtype)
+    equivalence = check_equivalence(sklearn_model, compact_forest)
+    print(json.dumps({"equivalence": equivalence, "report": compaction_report(sklearn_model, compact_forest)}, indent=2))
+    if not equivalence["equivalent"]:
+        sys.exit("compact forest ไม่เท่ากับโมเดลเดิม: ไม่บันทึกไฟล์")
+    compact_forest.save(output_dir)
+    print(f"saved {output_dir}")
@@ -0,0 +1,229 @@
+"""
+Congestion heatmap
+
+ประเมิน jam model บน grid ของ latitude × longitude (bounding box ที่ตั้งค่าได้) × 24 ชั่วโมง
+ในการ predict ครั้งเดียว แล้วเก็บความน่าจะเป็นที่รถติดเป็นไฟล์ .npy (float16) หนึ่งไฟล์ต่อชั่วโมง
+ซึ่งเปิดแบบ memory-mapped ตอน query ฟีเจอร์อื่นใช้ค่าเริ่มต้นของ schema
+
+ผลลัพธ์อยู่ในโฟลเดอร์ที่ตั้งชื่อตาม version ของโมเดล + การตั้งค่า grid โดย start() precompute
+ใน thread เบื้องหลัง (เรียกตอนเริ่ม process และจาก listener ของ registry เมื่อสลับโมเดล)
+ระหว่างนั้น query ใช้ grid ล่าสุดที่เสร็จแล้ว และลบโฟลเดอร์ของ version เก่าเมื่อ grid ใหม่พร้อม
+query ไม่ precompute เอง: ถ้ายังไม่มี grid เลยจะได้ HeatmapNotReadyError
+
+ตั้งค่าผ่าน environment variables:
+    HEATMAP_DIR        โฟลเดอร์เก็บผลลัพธ์ (ค่าเริ่มต้น heatmaps ซึ่งอยู่นอก static/ ที่เป็นไฟล์สาธารณะ)
+    HEATMAP_BBOX       min_lat,min_lon,max_lat,max_lon (ค่าเริ่มต้น 13.60,100.35,13.95,100.75 กรุงเทพฯ)
+    HEATMAP_STEP       ระยะห่างของ grid เป็นองศา (ค่าเริ่มต้น 0.005 ~550 m)
+    HEATMAP_MAX_CELLS  จำนวนช่องสูงสุดต่อ query (ค่าเริ่มต้น 250000)
+
+precompute ล่วงหน้าได้ด้วย: python heatmap.py [model.pkl]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+import numpy as np
+
+from feature_schema import SCHEMA
+from inference_policy import inference_policy
+
+HEATMAP_DIR = os.environ.get("HEATMAP_DIR", "heatmaps")
+HEATMAP_BBOX = tuple(float(v) for v in os.environ.get("HEATMAP_BBOX", "13.60,100.35,13.95,100.75").split(","))
+HEATMAP_STEP = float(os.environ.get("HEATMAP_STEP", "0.005"))
+HEATMAP_MAX_CELLS = int(os.environ.get("HEATMAP_MAX_CELLS", "250000"))
+
+HOURS = 24
+HEATMAP_DTYPE = np.float16
+
+
+def parse_bbox(value):
+    """"min_lat,min_lon,max_lat,max_lon" เป็น tuple (ValueError ถ้าไม่ถูกต้อง)"""
+    parts = [float(v) for v in value.split(",")] if isinstance(value, str) else [float(v) for v in value]
+    if len(parts) != 4:
+        raise ValueError("bbox ต้องเป็น min_lat,min_lon,max_lat,max_lon")
+    min_lat, min_lon, max_lat, max_lon = parts
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("bbox ต้องมี min น้อยกว่าหรือเท่ากับ max")
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def _axis(start, stop, step):
+    # จำนวนจุดคำนวณจากการปัด เพื่อไม่ให้ floating point ทำให้จุดสุดท้ายหาย
+    return start + step * np.arange(int(round((stop - start) / step)) + 1)
+
+
+class HeatmapNotReadyError(RuntimeError):
+    """ยังไม่มี grid ที่ precompute เสร็จ (กำลังคำนวณอยู่ในเบื้องหลัง)"""
+
+
+class HeatmapStore:
+    """grid ความน่าจะเป็นที่รถติดต่อชั่วโมง (precompute ต่อ version ของโมเดล)"""
+
+    def __init__(self, root=HEATMAP_DIR, bbox=HEATMAP_BBOX, step=HEATMAP_STEP, schema=SCHEMA, max_cells=HEATMAP_MAX_CELLS):
+        self.root = root
+        self.bbox = parse_bbox(bbox)
+        self.step = float(step)
+        self.schema = schema
+        self.max_cells = int(max_cells)
+        self.latitudes = _axis(self.bbox[0], self.bbox[2], self.step)
+        self.longitudes = _axis(self.bbox[1], self.bbox[3], self.step)
+        self._lock = threading.Lock()
+        self._version = None
+        self._hours = None
+        self._pending = None
+        self._thread = None
+        self._error = None
+        self._precomputes = 0
+        self._last_seconds = None
+
+    def _key(self, model_version):
+        # การตั้งค่า grid และค่าเริ่มต้นของฟีเจอร์อยู่ใน key ด้วย: เปลี่ยนแล้วต้อง precompute ใหม่
+        raw = json.dumps([model_version, self.bbox, self.step, self.schema.defaults], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def feature_grid(self):
+        """feature matrix float32 (24 * n_lat * n_lon, n_features) เรียงตาม hour, latitude, longitude"""
+        n_lat, n_lon = len(self.latitudes), len(self.longitudes)
+        X = np.repeat(self.schema.extract_dict({}), HOURS * n_lat * n_lon, axis=0)
+        grid = X.reshape(HOURS, n_lat, n_lon, -1)
+        grid[..., self.schema.names.index("hour")] = np.arange(HOURS)[:, None, None]
+        grid[..., self.schema.names.index("latitude")] = self.latitudes[None, :, None]
+        grid[..., self.schema.names.index("longitude")] = self.longitudes[None, None, :]
+        return X
+
+    def precompute(self, model, model_version):
+        """ทำนายทั้ง grid ในครั้งเดียวแล้วเขียน hour_XX.npy + meta.json (แบบ atomic)"""
+        started = time.perf_counter()
+        X = self.feature_grid()
+        classes = list(model.classes_)
+        column = classes.index(1) if 1 in classes else len(classes) - 1
+        congestion = inference_policy.predict_proba(model, X)[:, column].astype(HEATMAP_DTYPE)
+        congestion = congestion.reshape(HOURS, len(self.latitudes), len(self.longitudes))
+
+        os.makedirs(self.root, exist_ok=True)
+        key = self._key(model_version)
+        tmp_dir = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            for hour in range(HOURS):
+                np.save(os.path.join(tmp_dir, f"hour_{hour:02d}.npy"), congestion[hour])
+            meta = {
+                "model_version": model_version,
+                "bbox": self.bbox,
+                "step": self.step,
+                "shape": [len(self.latitudes), len(self.longitudes)],
+                "features": self.schema.defaults,
+            }
+            with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            final_dir = os.path.join(self.root, key)
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(tmp_dir, final_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._precomputes += 1
+        self._last_seconds = round(time.perf_counter() - started, 4)
+        return final_dir
+
+    def _remove_stale(self, keep):
+        for name in os.listdir(self.root):
+            # .tmp- อาจเป็น precompute ที่กำลังเขียนอยู่ใน process อื่น
+            if name != keep and not name.startswith(".tmp-"):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def load(self, model, model_version):
+        """โหลด (หรือ precompute ถ้ายังไม่มี) grid ของ version นี้แบบ memory-mapped แล้วใช้แทน grid เดิม"""
+        key = self._key(model_version)
+        directory = os.path.join(self.root, key)
+        if not os.path.exists(os.path.join(directory, "meta.json")):
+            directory = self.precompute(model, model_version)
+        hours = [np.load(os.path.join(directory, f"hour_{hour:02d}.npy"), mmap_mode="r") for hour in range(HOURS)]
+        with self._lock:
+            self._hours, self._version = hours, model_version
+        self._remove_stale(keep=key)
+        return hours
+
+    def start(self, model, model_version):
+        """precompute grid ของ version นี้ใน thread เบื้องหลัง (ไม่ block ผู้เรียก)
+
+        เรียกซ้ำระหว่างที่กำลังคำนวณได้: thread จะทำเฉพาะ version ล่าสุดที่ได้รับต่อ
+        """
+        if model is None:
+            return
+        with self._lock:
+            self._pending = (model, model_version)
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="heatmap-precompute", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if pending is None:
+                    self._thread = None
+                    return
+            model, model_version = pending
+            if model_version == self._version:
+                continue
+            try:
+                self.load(model, model_version)
+                self._error = None
+            except Exception as e:
+                self._error = str(e)
+                print(f"[WARN] Heatmap precompute failed: {e}")
+
+    def wait(self, timeout=None):
+        """รอให้ precompute ที่เริ่มไว้เสร็จ (สำหรับ test / script)"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self._hours is not None
+
+    def query(self, hour, bbox=None):
+        """ส่วนของ grid ล่าสุดที่เสร็จแล้วในชั่วโมงที่ระบุที่อยู่ใน bbox คืน (latitudes, longitudes, congestion)"""
+        if not 0 <= hour < HOURS:
+            raise ValueError("hour ต้องอยู่ระหว่าง 0 ถึง 23")
+        min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox) if bbox is not None else self.bbox
+        hours = self._hours
+        if hours is None:
+            raise HeatmapNotReadyError("heatmap กำลัง precompute กรุณาลองใหม่ภายหลัง")
+        # ช่วง index ของจุด grid ที่อยู่ใน bbox (เผื่อ rounding เล็กน้อย)
+        eps = self.step * 1e-6
+        lat0, lat1 = np.searchsorted(self.latitudes, min_lat - eps), np.searchsorted(self.latitudes, max_lat + eps)
+        lon0, lon1 = np.searchsorted(self.longitudes, min_lon - eps), np.searchsorted(self.longitudes, max_lon + eps)
+        if (lat1 - lat0) * (lon1 - lon0) > self.max_cells:
+            raise ValueError(f"bbox ใหญ่เกินไป (สูงสุด {self.max_cells:,} ช่องต่อ query)")
+        return self.latitudes[lat0:lat1], self.longitudes[lon0:lon1], np.asarray(hours[hour][lat0:lat1, lon0:lon1])
+
+    def stats(self):
+        """ข้อมูลสำหรับ /health"""
+        return {
+            "root": self.root,
+            "bbox": self.bbox,
+            "step": self.step,
+            "shape": [len(self.latitudes), len(self.longitudes)],
+            "model_version": self._version,
+            "precomputing": self._thread is not None,
+            "error": self._error,
+            "precomputes": self._precomputes,
+            "last_precompute_seconds": self._last_seconds,
+        }
+
+
+if __name__ == "__main__":
+    from model_registry import registry, get_model, DEFAULT_MODEL_PATH
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL_PATH
+    model = get_model(path)
+    store = HeatmapStore()
+    store.load(model, registry.version(path))
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,155 @@
+"""
+Inference parallelism policy
+
+เลือกความขนานของแต่ละการเรียกโมเดลจากจำนวนแถวและจำนวน worker process:
+    - batch เล็ก (รวม request แถวเดียว) ใช้ n_jobs=1 ไม่เสียเวลา dispatch ของ joblib
+    - batch ใหญ่ใช้ thread ของ joblib ตามงบ CPU ของ process นี้ (CPU / จำนวน worker)
+      หารด้วยจำนวน batch ใหญ่ที่กำลังทำงานพร้อมกัน
+    - batch ไม่เกิน CODEGEN_MAX_ROWS แถวใช้โค้ดที่ generate (forest_codegen) ถ้ามี
+    - BLAS / OpenMP (threadpoolctl) ถูกจำกัดให้ไม่เกินงบ CPU ต่อ thread ของ inference pool
+      เพื่อไม่ให้หลาย worker / หลาย thread แย่ง core กัน
+
+n_jobs ที่ติดมากับโมเดลตอน train ถูกล้างเป็น None ตอนโหลด (prepare) เพื่อให้ policy เป็นผู้กำหนด
+ค่า joblib (parallel_config) เป็นของแต่ละ thread ส่วน threadpoolctl มีผลทั้ง process
+จึงตั้งเป็นค่าเดียวที่คงที่ ไม่สลับไปมาระหว่างการเรียก
+
+ตั้งค่าผ่าน environment variables:
+    PARALLEL_MIN_ROWS       จำนวนแถวขั้นต่ำที่ใช้หลาย thread (ค่าเริ่มต้น 20000)
+    PARALLEL_BACKEND        joblib backend (ค่าเริ่มต้น threading)
+    WEB_CONCURRENCY         จำนวน worker process ของ uvicorn / gunicorn (ค่าเริ่มต้น 1)
+    INFERENCE_MAX_THREADS   งบ thread ต่อ process (ค่าเริ่มต้น CPU / WEB_CONCURRENCY)
+    INFERENCE_BLAS_THREADS  จำนวน thread ของ BLAS / OpenMP (ค่าเริ่มต้น งบ / INFERENCE_POOL_SIZE)
+"""
+
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+try:
+    from joblib import parallel_config
+except ImportError:  # joblib < 1.3
+    try:
+        from joblib import parallel_backend as parallel_config
+    except ImportError:
+        parallel_config = None
+
+from forest_codegen import predict_proba_rows, codegen_for
+
+try:
+    from threadpoolctl import ThreadpoolController
+except ImportError:  # threadpoolctl เป็น optional dependency
+    ThreadpoolController = None
+
+PARALLEL_MIN_ROWS = int(os.environ.get("PARALLEL_MIN_ROWS", "20000"))
+PARALLEL_BACKEND = os.environ.get("PARALLEL_BACKEND", "threading")
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+
+class InferencePolicy:
+    """เลือก n_jobs / backend / จำนวน thread ของ BLAS ต่อการเรียกโมเดล"""
+
+    def __init__(self, min_parallel_rows=PARALLEL_MIN_ROWS, backend=PARALLEL_BACKEND, workers=WEB_CONCURRENCY,
+                 max_threads=None, blas_threads=None, pool_size=None):
+        cpus = os.cpu_count() or 1
+        self.min_parallel_rows = int(min_parallel_rows)
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        self.max_threads = max(1, int(max_threads or os.environ.get("INFERENCE_MAX_THREADS") or cpus // self.workers))
+        pool_size = int(pool_size or os.environ.get("INFERENCE_POOL_SIZE") or cpus)
+        self.blas_threads = max(1, int(blas_threads or os.environ.get("INFERENCE_BLAS_THREADS") or self.max_threads // max(1, pool_size)))
+
+        self._lock = threading.Lock()
+        self._controller = None
+        self._active_parallel = 0
+        self._calls = {"serial": 0, "parallel": 0}
+        self._codegen_calls = 0
+
+    def _limit_blas(self):
+        # สร้าง controller ครั้งแรกที่เรียกโมเดล (หลัง import numpy / scipy / sklearn แล้ว)
+        # การสร้างใหม่ทุกครั้งใช้เวลาหลายมิลลิวินาที
+        if self._controller is not None or ThreadpoolController is None:
+            return
+        with self._lock:
+            if self._controller is None:
+                controller = ThreadpoolController()
+                controller.limit(limits=self.blas_threads)
+                self._controller = controller
+
+    def plan(self, n_rows):
+        """n_jobs ของการเรียกที่มี n_rows แถว (ไม่นับการเรียกนี้ใน active)"""
+        if n_rows < self.min_parallel_rows or self.max_threads == 1:
+            return 1
+        return max(1, self.max_threads // (self._active_parallel + 1))
+
+    @contextmanager
+    def limit(self, n_rows):
+        """context รอบการเรียกโมเดลหนึ่งครั้ง (yield n_jobs ที่เลือก)"""
+        self._limit_blas()
+        with self._lock:
+            n_jobs = self.plan(n_rows)
+            parallel = n_jobs > 1
+            self._calls["parallel" if parallel else "serial"] += 1
+            if parallel:
+                self._active_parallel += 1
+        config = parallel_config(self.backend, n_jobs=n_jobs) if parallel_config is not None else nullcontext()
+        try:
+            with config:
+                yield n_jobs
+        finally:
+            if parallel:
+                with self._lock:
+                    self._active_parallel -= 1
+
+    def predict_proba(self, model, X):
+        """model.predict_proba(X) ภายใต้ policy (batch เล็กใช้โค้ดที่ generate ถ้ามี)"""
+        proba = predict_proba_rows(model, X)
+        if proba is not None:
+            with self._lock:
+                self._codegen_calls += 1
+            return proba
+        with self.limit(len(X)):
+            return model.predict_proba(X)
+
+    def predict(self, model, X):
+        """model.predict(X) ภายใต้ policy"""
+        proba = predict_proba_rows(model, X)
+        if proba is not None:
+            with self._lock:
+                self._codegen_calls += 1
+            return model.classes_.take(np.argmax(proba, axis=1), axis=0)
+        with self.limit(len(X)):
+            return model.predict(X)
+
+    def is_inline(self, model):
+        """การเรียกแถวเดียวเร็วพอจะรันใน event loop ได้เลย (มีโค้ดที่ generate)"""
+        return codegen_for(model) is not None
+
+    def prepare(self, model):
+        """ล้าง n_jobs ที่ติดมากับโมเดล ให้ policy เป็นผู้เลือก (คืน model เดิม)"""
+        if getattr(model, "n_jobs", None) is not None:
+            model.n_jobs = None
+        return model
+
+    def stats(self):
+        """ข้อมูลสำหรับ /health"""
+        with self._lock:
+            libraries = self._controller.info() if self._controller is not None else []
+            return {
+                "min_parallel_rows": self.min_parallel_rows,
+                "backend": self.backend,
+                "workers": self.workers,
+                "max_threads": self.max_threads,
+                "blas_threads": self.blas_threads,
+                "active_parallel_calls": self._active_parallel,
+                "calls": dict(self._calls),
+                "codegen_calls": self._codegen_calls,
+                "threadpools": [
+                    {"library": lib.get("internal_api"), "num_threads": lib.get("num_threads")} for lib in libraries
+                ],
+            }
+
+
+# policy เดียวที่ใช้ร่วมกันทั้ง process
+inference_policy = InferencePolicy()
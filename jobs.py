@@ -0,0 +1,192 @@
+"""
+Background batch jobs
+
+ให้ endpoint อัปโหลดคืน job id ทันที แล้วประมวลผลไฟล์เป็น chunk ใน background
+พร้อมสถานะ ความคืบหน้า (rows/sec, ETA) การยกเลิก และการจำกัดจำนวน job ที่รันพร้อมกัน
+
+ตั้งค่าผ่าน environment variables:
+    JOB_MAX_CONCURRENT  จำนวน job ที่รันพร้อมกันได้ (ค่าเริ่มต้น 1)
+    JOB_MAX_PENDING     จำนวน job ที่รอคิวได้สูงสุด (ค่าเริ่มต้น 16)
+    JOB_CHUNK_ROWS      จำนวนแถวต่อ chunk (ค่าเริ่มต้น 5000)
+    JOB_HISTORY         จำนวน job ที่เสร็จแล้วที่เก็บสถานะไว้ (ค่าเริ่มต้น 100)
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+
+JOB_CHUNK_ROWS = int(os.environ.get("JOB_CHUNK_ROWS", "5000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """job ถูกยกเลิกระหว่างประมวลผล"""
+
+
+class TooManyJobsError(RuntimeError):
+    """จำนวน job ที่รอคิวเกิน JOB_MAX_PENDING"""
+
+
+class Job:
+    """สถานะของ batch job หนึ่งงาน"""
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = QUEUED
+        self.total_rows = None
+        self.rows_done = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.result = None
+        self._cancel = threading.Event()
+        self.task = None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        """เรียกระหว่าง chunk เพื่อหยุดงานที่ถูกยกเลิก"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, rows_done, total_rows=None):
+        if total_rows is not None:
+            self.total_rows = total_rows
+        self.rows_done = rows_done
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        rows_per_sec = self.rows_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.status == RUNNING and self.total_rows is not None and rows_per_sec > 0:
+            eta = round((self.total_rows - self.rows_done) / rows_per_sec, 2)
+        data = {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "rows_done": self.rows_done,
+            "rows_per_sec": round(rows_per_sec, 1),
+            "eta_seconds": eta,
+            "elapsed_seconds": round(elapsed, 3),
+            "error": self.error,
+        }
+        if self.result is not None:
+            data.update(self.result)
+        return data
+
+
+class JobManager:
+    """จัดคิวและรัน job ใน event loop โดยจำกัดจำนวนที่รันพร้อมกัน"""
+
+    def __init__(self, max_concurrent=1, max_pending=16, history=100):
+        self.max_concurrent = int(max_concurrent)
+        self.max_pending = int(max_pending)
+        self.history = int(history)
+        self._jobs = OrderedDict()
+        # reference ของ task ที่ยังไม่จบ (event loop เก็บ task แบบ weak reference เท่านั้น)
+        self._tasks = set()
+        self._semaphore = None
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def _trim_history(self):
+        # job ที่ถูกยกเลิกระหว่างรอคิวมีสถานะ cancelled ก่อน task จบ: ลบเฉพาะ job ที่ task จบแล้ว
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED and (job.task is None or job.task.done())
+        ]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def submit(self, filename, runner, cleanup=None):
+        """สร้าง job ใหม่และเริ่มรัน runner(job) ใน background
+
+        runner เป็น coroutine function ที่คืน dict ผลลัพธ์ และเรียก job.progress()
+        / job.check_cancelled() ระหว่างประมวลผล; cleanup() ถูกเรียกเสมอเมื่อจบ
+        """
+        if self._pending() >= self.max_pending:
+            raise TooManyJobsError(f"มี job รอคิวครบ {self.max_pending} งานแล้ว")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        job = Job(filename)
+        self._jobs[job.id] = job
+        self._trim_history()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, runner, cleanup))
+        self._tasks.add(job.task)
+        job.task.add_done_callback(self._task_done)
+        return job
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        self._trim_history()
+
+    async def _run(self, job, runner, cleanup):
+        try:
+            async with self._semaphore:
+                job.check_cancelled()
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await runner(job)
+                job.status = COMPLETED
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if cleanup is not None:
+                cleanup()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """ขอยกเลิก job (job ที่กำลังรันจะหยุดเมื่อจบ chunk ปัจจุบัน)"""
+        job = self._jobs.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job.cancel()
+            if job.status == QUEUED:
+                # ยังรอคิวอยู่: แสดงสถานะยกเลิกทันที (task จะจบเองเมื่อได้คิวและ cleanup ไฟล์)
+                job.status = CANCELLED
+        return job
+
+    def stats(self):
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "chunk_rows": JOB_CHUNK_ROWS,
+            "jobs": counts,
+            "live_tasks": len(self._tasks),
+        }
+
+
+job_manager = JobManager(
+    max_concurrent=int(os.environ.get("JOB_MAX_CONCURRENT", "1")),
+    max_pending=int(os.environ.get("JOB_MAX_PENDING", "16")),
+    history=int(os.environ.get("JOB_HISTORY", "100")),
+)
@@ -0,0 +1,352 @@
+"""
+Model registry สำหรับ Traffic Congestion Predictor
+
+โหลดไฟล์โมเดลแต่ละไฟล์เพียงครั้งเดียวต่อ process แล้วแชร์ reference เดียวกัน
+(jam_model และ day_model ที่ชี้ไปยัง rf_model.pkl จะเป็น object เดียวกัน)
+
+backend "sklearn" (ค่าเริ่มต้น) โหลดด้วย joblib.load ตามปกติ แต่ละ worker จึงมีสำเนาของ
+forest เป็นของตัวเอง (Tree.__setstate__ ของ sklearn คัดลอก node arrays เสมอ การโหลดจาก
+สำเนา joblib แบบ mmap จึงไม่ช่วยให้ worker ใช้หน่วยความจำร่วมกัน)
+
+การแชร์ node arrays ระหว่าง worker ผ่าน page cache ต้องใช้ backend "compiled" ซึ่งเก็บ
+node arrays ของ forest เป็นไฟล์ .npy ใน models/.mmap/ และโหลดแบบ memory-map
+(MODEL_MMAP=1) โดยไม่ต้องสร้าง sklearn object ใน worker เลย
+backend "compact" เหมือน "compiled" แต่ใช้ dtype ขนาดเล็ก (float32 threshold, index
+ขนาดเล็กที่สุด, leaf value ตาม COMPACT_VALUE_DTYPE) และผ่าน check_equivalence ก่อนใช้งาน
+
+ทุก backend มีโค้ด if / else ที่ generate จาก forest (forest_codegen) เก็บใน models/.mmap/
+สำหรับการทำนายแถวเดียว (CODEGEN_ENABLED=0 เพื่อปิด)
+
+Hot reload: watcher thread ตรวจ fingerprint ของ artifact ที่ watch ไว้ทุก MODEL_RELOAD_INTERVAL
+วินาที เมื่อไฟล์เปลี่ยนและนิ่งแล้ว (fingerprint เดิมสองรอบติดกัน) จะโหลดเวอร์ชันใหม่ในเบื้องหลัง
+ทดสอบด้วย batch สังเคราะห์ (self_test) แล้วสลับ entry ในครั้งเดียว จากนั้นแจ้ง listener
+(เช่น app ที่ผูกโมเดลไว้กับตัวแปร global) request ที่กำลังทำงานยังใช้โมเดลเดิมจนจบ
+"""
+
+import os
+import sys
+import shutil
+import time
+import threading
+
+import joblib
+import numpy as np
+
+import forest_codegen
+from inference_policy import inference_policy
+
+DEFAULT_MODEL_PATH = os.environ.get("MODEL_PATH", "models/rf_model.pkl")
+
+# "sklearn" (ค่าเริ่มต้น), "compiled" หรือ "compact" (forest_engine.CompiledForest)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "sklearn")
+
+# dtype ของ leaf value สำหรับ backend "compact": "float32" หรือ "uint16"
+COMPACT_VALUE_DTYPE = os.environ.get("COMPACT_VALUE_DTYPE", "float32")
+
+# ช่วงเวลาตรวจไฟล์โมเดลเพื่อ hot reload เป็นวินาที (0 = ปิด)
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "5"))
+
+# จำนวนแถวของ batch สังเคราะห์ที่ใช้ทดสอบโมเดลใหม่ก่อนสลับ
+MODEL_SELF_TEST_ROWS = int(os.environ.get("MODEL_SELF_TEST_ROWS", "256"))
+
+# เวลาเริ่มต้นของ process (โดยประมาณ: ตอน import module นี้)
+_STARTED_AT = time.perf_counter()
+
+
+def rss_bytes():
+    """Resident memory ของ process ปัจจุบัน (None ถ้าวัดไม่ได้บนระบบนี้)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss เป็นค่า peak: หน่วย KB บน Linux และ bytes บน macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def artifact_fingerprint(path):
+    """Fingerprint ของไฟล์โมเดลจากขนาดและเวลาแก้ไขล่าสุด"""
+    st = os.stat(path)
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def self_test(model, reference=None, n_rows=MODEL_SELF_TEST_ROWS):
+    """ทดสอบโมเดลที่เพิ่งโหลดด้วย batch สังเคราะห์ (ValueError ถ้าใช้แทน reference ไม่ได้)
+
+    batch นี้ทำหน้าที่ warm-up ของโมเดลใหม่ก่อนรับ request จริงไปด้วย
+    """
+    n_features = getattr(model, "n_features_in_", None)
+    if reference is not None:
+        if n_features != getattr(reference, "n_features_in_", None):
+            raise ValueError(f"จำนวนฟีเจอร์ ({n_features}) ไม่ตรงกับโมเดลเดิม ({reference.n_features_in_})")
+        if not np.array_equal(model.classes_, reference.classes_):
+            raise ValueError(f"classes {list(model.classes_)} ไม่ตรงกับโมเดลเดิม {list(reference.classes_)}")
+    X = np.random.default_rng(0).normal(scale=100.0, size=(n_rows, n_features)).astype(np.float32)
+    started = time.perf_counter()
+    proba = inference_policy.predict_proba(model, X)
+    if proba.shape != (n_rows, len(model.classes_)) or not np.isfinite(proba).all() or not np.allclose(proba.sum(axis=1), 1.0):
+        raise ValueError("ผลของ self-test ไม่ใช่ความน่าจะเป็นที่ถูกต้อง")
+    # เส้นทางแถวเดียว (รวมโค้ดที่ generate) ด้วย
+    inference_policy.predict_proba(model, X[:1])
+    return {"rows": n_rows, "seconds": round(time.perf_counter() - started, 4)}
+
+
+class ModelRegistry:
+    """เก็บโมเดลที่โหลดแล้ว โดยใช้ absolute path เป็น key"""
+
+    def __init__(self, mmap_mode="r"):
+        self.mmap_mode = mmap_mode
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._startup_seconds = None
+
+        # hot reload
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+        self._watched = {}
+        self._pending = {}
+        self._failed = {}
+        self._watcher = None
+
+    def _cache_path(self, path, fingerprint, suffix):
+        """path ของไฟล์ cache ใน models/.mmap/ สำหรับ artifact เวอร์ชันนี้"""
+        directory, filename = os.path.split(path)
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(directory, ".mmap", f"{stem}.{fingerprint}.{suffix}")
+
+    def _remove_stale(self, cache_path):
+        """ลบสำเนาของ artifact เวอร์ชันเก่า (เฉพาะชนิดเดียวกับ cache_path)"""
+        directory = os.path.dirname(cache_path)
+        stem, _, suffix = os.path.basename(cache_path).rsplit(".", 2)
+        prefix = stem + "."
+        for name in os.listdir(directory):
+            stale = os.path.join(directory, name)
+            if name.startswith(prefix) and name.endswith("." + suffix) and stale != cache_path:
+                try:
+                    if os.path.isdir(stale):
+                        shutil.rmtree(stale)
+                    else:
+                        os.remove(stale)
+                except OSError:
+                    pass
+
+    def _load_compiled(self, path, fingerprint, value_dtype=None):
+        """โหลด CompiledForest จาก .npy cache (compile จาก sklearn model ถ้ายังไม่มี)
+
+        value_dtype ไม่ใช่ None = รูปแบบ compact ซึ่งต้องเท่ากับโมเดลเดิมตาม check_equivalence
+        """
+        from forest_engine import CompiledForest, check_equivalence, compaction_report
+
+        suffix = "forest" if value_dtype is None else f"compact-{value_dtype}"
+        cache_path = self._cache_path(path, fingerprint, suffix)
+        if not os.path.isdir(cache_path):
+            sklearn_model = joblib.load(path)
+            compiled = CompiledForest.from_sklearn(sklearn_model)
+            if value_dtype is not None:
+                compact = compiled.compact(value_dtype)
+                equivalence = check_equivalence(sklearn_model, compact)
+                if not equivalence["equivalent"]:
+                    print(f"[WARN] Compact forest for {path} is not equivalent ({equivalence}); using full compiled forest")
+                    return compiled, None
+                report = compaction_report(sklearn_model, compact)
+                print(f"[OK] Compact forest for {path}: {report['saved_bytes']:,} bytes saved ({report['saved_percent']}%)")
+                compiled = compact
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                compiled.save(cache_path)
+            except OSError as e:
+                print(f"[WARN] Cannot write compiled forest cache for {path}: {e}")
+                return compiled, None
+            self._remove_stale(cache_path)
+        return CompiledForest.load(cache_path, mmap_mode=self.mmap_mode), cache_path
+
+    def _load(self, path, backend):
+        fingerprint = artifact_fingerprint(path)
+        if backend == "compiled":
+            model, cache_path = self._load_compiled(path, fingerprint)
+        elif backend == "compact":
+            model, cache_path = self._load_compiled(path, fingerprint, COMPACT_VALUE_DTYPE)
+        elif backend != "sklearn":
+            raise ValueError(f"Unknown inference backend: {backend}")
+        else:
+            model, cache_path = joblib.load(path), None
+            # สำเนา .joblib แบบ mmap จากเวอร์ชันก่อน (ไม่ได้ใช้แล้ว)
+            if os.path.isdir(os.path.join(os.path.dirname(path), ".mmap")):
+                self._remove_stale(self._cache_path(path, fingerprint, "joblib"))
+        # n_jobs ของแต่ละการเรียกถูกเลือกโดย inference_policy
+        return inference_policy.prepare(model), fingerprint, cache_path
+
+    def _load_codegen(self, path, fingerprint, model):
+        """สร้าง / โหลดโค้ดที่ generate ของโมเดลแล้วผูกกับ model (คืน path ของไฟล์หรือ None)"""
+        if not forest_codegen.CODEGEN_ENABLED:
+            return None
+        cache_path = self._cache_path(path, fingerprint, "codegen")
+        exists = os.path.exists(cache_path)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            codegen = forest_codegen.load_or_generate(model, cache_path, fingerprint)
+        except (OSError, AttributeError, ValueError) as e:
+            # เช่น โมเดลไม่ใช่ forest ของ sklearn
+            print(f"[WARN] Cannot generate forest code for {path}: {e}")
+            return None
+        if codegen is None:
+            return None
+        if not exists:
+            self._remove_stale(cache_path)
+        forest_codegen.register(model, codegen)
+        return cache_path
+
+    def _build_entry(self, path, backend):
+        started = time.perf_counter()
+        rss_before = rss_bytes()
+        model, fingerprint, cache_path = self._load(path, backend)
+        codegen_path = self._load_codegen(path, fingerprint, model)
+        rss_after = rss_bytes()
+        return {
+            "model": model,
+            "path": path,
+            "backend": backend,
+            "version": fingerprint,
+            "mmap_path": cache_path,
+            "codegen_path": codegen_path,
+            "loaded_at": time.time(),
+            "load_seconds": round(time.perf_counter() - started, 4),
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            "reloads": 0,
+        }
+
+    def get(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """คืนโมเดลจาก path โดยโหลดจริงเพียงครั้งแรก (ต่อ backend, None ใช้ค่าจาก INFERENCE_BACKEND)"""
+        backend = backend or INFERENCE_BACKEND
+        key = (os.path.abspath(path), backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = self._build_entry(path, backend)
+            return entry["model"]
+
+    def reload(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """โหลด artifact ใหม่ ทดสอบ แล้วสลับเข้าแทนของเดิมในครั้งเดียว (คืน model ใหม่)
+
+        ระหว่างโหลดยังใช้โมเดลเดิมได้ตามปกติ ถ้าโหลดหรือ self-test ไม่ผ่านจะ raise และไม่สลับ
+        """
+        backend = backend or INFERENCE_BACKEND
+        key = (os.path.abspath(path), backend)
+        with self._reload_lock:
+            previous = self._entries.get(key)
+            entry = self._build_entry(path, backend)
+            entry["self_test"] = self_test(entry["model"], previous["model"] if previous is not None else None)
+            entry["reloads"] = previous["reloads"] + 1 if previous is not None else 0
+            with self._lock:
+                self._entries[key] = entry
+            for listener in list(self._listeners):
+                listener(path, backend, entry["model"])
+        return entry["model"]
+
+    def subscribe(self, listener):
+        """listener(path, backend, model) ถูกเรียกหลังสลับโมเดลใหม่เข้าไปแล้ว"""
+        self._listeners.append(listener)
+
+    def watch(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """ให้ watcher ตรวจ artifact นี้ (รวมถึง path ที่ยังโหลดไม่สำเร็จ เช่น ไฟล์ยังไม่มี)"""
+        backend = backend or INFERENCE_BACKEND
+        self._watched[(os.path.abspath(path), backend)] = (path, backend)
+
+    def check_for_updates(self):
+        """reload artifact ที่ watch ไว้ซึ่ง fingerprint เปลี่ยนและนิ่งแล้ว คืนรายการ path ที่ reload"""
+        reloaded = []
+        for key, (path, backend) in list(self._watched.items()):
+            try:
+                fingerprint = artifact_fingerprint(path)
+            except OSError:
+                continue
+            entry = self._entries.get(key)
+            if (entry is not None and entry["version"] == fingerprint) or self._failed.get(key) == fingerprint:
+                self._pending.pop(key, None)
+                continue
+            # ไฟล์อาจกำลังถูกเขียนอยู่: รอจน fingerprint เหมือนเดิมในการตรวจรอบถัดไป
+            if self._pending.get(key) != fingerprint:
+                self._pending[key] = fingerprint
+                continue
+            del self._pending[key]
+            try:
+                self.reload(path, backend)
+            except Exception as e:
+                self._failed[key] = fingerprint
+                print(f"[WARN] Cannot reload model {path} ({fingerprint}): {e}")
+                continue
+            print(f"[OK] Reloaded model {path} ({fingerprint})")
+            reloaded.append(path)
+        return reloaded
+
+    def start_watcher(self, interval=MODEL_RELOAD_INTERVAL):
+        """เริ่ม thread ที่เรียก check_for_updates ทุก interval วินาที (ครั้งเดียวต่อ process)"""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_updates()
+                except Exception as e:
+                    print(f"[WARN] Model watcher: {e}")
+
+        self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def describe(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """version / เวลาโหลดของโมเดลที่ใช้อยู่ (None ถ้ายังไม่ได้โหลด)"""
+        entry = self._entries.get((os.path.abspath(path), backend or INFERENCE_BACKEND))
+        if entry is None:
+            return None
+        return {k: entry.get(k) for k in ("version", "loaded_at", "load_seconds", "reloads", "self_test")}
+
+    def version_headers(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """header ที่บอก version และเวลาโหลดของโมเดล สำหรับแนบกับทุก response"""
+        entry = self._entries.get((os.path.abspath(path), backend or INFERENCE_BACKEND))
+        if entry is None:
+            return {}
+        return {"X-Model-Version": entry["version"], "X-Model-Loaded-At": f'{entry["loaded_at"]:.3f}'}
+
+    def version(self, path=DEFAULT_MODEL_PATH, backend=None):
+        """Fingerprint ของ artifact ที่โหลดอยู่ (None ถ้ายังไม่ได้โหลด)"""
+        entry = self._entries.get((os.path.abspath(path), backend or INFERENCE_BACKEND))
+        return entry["version"] if entry is not None else None
+
+    def mark_startup_complete(self):
+        """บันทึกเวลาที่ใช้ตั้งแต่เริ่ม process จนโหลดโมเดลเสร็จ"""
+        self._startup_seconds = round(time.perf_counter() - _STARTED_AT, 4)
+
+    def info(self):
+        """ข้อมูลสำหรับ /health"""
+        with self._lock:
+            models = {
+                f'{entry["path"]} ({entry["backend"]})': {k: v for k, v in entry.items() if k not in ("model", "path")}
+                for entry in self._entries.values()
+            }
+        return {
+            "startup_seconds": self._startup_seconds,
+            "rss_bytes": rss_bytes(),
+            "mmap_mode": self.mmap_mode,
+            "inference_backend": INFERENCE_BACKEND,
+            "reload_interval_seconds": MODEL_RELOAD_INTERVAL if self._watcher is not None else None,
+            "models": models,
+        }
+
+
+# Registry ที่ใช้ร่วมกันทั้ง process (MODEL_MMAP=0 เพื่อปิด memory-mapping)
+registry = ModelRegistry(mmap_mode="r" if os.environ.get("MODEL_MMAP", "1") == "1" else None)
+
+
+def get_model(path=DEFAULT_MODEL_PATH, backend=None):
+    """โหลด (หรือคืน reference ที่โหลดไว้แล้ว) ของโมเดลจาก registry กลาง
+
+    backend=None ใช้ค่าจาก INFERENCE_BACKEND
+    """
+    return registry.get(path, backend)
@@ -0,0 +1,183 @@
+"""
+Prediction result cache
+
+LRU + TTL cache ในหน่วยความจำ สำหรับผลการทำนายแบบแถวเดียว โดยใช้ feature vector
+ที่ถูก quantize (ปัดทศนิยมตามที่กำหนดต่อฟีเจอร์) เป็น key เมื่อเปิดใช้งาน
+โมเดลจะทำนายจาก feature ที่ quantize แล้ว ผลลัพธ์ของ key เดียวกันจึงเหมือนกันเสมอ
+
+ปิดไว้เป็นค่าเริ่มต้น: เมื่อเปิด ผลของ endpoint แถวเดียวอาจต่างจาก /predict/batch สำหรับ
+input เดียวกัน (เช่น speed ถูกปัดเป็นจำนวนเต็มแล้วข้าม threshold ของ split)
+
+ตั้งค่าผ่าน environment variables:
+    PREDICTION_CACHE_SIZE      จำนวน entry สูงสุด (ค่าเริ่มต้น 0 = ปิดใช้งาน)
+    PREDICTION_CACHE_TTL       อายุของ entry เป็นวินาที (ค่าเริ่มต้น 60)
+    PREDICTION_CACHE_DECIMALS  JSON ของจำนวนทศนิยมต่อฟีเจอร์ เช่น {"latitude": 4, "speed": 0}
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from batch_engine import FEATURE_NAMES, predict_pair
+from coalescer import predict_one_async
+from executors import run_inference
+from inference_policy import inference_policy
+
+# lat/lon 4 ตำแหน่ง (~11 m), speed 1 km/h
+DEFAULT_DECIMALS = {
+    "latitude": 4,
+    "longitude": 4,
+    "density": 1,
+    "volume": 0,
+    "capacity": 0,
+    "hour": 0,
+    "speed": 0,
+    "vc_ratio": 3,
+}
+
+
+class PredictionCache:
+    """LRU/TTL cache ที่ล้างตัวเองเมื่อ version ของโมเดลเปลี่ยน"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=60.0, decimals=None, version_fn=None):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.decimals = dict(DEFAULT_DECIMALS, **(decimals or {}))
+        self.version_fn = version_fn
+        self._scale = np.array([10.0 ** self.decimals[name] for name in FEATURE_NAMES])
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def quantize(self, features):
+        """ปัด feature vector (1, 8) ตามจำนวนทศนิยมที่ตั้งไว้"""
+        # + 0.0 เปลี่ยน -0.0 เป็น 0.0 เพื่อให้ key ตรงกัน
+        return np.round(np.asarray(features, dtype=np.float64) * self._scale) / self._scale + 0.0
+
+    def _check_version(self):
+        # เรียกภายใต้ self._lock
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key):
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "decimals": self.decimals,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "model_version": self._version,
+            }
+
+
+def cache_from_env(version_fn=None):
+    """สร้าง PredictionCache จาก environment variables (None ถ้าไม่ได้ตั้ง PREDICTION_CACHE_SIZE > 0)"""
+    max_entries = int(os.environ.get("PREDICTION_CACHE_SIZE", "0"))
+    if max_entries <= 0:
+        return None
+    return PredictionCache(
+        max_entries=max_entries,
+        ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL", "60")),
+        decimals=json.loads(os.environ.get("PREDICTION_CACHE_DECIMALS", "{}")),
+        version_fn=version_fn,
+    )
+
+
+async def cached_predict_async(cache, name, model, batcher, features):
+    """ทำนายแถวเดียวผ่าน cache: คืน (label, proba) เหมือน predict_one_async"""
+    if cache is None:
+        return await predict_one_async(model, batcher, features)
+    features = cache.quantize(features)
+    # id ของโมเดลอยู่ใน key: request ที่ยังใช้โมเดลเดิมระหว่าง hot reload ไม่ปนกับผลของโมเดลใหม่
+    key = (name, id(model), features.tobytes())
+    result = cache.get(key)
+    if result is None:
+        result = await predict_one_async(model, batcher, features)
+        cache.put(key, result)
+    return result
+
+
+def _first_row(pred, proba):
+    return pred[0], (proba[0] if proba is not None else None)
+
+
+async def cached_predict_both_async(cache, jam_model, day_model, jam_batcher, day_batcher, features):
+    """ทำนายทั้งสองโมเดลจาก feature vector เดียวผ่าน cache คืน ((label, proba), (label, proba))
+
+    cache เก็บผลของทั้งสองโมเดลไว้ใน entry เดียว ถ้าไม่ได้เปิด micro-batching จะทำนาย
+    ทั้งคู่ในงานเดียวของ inference pool (predict_pair)
+    """
+    key = None
+    if cache is not None:
+        features = cache.quantize(features)
+        key = ("both", id(jam_model), id(day_model), features.tobytes())
+        result = cache.get(key)
+        if result is not None:
+            return result
+    if inference_policy.is_inline(jam_model) and inference_policy.is_inline(day_model):
+        # โค้ดที่ generate ใช้เวลาระดับไมโครวินาที: ทำนายใน event loop ไม่ต้องผ่าน pool
+        jam_pred, jam_proba, day_pred, day_proba = predict_pair(features, jam_model, day_model)
+        result = (_first_row(jam_pred, jam_proba), _first_row(day_pred, day_proba))
+    elif jam_batcher is None and day_batcher is None:
+        jam_pred, jam_proba, day_pred, day_proba = await run_inference(predict_pair, features, jam_model, day_model)
+        result = (_first_row(jam_pred, jam_proba), _first_row(day_pred, day_proba))
+    else:
+        jam = await predict_one_async(jam_model, jam_batcher, features)
+        day = jam if day_model is jam_model else await predict_one_async(day_model, day_batcher, features)
+        result = (jam, day)
+    if key is not None:
+        cache.put(key, result)
+    return result
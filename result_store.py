@@ -0,0 +1,209 @@
+"""
+Content-addressed result store
+
+เก็บไฟล์ผลลัพธ์ของ batch prediction โดยใช้ key จาก hash ของไฟล์ที่อัปโหลด
++ version ของโมเดล + รูปแบบไฟล์ผลลัพธ์ การอัปโหลดไฟล์เดิมซ้ำจึงได้ผลลัพธ์เดิมทันที
+โดยไม่ต้องประมวลผลใหม่ และผู้ใช้สองคนที่อัปโหลดไฟล์ชื่อเดียวกันจะไม่เขียนทับกัน
+
+แต่ละ entry มีไฟล์ผลลัพธ์ <key><ext> และ metadata <key>.json (สรุปผลสำหรับ response)
+entry ที่อายุเกิน TTL ถูกลบ และถ้าขนาดรวมเกินงบจะลบ entry ที่ถูกใช้ล่าสุดนานที่สุดก่อน (LRU)
+โฟลเดอร์นี้ต้องอยู่นอก static/ เพื่อให้ไฟล์ผลลัพธ์ออกได้ทาง /download เท่านั้น (ผ่าน TTL / การลบ)
+จำนวน entry และขนาดรวมนับสะสมไว้ในหน่วยความจำ /health จึงไม่ต้องอ่านโฟลเดอร์ทุกครั้ง
+
+ตั้งค่าผ่าน environment variables:
+    RESULT_STORE_DIR        โฟลเดอร์เก็บผลลัพธ์ (ค่าเริ่มต้น results)
+    RESULT_STORE_MAX_BYTES  ขนาดรวมสูงสุด (ค่าเริ่มต้น 1 GB)
+    RESULT_STORE_TTL        อายุของผลลัพธ์เป็นวินาที (ค่าเริ่มต้น 86400)
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+RESULT_STORE_DIR = os.environ.get("RESULT_STORE_DIR", "results")
+RESULT_STORE_MAX_BYTES = int(os.environ.get("RESULT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+RESULT_STORE_TTL = float(os.environ.get("RESULT_STORE_TTL", "86400"))
+
+# ชื่อไฟล์ที่ /download รับได้: <key 32 hex><ext>
+_FILENAME_RE = re.compile(r"^([0-9a-f]{32})(\.[a-z0-9.]+)$")
+
+
+def result_key(upload_digest, model_version, output_format):
+    """key ของผลลัพธ์: hash ของไฟล์ที่อัปโหลด + version ของโมเดล + รูปแบบผลลัพธ์"""
+    raw = f"{upload_digest}:{model_version}:{output_format}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class ResultStore:
+    """ไฟล์ผลลัพธ์บนดิสก์พร้อมงบขนาด / TTL และการลบแบบ LRU"""
+
+    def __init__(self, root=RESULT_STORE_DIR, max_bytes=RESULT_STORE_MAX_BYTES, ttl_seconds=RESULT_STORE_TTL):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        # ตัวนับสะสมของ stats() (ตั้งจากการอ่านโฟลเดอร์ครั้งเดียว และปรับใหม่ทุกครั้งที่ evict)
+        entries = self._entries()
+        self._count = len(entries)
+        self._total_bytes = sum(entry[3] for entry in entries)
+
+    def _meta_path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _expired(self, meta):
+        return time.time() - meta["created_at"] > self.ttl_seconds
+
+    def _touch(self, key):
+        # mtime ของ metadata = เวลาที่ใช้ล่าสุด (สำหรับ LRU)
+        try:
+            os.utime(self._meta_path(key))
+        except OSError:
+            pass
+
+    def _file_size(self, meta):
+        try:
+            return os.path.getsize(os.path.join(self.root, meta["filename"]))
+        except OSError:
+            return 0
+
+    def _remove(self, key, meta):
+        # เรียกภายใต้ self._lock
+        size = self._file_size(meta)
+        try:
+            os.remove(os.path.join(self.root, meta["filename"]))
+        except OSError:
+            pass
+        try:
+            os.remove(self._meta_path(key))
+        except OSError:
+            return
+        self._count -= 1
+        self._total_bytes -= size
+
+    def lookup(self, key):
+        """metadata ของผลลัพธ์ที่มีอยู่แล้ว (None ถ้าไม่มีหรือหมดอายุ)"""
+        with self._lock:
+            meta = self._read_meta(key)
+            if meta is not None and self._expired(meta):
+                self._remove(key, meta)
+                meta = None
+            if meta is None or not os.path.exists(os.path.join(self.root, meta["filename"])):
+                self._misses += 1
+                return None
+            self._touch(key)
+            self._hits += 1
+            return meta
+
+    def temp_path(self, ext):
+        """path ชั่วคราวใน store สำหรับ writer (ย้ายเข้าที่ด้วย commit)"""
+        return os.path.join(self.root, f".tmp-{uuid.uuid4().hex}{ext}")
+
+    def commit(self, key, ext, temp_path, summary):
+        """ย้ายไฟล์ที่เขียนเสร็จแล้วเข้า store แบบ atomic แล้วคืน metadata"""
+        filename = f"{key}{ext}"
+        meta = dict(summary, key=key, filename=filename, created_at=time.time())
+        meta_tmp = self.temp_path(".json")
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        with self._lock:
+            previous = self._read_meta(key)
+            if previous is not None:
+                # key เดิมถูกเขียนซ้ำ (เช่น สอง request อัปโหลดไฟล์เดียวกันพร้อมกัน)
+                self._count -= 1
+                self._total_bytes -= self._file_size(previous)
+            os.replace(temp_path, os.path.join(self.root, filename))
+            os.replace(meta_tmp, self._meta_path(key))
+            self._count += 1
+            self._total_bytes += self._file_size(meta)
+        self.evict(keep=key)
+        return meta
+
+    def resolve(self, filename):
+        """path ของไฟล์ผลลัพธ์สำหรับ /download (None ถ้าไม่มี หมดอายุ หรือชื่อไม่ถูกต้อง)"""
+        match = _FILENAME_RE.match(filename)
+        if match is None:
+            return None
+        meta = self.lookup(match.group(1))
+        if meta is None or meta["filename"] != filename:
+            return None
+        return os.path.join(self.root, filename)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.startswith(".tmp-"):
+                # ไฟล์ชั่วคราวที่ค้างจากงานที่ล้มเหลว
+                path = os.path.join(self.root, name)
+                try:
+                    if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            try:
+                size = os.path.getsize(os.path.join(self.root, meta["filename"]))
+                last_used = os.path.getmtime(self._meta_path(key))
+            except OSError:
+                size, last_used = 0, 0.0
+            entries.append((last_used, key, meta, size))
+        return entries
+
+    def evict(self, keep=None):
+        """ลบ entry ที่หมดอายุ แล้วลบแบบ LRU จนขนาดรวมไม่เกิน max_bytes (ยกเว้น key ที่ keep)"""
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                if self._expired(entry[2]):
+                    self._remove(entry[1], entry[2])
+                    self._evictions += 1
+                else:
+                    entries.append(entry)
+            entries.sort()
+            total = sum(entry[3] for entry in entries)
+            for _, key, meta, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                self._remove(key, meta)
+                self._evictions += 1
+                total -= size
+            # ปรับตัวนับให้ตรงกับดิสก์ (เผื่อไฟล์ถูกลบจากภายนอก)
+            kept = [entry for entry in entries if os.path.exists(self._meta_path(entry[1]))]
+            self._count = len(kept)
+            self._total_bytes = sum(entry[3] for entry in kept)
+
+    def stats(self):
+        """ข้อมูลสำหรับ /health (จากตัวนับ ไม่อ่านโฟลเดอร์)"""
+        with self._lock:
+            return {
+                "root": self.root,
+                "entries": self._count,
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
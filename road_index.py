@@ -0,0 +1,256 @@
+"""
+Road segment spatial index
+
+snap พิกัด GPS ของแต่ละ request เข้ากับถนน / ทางแยกที่ติดตามอยู่ที่ใกล้ที่สุด (ภายในระยะที่กำหนด)
+แล้วแทน latitude / longitude ด้วยจุดอ้างอิงของ segment นั้น และเติมฟีเจอร์ที่ไม่ได้ส่งมา
+(เช่น capacity) จากข้อมูลของ segment ทำให้ feature vector ซ้ำกันบ่อยขึ้นจน cache / precompute ได้
+
+segment ถูกแบ่งเป็นจุดตัวอย่างทุก ROAD_SNAP_SPACING_M เมตร แล้วสร้าง KD-tree (scipy cKDTree)
+บนพิกัดที่ project เป็นเมตร (equirectangular รอบจุดกึ่งกลางของข้อมูล) snap ทั้ง batch ได้ใน query เดียว
+ถ้าไม่ได้ติดตั้ง scipy จะคำนวณระยะด้วย NumPy แทน (ช้ากว่าแต่ผลเหมือนกัน)
+
+ไฟล์ segment เป็น JSON:
+    {"segments": [
+        {"id": "rama4-01", "name": "ถนนพระราม 4", "points": [[13.7300, 100.5300], [13.7280, 100.5400]],
+         "defaults": {"capacity": 2400}},
+        {"id": "asok", "name": "แยกอโศก", "latitude": 13.7370, "longitude": 100.5603}
+    ]}
+หรือ CSV หนึ่งแถวต่อจุด (id, name, latitude, longitude; คอลัมน์ที่ตรงกับชื่อฟีเจอร์ใช้เป็นค่าเริ่มต้น)
+
+ตั้งค่าผ่าน environment variables:
+    ROAD_SEGMENTS_PATH     ไฟล์ segment (ค่าเริ่มต้น models/road_segments.json; ไม่มีไฟล์ = ปิดใช้งาน)
+    ROAD_SNAP_TOLERANCE_M  ระยะสูงสุดที่ snap ได้เป็นเมตร (ค่าเริ่มต้น 100)
+    ROAD_SNAP_SPACING_M    ระยะห่างของจุดตัวอย่างบน segment เป็นเมตร (ค่าเริ่มต้น 20)
+    ROAD_SNAP              0 เพื่อปิดการ snap แม้มีไฟล์
+"""
+
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import SCHEMA
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy เป็น optional dependency
+    cKDTree = None
+
+ROAD_SEGMENTS_PATH = os.environ.get("ROAD_SEGMENTS_PATH", os.path.join("models", "road_segments.json"))
+ROAD_SNAP_TOLERANCE_M = float(os.environ.get("ROAD_SNAP_TOLERANCE_M", "100"))
+ROAD_SNAP_SPACING_M = float(os.environ.get("ROAD_SNAP_SPACING_M", "20"))
+
+# เมตรต่อองศา latitude (ใช้ค่าเดียวทั้งเมือง ความคลาดเคลื่อนน้อยมากในระยะไม่กี่สิบกิโลเมตร)
+METERS_PER_DEGREE = 111320.0
+
+# จำนวนคู่ (จุด, จุดตัวอย่าง) สูงสุดต่อรอบในโหมด NumPy
+_BRUTE_FORCE_PAIRS = 4_000_000
+
+# ฟีเจอร์ที่ snap เป็นจุดอ้างอิงของ segment (ไม่ใช่ค่าเริ่มต้นจาก segment)
+_POSITION = ("latitude", "longitude")
+
+
+def _path_midpoint(points):
+    """จุดกึ่งกลางตามความยาวของเส้น (จุดอ้างอิงของ segment ที่ไม่ได้ระบุ latitude / longitude)"""
+    if len(points) == 1:
+        return points[0]
+    lengths = np.hypot(*(np.diff(points, axis=0) * [1.0, np.cos(np.radians(points[:, 0].mean()))]).T)
+    cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+    half = cumulative[-1] / 2.0
+    i = min(int(np.searchsorted(cumulative, half, side="right")) - 1, len(lengths) - 1)
+    t = (half - cumulative[i]) / lengths[i] if lengths[i] > 0 else 0.0
+    return points[i] + t * (points[i + 1] - points[i])
+
+
+class RoadIndex:
+    """KD-tree ของจุดตัวอย่างบนถนน / ทางแยก พร้อมจุดอ้างอิงและค่าเริ่มต้นต่อ segment"""
+
+    def __init__(self, segments, tolerance_m=ROAD_SNAP_TOLERANCE_M, spacing_m=ROAD_SNAP_SPACING_M, schema=SCHEMA, version=None):
+        if not segments:
+            raise ValueError("ไม่มี road segment")
+        self.schema = schema
+        self.tolerance_m = float(tolerance_m)
+        self.spacing_m = float(spacing_m)
+        self.version = version
+        self.ids = [str(seg["id"]) for seg in segments]
+        self.names = [seg.get("name") for seg in segments]
+
+        shapes = []
+        for seg in segments:
+            points = seg.get("points") or [[seg["latitude"], seg["longitude"]]]
+            shapes.append(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        all_points = np.vstack(shapes)
+        self._lat0 = float(all_points[:, 0].mean())
+        self._lon_scale = METERS_PER_DEGREE * np.cos(np.radians(self._lat0))
+
+        self.anchors = np.array([
+            [seg["latitude"], seg["longitude"]] if "latitude" in seg and "longitude" in seg else _path_midpoint(points)
+            for seg, points in zip(segments, shapes)
+        ], dtype=np.float64)
+
+        samples, owners = [], []
+        for i, points in enumerate(shapes):
+            dense = self._densify(self._project(points[:, 0], points[:, 1]))
+            samples.append(dense)
+            owners.append(np.full(len(dense), i, dtype=np.intp))
+        self._samples = np.vstack(samples)
+        self._owner = np.concatenate(owners)
+        self._tree = cKDTree(self._samples) if cKDTree is not None else None
+
+        # ค่าเริ่มต้นต่อ segment ของแต่ละฟีเจอร์ (NaN = segment นั้นไม่มีค่า)
+        self.feature_defaults = {}
+        for name in schema.names:
+            if name in _POSITION:
+                continue
+            values = np.array([float(seg.get("defaults", {}).get(name, np.nan)) for seg in segments])
+            if not np.isnan(values).all():
+                self.feature_defaults[name] = values
+
+        self._lock = threading.Lock()
+        self._snapped = 0
+        self._unmatched = 0
+
+    def _project(self, lat, lon):
+        """lat / lon (องศา) เป็นพิกัด x, y หน่วยเมตร"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        return np.column_stack([lon * self._lon_scale, lat * METERS_PER_DEGREE])
+
+    def _densify(self, xy):
+        """เติมจุดบนแต่ละช่วงของเส้นให้ห่างกันไม่เกิน spacing_m"""
+        parts = [xy[:1]]
+        for a, b in zip(xy[:-1], xy[1:]):
+            steps = max(1, int(np.ceil(np.hypot(*(b - a)) / self.spacing_m)))
+            t = np.arange(1, steps + 1)[:, None] / steps
+            parts.append(a + t * (b - a))
+        return np.vstack(parts)
+
+    def _nearest(self, xy):
+        if self._tree is not None:
+            return self._tree.query(xy, distance_upper_bound=self.tolerance_m)
+        distance = np.empty(len(xy))
+        index = np.empty(len(xy), dtype=np.intp)
+        step = max(1, _BRUTE_FORCE_PAIRS // len(self._samples))
+        for start in range(0, len(xy), step):
+            block = xy[start:start + step]
+            d2 = ((block[:, None, :] - self._samples[None, :, :]) ** 2).sum(axis=2)
+            index[start:start + step] = d2.argmin(axis=1)
+            distance[start:start + step] = np.sqrt(d2[np.arange(len(block)), index[start:start + step]])
+        far = distance > self.tolerance_m
+        distance[far] = np.inf
+        index[far] = len(self._samples)
+        return distance, index
+
+    def snap(self, latitude, longitude):
+        """snap ทั้ง array ใน query เดียว คืน (index ของ segment หรือ -1, ระยะเป็นเมตรหรือ inf)"""
+        xy = self._project(np.atleast_1d(latitude), np.atleast_1d(longitude))
+        segment = np.full(len(xy), -1, dtype=np.intp)
+        distance = np.full(len(xy), np.inf)
+        finite = np.isfinite(xy).all(axis=1)
+        if finite.any():
+            d, k = self._nearest(xy[finite])
+            hit = np.isfinite(d)
+            rows = np.flatnonzero(finite)[hit]
+            segment[rows] = self._owner[k[hit]]
+            distance[rows] = d[hit]
+        matched = int((segment >= 0).sum())
+        with self._lock:
+            self._snapped += matched
+            self._unmatched += len(segment) - matched
+        return segment, distance
+
+    def snap_dict(self, data):
+        """snap request แถวเดียว คืน (dict ใหม่, ข้อมูล segment) หรือ (data เดิม, None) ถ้าไม่มีถนนในระยะ"""
+        try:
+            latitude = float(self.schema.value(data, "latitude"))
+            longitude = float(self.schema.value(data, "longitude"))
+        except (TypeError, ValueError):
+            return data, None
+        segment, distance = self.snap(latitude, longitude)
+        i = int(segment[0])
+        if i < 0:
+            return data, None
+        snapped = dict(data, latitude=float(self.anchors[i, 0]), longitude=float(self.anchors[i, 1]))
+        for name, values in self.feature_defaults.items():
+            if not np.isnan(values[i]) and not any(key in data for key in self.schema.keys(name)):
+                snapped[name] = float(values[i])
+        return snapped, {"id": self.ids[i], "name": self.names[i], "distance_m": round(float(distance[0]), 1)}
+
+    def snap_frame(self, df):
+        """snap ทั้ง DataFrame แบบ vectorized คืน DataFrame ใหม่
+
+        latitude / longitude ของแถวที่ snap ได้ถูกแทนด้วยจุดอ้างอิงของ segment (ค่าเดิมอยู่ใน
+        gps_latitude / gps_longitude) ฟีเจอร์ที่ไม่มีคอลัมน์หรือเป็นค่าว่างถูกเติมจาก segment
+        และเพิ่มคอลัมน์ road_segment_id / snap_distance_m
+        """
+        latitude = self.schema.column(df, "latitude")
+        longitude = self.schema.column(df, "longitude")
+        segment, distance = self.snap(latitude, longitude)
+        matched = segment >= 0
+        out = df.copy()
+        out["gps_latitude"] = latitude
+        out["gps_longitude"] = longitude
+        out[self.schema.keys("latitude")[0]] = np.where(matched, self.anchors[segment, 0], latitude)
+        out[self.schema.keys("longitude")[0]] = np.where(matched, self.anchors[segment, 1], longitude)
+        for name, values in self.feature_defaults.items():
+            fill = np.where(matched, values[segment], np.nan)
+            keys = [key for key in self.schema.keys(name) if key in df.columns]
+            if keys:
+                current = self.schema.column(df, name)
+                out[keys[0]] = np.where(np.isnan(current), fill, current)
+            else:
+                out[name] = np.where(np.isnan(fill), float(self.schema.defaults[name]), fill)
+        ids = np.array(self.ids + [None], dtype=object)
+        out["road_segment_id"] = ids[segment]
+        out["snap_distance_m"] = np.where(matched, np.round(distance, 1), np.nan)
+        return out
+
+    def stats(self):
+        """ข้อมูลสำหรับ /health"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "segments": len(self.ids),
+                "samples": len(self._samples),
+                "tolerance_m": self.tolerance_m,
+                "spacing_m": self.spacing_m,
+                "backend": "cKDTree" if self._tree is not None else "numpy",
+                "snapped": self._snapped,
+                "unmatched": self._unmatched,
+            }
+
+
+def _read_segments(path):
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+        features = [name for name in SCHEMA.names if name not in _POSITION and name in df.columns]
+        return [
+            {
+                "id": row["id"],
+                "name": row.get("name"),
+                "latitude": float(row["latitude"]),
+                "longitude": float(row["longitude"]),
+                "defaults": {name: row[name] for name in features if pd.notna(row[name])},
+            }
+            for row in df.to_dict("records")
+        ]
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["segments"] if isinstance(data, dict) else data
+
+
+def load_road_index(path=ROAD_SEGMENTS_PATH, **kwargs):
+    """โหลด RoadIndex จากไฟล์ JSON / CSV (version = ขนาด + เวลาแก้ไขของไฟล์ + การตั้งค่า)"""
+    st = os.stat(path)
+    index = RoadIndex(_read_segments(path), **kwargs)
+    index.version = f"{st.st_size:x}-{st.st_mtime_ns:x}-{index.tolerance_m:g}-{index.spacing_m:g}"
+    return index
+
+
+def road_index_from_env(schema=SCHEMA):
+    """RoadIndex ตาม environment variables (None ถ้าปิดใช้งานหรือไม่มีไฟล์ segment)"""
+    if os.environ.get("ROAD_SNAP", "1") != "1" or not os.path.exists(ROAD_SEGMENTS_PATH):
+        return None
+    return load_road_index(ROAD_SEGMENTS_PATH, schema=schema)
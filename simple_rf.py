@@ -1,15 +1,33 @@
 import os
 import json
-import joblib
+import hashlib
+import threading
 import numpy as np
 import pandas as pd
-from io import BytesIO
-from fastapi import FastAPI, Request, UploadFile, File
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from batch_engine import predict_frame, format_results, result_frame
+from coalescer import batcher_from_env, batcher_for
+from inference_policy import inference_policy
+from executors import run_inference, run_io, executor_stats, io_pool, PoolBusyError
+from uploads import stream_upload, streamed_upload, UploadTooLargeError
+from jobs import job_manager, TooManyJobsError, JOB_CHUNK_ROWS
+from batch_io import detect_format, read_table, iter_table_chunks, missing_columns
+from feature_schema import SCHEMA
+from forest_engine import predict_anytime
+from model_registry import registry, get_model, DEFAULT_MODEL_PATH
+from prediction_cache import cache_from_env, cached_predict_both_async
+from result_writers import OUTPUT_EXTENSIONS, parse_output_format, open_result_writer, write_result_frame
+from result_store import ResultStore, result_key
+from road_index import road_index_from_env
+from sweep import run_sweep
+from fast_json import json_response
+from warmup import Readiness
+
 # ===== FastAPI setup =====
 app = FastAPI(title="Traffic Congestion Predictor", version="1.0.0")
 app.add_middleware(
@@ -24,9 +42,29 @@ def health():
     return {
         "status": "ok", 
         "jam_model": "loaded" if jam_model is not None else "not_loaded",
-        "day_model": "loaded" if day_model is not None else "not_loaded"
+        "day_model": "loaded" if day_model is not None else "not_loaded",
+        "model": registry.describe(DEFAULT_MODEL_PATH),
+        "readiness": readiness.stats(),
+        "registry": registry.info(),
+        "executors": executor_stats(),
+        "inference_policy": inference_policy.stats(),
+        "jobs": job_manager.stats(),
+        "result_store": result_store.stats(),
+        "road_index": road_index.stats() if road_index is not None else "disabled",
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else "disabled",
+        "coalescer": {
+            "jam": jam_batcher.stats() if jam_batcher is not None else "disabled",
+            "day": day_batcher.stats() if day_batcher is not None else "disabled"
+        }
     }
 
+@app.get("/ready")
+def ready():
+    """readiness probe: 200 เมื่อโหลดโมเดลและ warm-up เสร็จแล้ว ไม่เช่นนั้น 503"""
+    stats = readiness.stats()
+    stats["status"] = "ready" if stats["ready"] else "not_ready"
+    return json_response(stats, status_code=200 if stats["ready"] else 503)
+
 # ===== Static & Templates =====
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -42,68 +80,84 @@ day_type_labels = {
     "1": "วันหยุด (Weekend/Holiday)"
 }
 
+UNSUPPORTED_INPUT_MESSAGE = "กรุณาอัปโหลดไฟล์ Excel (.xlsx, .xls), CSV (.csv, .csv.gz), Parquet หรือ Arrow IPC"
+
+# ===== Result Store (ไฟล์ผลลัพธ์ที่ /download ให้บริการ) =====
+result_store = ResultStore()
+
 # ===== Load Models =====
 # Traffic Jam Model
 jam_model = None
 try:
-    jam_model = joblib.load("models/rf_model.pkl")
+    jam_model = get_model(DEFAULT_MODEL_PATH)
     print("✅ โหลดโมเดล Traffic Jam (Random Forest) สำเร็จ")
 except Exception as e:
     print(f"❌ ไม่สามารถโหลดโมเดล Traffic Jam: {e}")
 
-# Day Type Model (ใช้โมเดลเดียวกันสำหรับตอนนี้)
+# Day Type Model (ใช้โมเดลเดียวกันสำหรับตอนนี้ — registry คืน object เดียวกัน)
 day_model = None
 try:
-    day_model = joblib.load("models/rf_model.pkl")
+    day_model = get_model(DEFAULT_MODEL_PATH)
     print("✅ โหลดโมเดล Day Type (Random Forest) สำเร็จ")
 except Exception as e:
     print(f"❌ ไม่สามารถโหลดโมเดล Day Type: {e}")
 
+registry.mark_startup_complete()
+
+# Micro-batching (เปิดด้วย COALESCE_ENABLED=1)
+jam_batcher = batcher_from_env(jam_model, "jam")
+day_batcher = batcher_from_env(day_model, "day")
+
+# Cache ผลการทำนาย (เปิดด้วย PREDICTION_CACHE_SIZE, ล้างอัตโนมัติเมื่อ version ของโมเดลเปลี่ยน)
+prediction_cache = cache_from_env(lambda: registry.version(DEFAULT_MODEL_PATH))
+
+# ===== Hot reload (registry สลับโมเดลใหม่เมื่อไฟล์เปลี่ยน) =====
+def _swap_models(path, backend, model):
+    """ผูกตัวแปร global ของโมเดล / batcher กับโมเดลใหม่หลัง registry สลับแล้ว"""
+    global jam_model, day_model, jam_batcher, day_batcher
+    if os.path.abspath(path) != os.path.abspath(DEFAULT_MODEL_PATH):
+        return
+    jam_model = day_model = model
+    jam_batcher = batcher_for(jam_batcher, model, "jam")
+    day_batcher = batcher_for(day_batcher, model, "day")
+    # โมเดลที่โหลดไม่สำเร็จตอนเริ่ม จะพร้อมหลัง warm-up ของโมเดลใหม่
+    readiness.start(_current_models)
+
+def _current_models():
+    return {"jam": jam_model, "day": day_model}
+
+# warm-up ในเบื้องหลัง: /ready ตอบ 503 จนกว่าจะเสร็จ
+readiness = Readiness()
+readiness.start(_current_models)
+
+registry.subscribe(_swap_models)
+registry.watch(DEFAULT_MODEL_PATH)
+registry.start_watcher()
+
+@app.middleware("http")
+async def model_version_headers(request: Request, call_next):
+    """แนบ version / เวลาโหลดของโมเดล ณ ตอนที่ request เข้ามา กับทุก response"""
+    headers = registry.version_headers(DEFAULT_MODEL_PATH)
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+# Snap พิกัดเข้ากับถนน / ทางแยกที่ติดตาม (เปิดเมื่อมีไฟล์ ROAD_SEGMENTS_PATH)
+road_index = road_index_from_env()
+
 # ===== Feature Engineering =====
 def create_jam_features(data):
-    """สร้างฟีเจอร์สำหรับการทำนายการจราจรติด/ไม่ติด"""
-    # Basic features for traffic jam prediction
-    latitude = float(data.get("latitude", 13.7563))
-    longitude = float(data.get("longitude", 100.5018))
-    density = float(data.get("density", 0))
-    volume = float(data.get("volume", 0))
-    capacity = float(data.get("capacity", 1))
-    hour = int(data.get("hour", 12))
-    speed = float(data.get("speed", 0))
-    vc_ratio = float(data.get("vc_ratio", 0.75))
-    
-    # Create feature array for traffic jam model
-    features = [
-        latitude, longitude, density, volume, capacity, 
-        hour, speed, vc_ratio
-    ]
-    
-    return np.array(features).reshape(1, -1)
+    """สร้างฟีเจอร์สำหรับการทำนายการจราจรติด/ไม่ติด (float32 ตามลำดับใน columns.json)"""
+    return SCHEMA.extract_dict(data)
 
 def create_day_features(data):
     """สร้างฟีเจอร์สำหรับการทำนายวันทำงาน/วันหยุด"""
-    # Basic features for day type prediction
-    latitude = float(data.get("latitude", 13.7563))
-    longitude = float(data.get("longitude", 100.5018))
-    density = float(data.get("density", 0))
-    volume = float(data.get("volume", 0))
-    capacity = float(data.get("capacity", 1))
-    hour = int(data.get("hour", 12))
-    speed = float(data.get("speed", 0))
-    vc_ratio = float(data.get("vc_ratio", 0.75))
-    
-    # Create feature array for day type model
-    features = [
-        latitude, longitude, density, volume, capacity, 
-        hour, speed, vc_ratio
-    ]
-    
-    return np.array(features).reshape(1, -1)
+    return SCHEMA.extract_dict(data)
 
 def create_traffic_label(data):
     """สร้าง label สำหรับการจราจรติด/ไม่ติด"""
-    vc_ratio = float(data.get("vc_ratio", 0.75))
-    speed = float(data.get("speed", 0))
+    vc_ratio = float(SCHEMA.value(data, "vc_ratio"))
+    speed = float(SCHEMA.value(data, "speed"))
     
     # เกณฑ์: v/c > 1 หรือ speed < 20 km/h
     if vc_ratio > 1.0 or speed < 20:
@@ -127,56 +181,75 @@ def root(request: Request):
     return templates.TemplateResponse("simple_rf.html", {"request": request})
 
 @app.post("/predict-traffic")
-def predict_traffic(data: dict):
-    """ทำนายการจราจรติด/ไม่ติด และวันทำงาน/วันหยุด"""
+async def predict_traffic(data: dict, anytime: bool = False, max_trees: int = None, budget_ms: float = None):
+    """ทำนายการจราจรติด/ไม่ติด และวันทำงาน/วันหยุด
+
+    ?anytime=true ประเมินทีละ tree และหยุดเมื่อผลแน่นอนแล้ว หรือครบ max_trees / budget_ms ต่อโมเดล
+    (response มี evaluation บอกจำนวน tree ที่ประเมินและผลตรงกับการประเมินครบทุก tree หรือไม่)
+    """
     try:
         if jam_model is None:
             return {"error": "ไม่พบโมเดล Traffic Jam"}
         if day_model is None:
             return {"error": "ไม่พบโมเดล Day Type"}
         
-        # Create features for both models
-        jam_features = create_jam_features(data)
-        day_features = create_day_features(data)
+        # Snap GPS to the nearest monitored road segment (hot, cacheable feature keys)
+        road_segment = None
+        if road_index is not None:
+            data, road_segment = road_index.snap_dict(data)
+        
+        # Both models use the same features (columns.json): extract once
+        features = create_jam_features(data)
         
-        # Predict traffic congestion using jam model
-        traffic_pred = int(jam_model.predict(jam_features)[0])
+        # Predict traffic congestion and day type in one combined pass
+        evaluation = None
+        if anytime:
+            # ไม่ผ่าน cache / batcher เพราะผลขึ้นกับงบของแต่ละ request
+            traffic_pred, traffic_proba, jam_eval = await run_inference(predict_anytime, jam_model, features, max_trees, budget_ms)
+            if day_model is jam_model:
+                day_pred, day_proba, day_eval = traffic_pred, traffic_proba, jam_eval
+            else:
+                day_pred, day_proba, day_eval = await run_inference(predict_anytime, day_model, features, max_trees, budget_ms)
+            evaluation = {"traffic": jam_eval, "day_type": day_eval}
+        else:
+            (traffic_pred, traffic_proba), (day_pred, day_proba) = await cached_predict_both_async(
+                prediction_cache, jam_model, day_model, jam_batcher, day_batcher, features
+            )
+        traffic_pred = int(traffic_pred)
         
         # Get traffic probabilities
-        try:
-            traffic_proba = jam_model.predict_proba(jam_features)[0]
+        if traffic_proba is not None:
             traffic_proba_dict = {
                 "ไม่ติด": f"{traffic_proba[0]*100:.2f}%",
                 "ติด": f"{traffic_proba[1]*100:.2f}%"
             }
-        except:
+        else:
             traffic_proba_dict = {
                 "ไม่ติด": "N/A",
                 "ติด": "N/A"
             }
         
-        # Predict day type using day model
-        day_pred = int(day_model.predict(day_features)[0])
+        # Day type prediction
+        day_pred = int(day_pred)
         
         # Get day type probabilities
-        try:
-            day_proba = day_model.predict_proba(day_features)[0]
+        if day_proba is not None:
             day_proba_dict = {
                 "วันทำงาน": f"{day_proba[0]*100:.2f}%",
                 "วันหยุด": f"{day_proba[1]*100:.2f}%"
             }
-        except:
+        else:
             day_proba_dict = {
                 "วันทำงาน": "N/A",
                 "วันหยุด": "N/A"
             }
         
         # Calculate actual congestion based on criteria
-        vc_ratio = float(data.get("vc_ratio", 0.75))
-        speed = float(data.get("speed", 0))
+        vc_ratio = float(SCHEMA.value(data, "vc_ratio"))
+        speed = float(SCHEMA.value(data, "speed"))
         actual_congested = 1 if (vc_ratio > 1.0) or (speed < 20) else 0
         
-        return {
+        result = {
             "traffic_prediction": traffic_pred,
             "traffic_label": traffic_labels[str(traffic_pred)],
             "traffic_probabilities": traffic_proba_dict,
@@ -190,113 +263,336 @@ def predict_traffic(data: dict):
                 "speed_under_20": speed < 20
             }
         }
+        if road_segment is not None:
+            result["road_segment"] = road_segment
+        if evaluation is not None:
+            result["evaluation"] = evaluation
+        return result
         
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/predict/sweep")
+async def predict_sweep(payload: dict):
+    """What-if: ไล่ค่าฟีเจอร์ 1–2 ตัวจาก record ตั้งต้น แล้วคืนความน่าจะเป็นทั้ง grid
+
+    {"base": {...}, "sweep": {"hour": {"start": 0, "stop": 23, "step": 1}, "speed": [0, 20, 40]}}
+    """
+    try:
+        if jam_model is None:
+            return {"error": "ไม่พบโมเดล Traffic Jam"}
+        if day_model is None:
+            return {"error": "ไม่พบโมเดล Day Type"}
+
+        base = payload.get("base", {})
+        road_segment = None
+        if road_index is not None:
+            base, road_segment = road_index.snap_dict(base)
+        result = await run_inference(run_sweep, base, payload.get("sweep"), jam_model, day_model)
+        result["road_segment"] = road_segment
+        return json_response(result)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        # spec ของ sweep ไม่ถูกต้อง (รวม grid ที่ใหญ่เกินกำหนด)
+        return json_response({"error": str(e)}, status_code=400)
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}"}
+
 @app.post("/upload-traffic-excel")
-async def upload_traffic_excel(file: UploadFile = File(...)):
-    """อัปโหลดไฟล์ Excel สำหรับการจราจร"""
+async def upload_traffic_excel(request: Request, output_format: str = None):
+    """อัปโหลดไฟล์ Excel / CSV / Parquet / Arrow สำหรับการจราจร
+
+    output_format (query) เลือกไฟล์ผลลัพธ์: xlsx (ค่าเริ่มต้น), csv, csv.gz หรือ parquet
+    ถ้า header Accept เป็น application/x-ndjson จะส่งผลลัพธ์ทุกแถวกลับแบบ streaming
+    (หนึ่งบรรทัด JSON ต่อแถว) แทนการเขียนไฟล์
+
+    ไฟล์ส่งเป็น multipart/form-data (field "file") และถูกอ่านแบบ streaming ลงไฟล์ชั่วคราว
+    """
     try:
         if jam_model is None:
             return {"error": "ไม่พบโมเดล Traffic Jam"}
         if day_model is None:
             return {"error": "ไม่พบโมเดล Day Type"}
-            
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return {"error": "กรุณาอัปโหลดไฟล์ Excel (.xlsx หรือ .xls)"}
         
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
+        result_format = parse_output_format(output_format)
+        if result_format is None:
+            return {"error": f"ไม่รองรับไฟล์ผลลัพธ์รูปแบบ {output_format} (เลือก {', '.join(OUTPUT_EXTENSIONS)})"}
         
-        # Required columns
-        required_columns = ["latitude", "longitude", "density", "volume", "capacity", "hour", "speed", "v/c"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return {"error": f"คอลัมน์ที่ขาดหายไป: {', '.join(missing_columns)}"}
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            upload = await stream_upload(request)
+            input_format = detect_format(upload.filename, upload.content_type)
+            if input_format is None:
+                _remove_quietly(upload.path)
+                return {"error": UNSUPPORTED_INPUT_MESSAGE}
+            return _NdjsonResponse(_ChunkReader(upload.path, input_format))
         
-        results = []
-        for index, row in df.iterrows():
-            try:
-                # Create features for both models
-                jam_features = create_jam_features(row.to_dict())
-                day_features = create_day_features(row.to_dict())
-                
-                # Predict traffic jam
-                jam_pred = int(jam_model.predict(jam_features)[0])
-                try:
-                    jam_proba = jam_model.predict_proba(jam_features)[0]
-                    jam_proba_dict = {
-                        "ไม่ติด": f"{jam_proba[0]*100:.2f}%",
-                        "ติด": f"{jam_proba[1]*100:.2f}%"
-                    }
-                except:
-                    jam_proba_dict = {"ไม่ติด": "N/A", "ติด": "N/A"}
-                
-                # Predict day type
-                day_pred = int(day_model.predict(day_features)[0])
-                try:
-                    day_proba = day_model.predict_proba(day_features)[0]
-                    day_proba_dict = {
-                        "วันทำงาน": f"{day_proba[0]*100:.2f}%",
-                        "วันหยุด": f"{day_proba[1]*100:.2f}%"
-                    }
-                except:
-                    day_proba_dict = {"วันทำงาน": "N/A", "วันหยุด": "N/A"}
-                
-                # Actual congestion
-                vc_ratio = float(row.get("v/c", 0.75))
-                speed = float(row.get("speed", 0))
-                actual_congested = 1 if (vc_ratio > 1.0) or (speed < 20) else 0
-                
-                results.append({
-                    "row": index + 1,
-                    "input_data": row.to_dict(),
-                    "traffic_prediction": jam_pred,
-                    "traffic_label": traffic_labels[str(jam_pred)],
-                    "traffic_probabilities": jam_proba_dict,
-                    "day_type_prediction": day_pred,
-                    "day_type_label": day_type_labels[str(day_pred)],
-                    "day_type_probabilities": day_proba_dict,
-                    "actual_congested": actual_congested,
-                    "vc_ratio": vc_ratio,
-                    "criteria_met": {
-                        "vc_ratio_over_1": vc_ratio > 1.0,
-                        "speed_under_20": speed < 20
-                    }
-                })
-                
-            except Exception as e:
-                results.append({
-                    "row": index + 1,
-                    "error": str(e),
-                    "input_data": row.to_dict()
-                })
+        # Stream body ลงไฟล์ชั่วคราวทีละ chunk (hash ไปพร้อมกัน) แล้วให้ reader อ่านจาก path
+        hasher = hashlib.sha256()
+        async with streamed_upload(request, hasher=hasher) as upload:
+            input_format = detect_format(upload.filename, upload.content_type)
+            if input_format is None:
+                return {"error": UNSUPPORTED_INPUT_MESSAGE}
+            # ไฟล์เดิม + โมเดลเดิม + รูปแบบเดิม: ใช้ผลลัพธ์ที่มีอยู่แล้ว
+            key = result_key(hasher.hexdigest(), _model_version(), result_format)
+            meta = await run_io(result_store.lookup, key)
+            if meta is not None:
+                return _batch_response(meta, cached=True)
+            df = await run_io(read_table, upload.path, input_format)
         
-        # Save results
-        output_df = pd.DataFrame(results)
-        output_filename = f"traffic_results_{file.filename}"
-        output_path = f"static/{output_filename}"
-        output_df.to_excel(output_path, index=False)
+        # Required columns (จาก columns.json รวม aliases เช่น v/c ↔ vc_ratio)
+        missing = missing_columns(df)
+        if missing:
+            return {"error": f"คอลัมน์ที่ขาดหายไป: {', '.join(missing)}"}
         
-        return {
-            "message": "ประมวลผลข้อมูลการจราจรสำเร็จ",
+        # Snap ทั้งไฟล์เข้ากับถนนใน query เดียว
+        if road_index is not None:
+            df = await run_inference(road_index.snap_frame, df)
+        
+        # Vectorized inference: predict_proba ครั้งเดียวต่อโมเดลสำหรับทั้งไฟล์
+        batch = await run_inference(predict_frame, df, jam_model, day_model)
+        results = await run_inference(format_results, df, batch, traffic_labels, day_type_labels, 0, 10)
+        
+        # Save results (flat columnar; ความน่าจะเป็นเป็นคอลัมน์ตัวเลข) ลง result store
+        frame = await run_inference(result_frame, df, batch, traffic_labels, day_type_labels)
+        ext = OUTPUT_EXTENSIONS[result_format]
+        temp_path = result_store.temp_path(ext)
+        try:
+            await run_io(write_result_frame, temp_path, result_format, frame)
+        except BaseException:
+            _remove_quietly(temp_path)
+            raise
+        
+        successful = int(batch["valid"].sum())
+        meta = await run_io(result_store.commit, key, ext, temp_path, {
             "total_rows": len(df),
-            "successful_predictions": len([r for r in results if "error" not in r]),
-            "errors": len([r for r in results if "error" in r]),
-            "download_url": f"/download/{output_filename}",
-            "results": results[:10]
-        }
+            "successful_predictions": successful,
+            "errors": len(df) - successful,
+            "results": results
+        })
+        return _batch_response(meta, cached=False)
         
+    except UploadTooLargeError as e:
+        return json_response({"error": str(e)}, status_code=413)
     except Exception as e:
         return {"error": f"เกิดข้อผิดพลาด: {str(e)}"}
 
+def _model_version():
+    """version ของโมเดล (และของไฟล์ road segment ถ้า snap) ที่ใช้ใน key ของ result store"""
+    version = registry.version(DEFAULT_MODEL_PATH)
+    if road_index is not None:
+        version = f"{version}:{road_index.version}"
+    return version
+
+def _batch_response(meta, cached):
+    """response ของ batch prediction จาก metadata ใน result store"""
+    return {
+        "message": "ประมวลผลข้อมูลการจราจรสำเร็จ",
+        "total_rows": meta["total_rows"],
+        "successful_predictions": meta["successful_predictions"],
+        "errors": meta["errors"],
+        "cached": cached,
+        "download_url": f"/download/{meta['filename']}",
+        "results": meta.get("results", [])
+    }
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+async def _run_traffic_job(job, upload_path, input_format, key, output_format):
+    """ประมวลผลไฟล์ที่อัปโหลดเป็น chunk ใน background (ตรวจการยกเลิกทุก chunk)
+
+    ผลลัพธ์แต่ละ chunk ถูกเขียนต่อท้ายไฟล์ทันที ไม่สะสมไว้ในหน่วยความจำ
+    แล้วย้ายเข้า result store เมื่อเสร็จ
+    """
+    df = await run_io(read_table, upload_path, input_format)
+    missing = missing_columns(df)
+    if missing:
+        raise ValueError(f"คอลัมน์ที่ขาดหายไป: {', '.join(missing)}")
+    if road_index is not None:
+        df = await run_inference(road_index.snap_frame, df)
+
+    total_rows = len(df)
+    job.progress(0, total_rows)
+    ext = OUTPUT_EXTENSIONS[output_format]
+    output_path = result_store.temp_path(ext)
+    writer = await run_io(open_result_writer, output_path, output_format)
+    successful = 0
+    results = []
+    try:
+        for start in range(0, total_rows, JOB_CHUNK_ROWS):
+            job.check_cancelled()
+            chunk = df.iloc[start:start + JOB_CHUNK_ROWS]
+            batch = await run_inference(predict_frame, chunk, jam_model, day_model)
+            if start == 0:
+                results = await run_inference(format_results, chunk, batch, traffic_labels, day_type_labels, 0, 10)
+            frame = await run_inference(result_frame, chunk, batch, traffic_labels, day_type_labels)
+            await run_io(writer.write, frame)
+            successful += int(batch["valid"].sum())
+            job.progress(start + len(chunk))
+        job.check_cancelled()
+    except BaseException:
+        await run_io(writer.close)
+        _remove_quietly(output_path)
+        raise
+    await run_io(writer.close)
+
+    meta = await run_io(result_store.commit, key, ext, output_path, {
+        "total_rows": total_rows,
+        "successful_predictions": successful,
+        "errors": total_rows - successful,
+        "results": results
+    })
+    return {
+        "successful_predictions": successful,
+        "errors": total_rows - successful,
+        "download_url": f"/download/{meta['filename']}"
+    }
+
+class _ChunkReader:
+    """อ่านไฟล์ที่อัปโหลดทีละ chunk ใน I/O pool และลบไฟล์เมื่อปิด
+
+    read() และ close() ใช้ lock เดียวกัน close จึงรอให้ read ที่กำลังทำงานใน thread เสร็จก่อน
+    (ไม่ปิด generator ระหว่างที่ next() ยังทำงานอยู่)
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self._chunks = iter_table_chunks(path, fmt)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def read(self):
+        with self._lock:
+            if self._closed:
+                return None
+            return next(self._chunks, None)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._chunks.close()
+        _remove_quietly(self.path)
+
+    def close_in_background(self):
+        """ส่ง close() เข้า I/O pool เดียวกับ read() (ไม่ต้อง await จึงเรียกได้แม้ task ถูกยกเลิก)"""
+        try:
+            io_pool.submit(self.close)
+        except PoolBusyError:
+            threading.Thread(target=self.close, daemon=True).start()
+
+
+class _NdjsonResponse(StreamingResponse):
+    """StreamingResponse ที่ปิด reader เสมอ แม้ client ตัดการเชื่อมต่อก่อนเริ่มอ่าน body"""
+
+    def __init__(self, reader):
+        super().__init__(_stream_ndjson(reader), media_type="application/x-ndjson")
+        self.reader = reader
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.reader.close_in_background()
+
+
+async def _stream_ndjson(reader):
+    """อ่าน ทำนาย และส่งผลลัพธ์ทีละ chunk (หน่วยความจำคงที่ไม่ขึ้นกับจำนวนแถว)"""
+    try:
+        first = True
+        while True:
+            chunk = await run_io(reader.read)
+            if chunk is None:
+                break
+            if first:
+                missing = missing_columns(chunk)
+                if missing:
+                    yield json.dumps({"error": f"คอลัมน์ที่ขาดหายไป: {', '.join(missing)}"}, ensure_ascii=False) + "\n"
+                    return
+                first = False
+            if road_index is not None:
+                chunk = await run_inference(road_index.snap_frame, chunk)
+            batch = await run_inference(predict_frame, chunk, jam_model, day_model)
+            results = await run_inference(format_results, chunk, batch, traffic_labels, day_type_labels)
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+    except Exception as e:
+        yield json.dumps({"error": f"เกิดข้อผิดพลาด: {str(e)}"}, ensure_ascii=False) + "\n"
+
+@app.post("/jobs")
+async def create_job(request: Request, output_format: str = None):
+    """อัปโหลดไฟล์ (multipart/form-data, field "file") แล้วประมวลผลใน background (คืน job id ทันที)"""
+    try:
+        if jam_model is None:
+            return {"error": "ไม่พบโมเดล Traffic Jam"}
+        if day_model is None:
+            return {"error": "ไม่พบโมเดล Day Type"}
+
+        result_format = parse_output_format(output_format)
+        if result_format is None:
+            return {"error": f"ไม่รองรับไฟล์ผลลัพธ์รูปแบบ {output_format} (เลือก {', '.join(OUTPUT_EXTENSIONS)})"}
+
+        hasher = hashlib.sha256()
+        upload = await stream_upload(request, hasher=hasher)
+        upload_path = upload.path
+        input_format = detect_format(upload.filename, upload.content_type)
+        if input_format is None:
+            _remove_quietly(upload_path)
+            return {"error": UNSUPPORTED_INPUT_MESSAGE}
+        key = result_key(hasher.hexdigest(), _model_version(), result_format)
+        meta = await run_io(result_store.lookup, key)
+        if meta is not None:
+            # ผลลัพธ์ของไฟล์นี้มีอยู่แล้ว: ไม่ต้องสร้าง job
+            _remove_quietly(upload_path)
+            return dict(_batch_response(meta, cached=True), status="completed")
+
+        try:
+            job = job_manager.submit(
+                upload.filename,
+                lambda job: _run_traffic_job(job, upload_path, input_format, key, result_format),
+                cleanup=lambda: _remove_quietly(upload_path),
+            )
+        except TooManyJobsError as e:
+            _remove_quietly(upload_path)
+            return {"error": str(e)}
+
+        return {
+            "message": "รับไฟล์แล้ว กำลังประมวลผลใน background",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}"
+        }
+
+    except UploadTooLargeError as e:
+        return json_response({"error": str(e)}, status_code=413)
+    except Exception as e:
+        return {"error": f"เกิดข้อผิดพลาด: {str(e)}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """สถานะและความคืบหน้าของ job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return {"error": "ไม่พบ job"}
+    return job.to_dict()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """ยกเลิก job ที่ยังไม่เสร็จ"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return {"error": "ไม่พบ job"}
+    return job.to_dict()
+
 @app.get("/download/{filename}")
 async def download_file(filename: str):
-    """ดาวน์โหลดไฟล์ผลลัพธ์"""
-    file_path = f"static/{filename}"
-    if os.path.exists(file_path):
-        return FileResponse(file_path, filename=filename)
+    """ดาวน์โหลดไฟล์ผลลัพธ์จาก result store"""
+    file_path = await run_io(result_store.resolve, filename)
+    if file_path is not None:
+        return FileResponse(file_path, filename=f"traffic_results_{filename}")
     else:
         return {"error": "ไฟล์ไม่พบ"}
 
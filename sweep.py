@@ -0,0 +1,119 @@
+"""
+What-if sweep
+
+สร้าง grid ของฟีเจอร์จาก record ตั้งต้นหนึ่งแถว + ฟีเจอร์ที่ต้องการไล่ค่า 1–2 ตัว
+(เช่น hour 0–23 × speed 0–120 ทีละ 5) เป็น feature matrix เดียว แล้วทำนายทั้งสองโมเดล
+ในการเรียกครั้งเดียว คืนความน่าจะเป็นเป็น array ที่มีรูปร่างตาม grid
+
+request:
+    {"base": {"latitude": 13.75, "volume": 1500, ...},
+     "sweep": {"hour": {"start": 0, "stop": 23, "step": 1},
+               "speed": {"start": 0, "stop": 120, "step": 5}}}
+ค่าของแต่ละฟีเจอร์ระบุเป็น list ของค่า หรือ start / stop (รวม stop) / step
+
+ตั้งค่าผ่าน environment variables:
+    SWEEP_MAX_POINTS   จำนวนจุดสูงสุดของ grid (ค่าเริ่มต้น 100000)
+"""
+
+import os
+import math
+
+import numpy as np
+
+from batch_engine import predict_matrix
+from feature_schema import SCHEMA
+
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", "100000"))
+SWEEP_MAX_FEATURES = 2
+
+
+def _feature_name(schema, key):
+    """ชื่อฟีเจอร์หลักของ key (รับ aliases เช่น v/c)"""
+    for name in schema.names:
+        if key in schema.keys(name):
+            return name
+    raise ValueError(f"ไม่มีฟีเจอร์ {key} (เลือกจาก {', '.join(schema.names)})")
+
+
+def _axis_range(spec):
+    """(start, step, จำนวนจุด) ของ {"start", "stop", "step"} โดยยังไม่สร้าง array"""
+    start, stop, step = float(spec["start"]), float(spec["stop"]), float(spec.get("step", 1))
+    if not np.isfinite([start, stop, step]).all():
+        raise ValueError("start / stop / step ต้องเป็นตัวเลขที่มีค่าจำกัด")
+    if step <= 0 or stop < start:
+        raise ValueError("ต้องมี step > 0 และ stop >= start")
+    # จำนวนจุดคำนวณจากการปัด เพื่อไม่ให้ floating point ทำให้ stop หาย
+    count = np.floor((stop - start) / step + 1e-9)
+    if not np.isfinite(count):
+        raise ValueError("ช่วงของแกนกว้างเกินไป")
+    return start, step, int(count) + 1
+
+
+def _is_range(spec):
+    return isinstance(spec, dict) and "values" not in spec
+
+
+def axis_length(spec):
+    """จำนวนจุดของแกน (ไม่สร้าง array ของช่วง start / stop / step)"""
+    if _is_range(spec):
+        return _axis_range(spec)[2]
+    return len(axis_values(spec))
+
+
+def axis_values(spec):
+    """ค่าของแกนจาก list หรือ {"start", "stop", "step"} (รวม stop)"""
+    if _is_range(spec):
+        start, step, count = _axis_range(spec)
+        return start + step * np.arange(count)
+    if isinstance(spec, dict):
+        spec = spec["values"]
+    values = np.asarray(spec, dtype=np.float64).ravel()
+    if len(values) == 0 or not np.isfinite(values).all():
+        raise ValueError("ค่าของแกนต้องเป็นตัวเลขอย่างน้อยหนึ่งค่า")
+    return values
+
+
+def build_grid(base, sweep, schema=SCHEMA, max_points=SWEEP_MAX_POINTS):
+    """feature matrix float32 ของทุกจุดใน grid (เรียงแบบ C order ตามลำดับแกน) และรายการแกน"""
+    if not sweep or len(sweep) > SWEEP_MAX_FEATURES:
+        raise ValueError(f"ต้องระบุฟีเจอร์ที่ต้องการไล่ค่า 1–{SWEEP_MAX_FEATURES} ตัว")
+    names = [_feature_name(schema, key) for key in sweep]
+    if len(set(names)) != len(names):
+        raise ValueError("ฟีเจอร์ที่ไล่ค่าต้องไม่ซ้ำกัน")
+    # ตรวจขนาดของ grid ก่อนสร้าง array ใด ๆ (math.prod ไม่ overflow)
+    n_points = math.prod(axis_length(spec) for spec in sweep.values())
+    if n_points > max_points:
+        raise ValueError(f"grid มี {n_points:,} จุด เกินกำหนด ({max_points:,} จุด)")
+    axes = [(name, axis_values(spec)) for name, spec in zip(names, sweep.values())]
+    shape = tuple(len(values) for _, values in axes)
+
+    X = np.repeat(schema.extract_dict(base), n_points, axis=0)
+    grid = X.reshape(shape + (schema.n_features,))
+    int_features = {spec["name"] for spec in schema.features if spec.get("dtype") == "int"}
+    for k, (name, values) in enumerate(axes):
+        if name in int_features:
+            values = np.trunc(values)
+        index = [None] * len(axes)
+        index[k] = slice(None)
+        grid[..., schema.names.index(name)] = values[tuple(index)]
+    return X, axes
+
+
+def run_sweep(base, sweep, jam_model, day_model, schema=SCHEMA, max_points=SWEEP_MAX_POINTS):
+    """ทำนายทั้ง grid ด้วยการเรียกแต่ละโมเดลครั้งเดียว คืน dict ของ array ตามรูปร่าง grid"""
+    X, axes = build_grid(base, sweep, schema, max_points)
+    shape = tuple(len(values) for _, values in axes)
+    batch = predict_matrix(X, np.ones(len(X), dtype=bool), jam_model, day_model)
+
+    def surface(proba):
+        # ความน่าจะเป็นของคลาส 1 (ติด / วันหยุด)
+        return proba[:, 1].reshape(shape) if proba is not None else None
+
+    return {
+        "axes": [{"feature": name, "values": values} for name, values in axes],
+        "shape": list(shape),
+        "traffic_prediction": batch["jam_pred"].reshape(shape),
+        "traffic_proba": surface(batch["jam_proba"]),
+        "day_type_prediction": batch["day_pred"].reshape(shape),
+        "day_type_proba": surface(batch["day_proba"]),
+    }
@@ -0,0 +1,49 @@
+"""
+ทดสอบ Endpoint แบบ batch และ binary ของ API (app)
+"""
+
+import numpy as np
+
+
+def test_predict_batch_endpoint_matches_single_rows(make_frame):
+    """/predict/batch (records และ columnar) ต้องให้ผลตรงกับ /predict-traffic ทีละแถว (ค่าเริ่มต้น ไม่มี cache)"""
+    import json
+    from fastapi.testclient import TestClient
+    import app as api
+
+    assert api.prediction_cache is None
+    client = TestClient(api.app)
+    df = make_frame(30)
+    records = df.to_dict("records")
+    records[5]["speed"] = "n/a"
+
+    compact = client.post("/predict/batch?compact=true", content=json.dumps(records)).json()
+    assert compact["invalid_rows"] == [5]
+    assert compact["traffic_prediction"][5] == -1 and compact["traffic_proba"][5] is None
+
+    columnar = client.post("/predict/batch?compact=true", content=json.dumps({k: df[k].tolist() for k in df.columns})).json()
+    full = client.post("/predict/batch", content=json.dumps(records)).json()
+    assert "speed" in full["results"][5]["error"]
+    for i in (0, 1, 2, 29):
+        single = client.post("/predict-traffic", json=records[i]).json()
+        assert compact["traffic_prediction"][i] == single["prediction"] == columnar["traffic_prediction"][i]
+        assert np.isclose(compact["traffic_proba"][i], single["probabilities"]["congested"])
+        assert full["results"][i]["traffic_jam"]["probabilities"] == single["probabilities"]
+
+
+def test_binary_endpoint_zero_copy_round_trip(make_frame):
+    """/predict/binary ต้องอ่าน float32 matrix โดยไม่คัดลอก และคืนความน่าจะเป็นในรูปแบบเดียวกัน"""
+    from fastapi.testclient import TestClient
+    from binary_codec import encode_matrix, decode_matrix
+    import app as api
+
+    X = api.API_SCHEMA.extract(make_frame(40))
+    body = encode_matrix(X)
+    view = decode_matrix(body, api.API_SCHEMA.n_features)
+    assert np.array_equal(view, X) and not view.flags["OWNDATA"]
+
+    response = TestClient(api.app).post("/predict/binary", content=body, headers={"content-type": "application/octet-stream"})
+    assert response.headers["x-feature-order"].split(",") == api.API_SCHEMA.names
+    proba = decode_matrix(response.content, 4)
+    assert proba.shape == (40, 4)
+    assert np.allclose(proba[:, :2], api.jam_model.predict_proba(X), atol=1e-6)
@@ -0,0 +1,49 @@
+"""
+ทดสอบ Vectorized batch prediction (batch_engine)
+"""
+
+import numpy as np
+
+from simple_rf import create_jam_features
+from batch_engine import predict_frame, format_results
+
+
+def test_vectorized_batch_matches_per_row(model, make_frame):
+    """ผลลัพธ์แบบ vectorized ต้องตรงกับการทำนายทีละแถว"""
+    from simple_rf import traffic_labels, day_type_labels
+
+    df = make_frame()
+    df["speed"] = df["speed"].astype(object)
+    df.loc[3, "speed"] = "n/a"
+
+    batch = predict_frame(df, model, model)
+    results = format_results(df, batch, traffic_labels, day_type_labels)
+
+    assert len(results) == len(df)
+    assert "error" in results[3]
+    for index, row in df.iterrows():
+        if index == 3:
+            continue
+        features = create_jam_features(row.to_dict())
+        proba = model.predict_proba(features)[0]
+        assert results[index]["traffic_prediction"] == int(model.predict(features)[0])
+        assert results[index]["traffic_probabilities"]["ติด"] == f"{proba[1]*100:.2f}%"
+        assert results[index]["actual_congested"] == int(row["v/c"] > 1.0 or row["speed"] < 20)
+
+
+def test_predict_pair_shares_and_matches_separate_models(monkeypatch, make_model, make_frame):
+    """predict_pair: โมเดลเดียวกันทำนายครั้งเดียว และโมเดลต่างกัน (รวมแบบพร้อมกัน) ตรงกับการทำนายแยก"""
+    import batch_engine
+
+    jam, day = make_model(0), make_model(1)
+    X = batch_engine.build_feature_matrix(make_frame(200))[0]
+
+    jam_pred, jam_proba, day_pred, day_proba = batch_engine.predict_pair(X, jam, jam)
+    assert day_proba is jam_proba and day_pred is jam_pred
+
+    monkeypatch.setattr(batch_engine, "DUAL_PARALLEL_ROWS", 1)
+    monkeypatch.setattr(batch_engine.os, "cpu_count", lambda: 2)
+    jam_pred, jam_proba, day_pred, day_proba = batch_engine.predict_pair(X, jam, day)
+    assert np.array_equal(jam_proba, jam.predict_proba(X))
+    assert np.array_equal(day_proba, day.predict_proba(X))
+    assert np.array_equal(day_pred, day.predict(X))
@@ -0,0 +1,35 @@
+"""
+ทดสอบการอ่านไฟล์ตารางหลายรูปแบบ (batch_io)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def test_batch_readers_round_trip(tmp_path, make_frame):
+    """reader ของแต่ละรูปแบบไฟล์ต้องให้ DataFrame เดียวกัน และผ่านการตรวจคอลัมน์จาก columns.json"""
+    from batch_io import detect_format, read_table, iter_table_chunks, missing_columns
+
+    df = make_frame(20)
+    paths = {"data.csv": df.to_csv, "data.csv.gz": df.to_csv}
+    try:
+        import pyarrow  # noqa: F401
+        paths["data.parquet"] = df.to_parquet
+    except ImportError:
+        pass
+
+    required = list(df.columns)
+    for name, writer in paths.items():
+        path = str(tmp_path / name)
+        writer(path, index=False)
+        loaded = read_table(path, detect_format(name))
+        assert missing_columns(loaded) == []
+        assert np.allclose(loaded[required].to_numpy(dtype=float), df[required].to_numpy(dtype=float))
+
+        # อ่านแบบ streaming: index ต่อเนื่องกันและรวมแล้วได้ข้อมูลเดิม
+        chunks = list(iter_table_chunks(path, detect_format(name), chunk_rows=7))
+        assert [len(c) for c in chunks] == [7, 7, 6]
+        assert list(pd.concat(chunks).index) == list(range(20))
+
+    assert detect_format("upload.bin", "text/csv") == "csv"
+    assert detect_format("upload.txt") is None
@@ -0,0 +1,23 @@
+"""
+ทดสอบ Micro-batching ของ request แถวเดียว (coalescer)
+"""
+
+import numpy as np
+
+
+def test_micro_batcher_coalesces_rows(model, make_frame):
+    """MicroBatcher ต้องรวม request พร้อมกันเป็น batch และคืนผลตรงกับ predict_proba"""
+    from concurrent.futures import ThreadPoolExecutor
+    from coalescer import MicroBatcher
+
+    X = make_frame(64).rename(columns={"v/c": "vc_ratio"}).to_numpy(dtype=float)
+    batcher = MicroBatcher(model.predict_proba, window_ms=20, max_batch=16)
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        rows = list(pool.map(batcher.predict, X))
+
+    assert np.allclose(np.vstack(rows), model.predict_proba(X))
+    stats = batcher.stats()
+    assert stats["rows"] == len(X)
+    assert stats["max_batch_size_seen"] > 1
+    assert stats["max_batch_size_seen"] <= 16
@@ -0,0 +1,34 @@
+"""
+ทดสอบ Bounded executor (executors)
+"""
+
+
+def test_bounded_executor_limits_queue():
+    """BoundedExecutor ต้องปฏิเสธงานเมื่อคิวเต็ม และนับสถิติถูกต้อง"""
+    import threading
+    from executors import BoundedExecutor, PoolBusyError
+
+    pool = BoundedExecutor("test", max_workers=1, queue_max=2)
+    gate = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        gate.wait()
+
+    running = pool.submit(blocker)
+    started.wait()
+    queued = [pool.submit(lambda: None), pool.submit(lambda: None)]
+    try:
+        pool.submit(lambda: None)
+        assert False, "expected PoolBusyError"
+    except PoolBusyError:
+        pass
+    gate.set()
+    for future in [running] + queued:
+        future.result()
+
+    stats = pool.stats()
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 1
+    assert stats["max_queue_depth_seen"] == 2
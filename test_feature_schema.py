@@ -0,0 +1,28 @@
+"""
+ทดสอบ Feature schema จาก columns.json (feature_schema)
+"""
+
+import numpy as np
+
+
+def test_feature_schema_extracts_all_inputs_alike(make_frame):
+    """extractor จาก columns.json ต้องให้ float32 เดียวกันสำหรับ dict, list ของ dict และ DataFrame"""
+    from feature_schema import SCHEMA
+
+    df = make_frame(5)
+    records = df.to_dict("records")
+    from_frame, valid = SCHEMA.extract_frame(df)
+    from_records = SCHEMA.extract(records)
+    from_dict = SCHEMA.extract(records[2])
+
+    assert from_frame.dtype == np.float32 and from_frame.flags["C_CONTIGUOUS"]
+    assert valid.all()
+    assert np.array_equal(from_frame, from_records)
+    assert np.array_equal(from_dict[0], from_frame[2])
+    # alias: v/c ในไฟล์คือฟีเจอร์ vc_ratio
+    assert np.allclose(from_frame[:, SCHEMA.names.index("vc_ratio")], df["v/c"])
+
+    assert SCHEMA.extract({})[0, SCHEMA.names.index("capacity")] == 1
+    assert SCHEMA.with_defaults({"capacity": 2000}).extract({})[0, SCHEMA.names.index("capacity")] == 2000
+    assert SCHEMA.missing_columns(df.rename(columns={"v/c": "vc_ratio"})) == []
+    assert SCHEMA.missing_columns(df.drop(columns=["v/c"])) == ["vc_ratio / v/c"]
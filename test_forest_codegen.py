@@ -0,0 +1,33 @@
+"""
+ทดสอบ Forest ที่ generate เป็นโค้ด Python (forest_codegen)
+"""
+
+import os
+
+import numpy as np
+
+
+def test_codegen_forest_matches_predict_proba_exactly(tmp_path, model):
+    """โค้ดที่ generate ต้องให้ predict_proba ตรงกับ sklearn ทุกบิต ทั้งตอนสร้างและตอนโหลดจาก cache"""
+    import forest_codegen
+    from inference_policy import InferencePolicy
+
+    path = str(tmp_path / "rf.codegen")
+    codegen = forest_codegen.load_or_generate(model, path, "v1")
+    assert codegen is not None
+    X = np.random.default_rng(3).normal(size=(500, model.n_features_in_)).astype(np.float32) * 50
+    assert np.array_equal(codegen.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(codegen.predict(X), model.predict(X))
+
+    mtime = os.path.getmtime(path)
+    reloaded = forest_codegen.load_or_generate(model, path, "v1")
+    assert os.path.getmtime(path) == mtime
+    assert np.array_equal(reloaded.predict_proba(X[:5]), model.predict_proba(X[:5]))
+
+    # แถวเดียวผ่านโค้ดที่ generate ส่วนแถวที่มี NaN และ batch ใหญ่ใช้โมเดลเดิม
+    forest_codegen.register(model, codegen)
+    policy = InferencePolicy(blas_threads=1)
+    assert np.array_equal(policy.predict_proba(model, X[:1]), model.predict_proba(X[:1]))
+    assert policy.stats()["codegen_calls"] == 1
+    assert forest_codegen.predict_proba_rows(model, np.full((1, model.n_features_in_), np.nan)) is None
+    assert forest_codegen.predict_proba_rows(model, X) is None
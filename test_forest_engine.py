@@ -0,0 +1,56 @@
+"""
+ทดสอบ Compiled / compact forest และ anytime prediction (forest_engine)
+"""
+
+import numpy as np
+
+
+def test_compiled_forest_matches_sklearn(tmp_path, model, make_frame):
+    """CompiledForest ต้องให้ความน่าจะเป็นตรงกับ sklearn แบบ bit-for-bit"""
+    from forest_engine import CompiledForest
+
+    X = make_frame(300).to_numpy(dtype=float)
+    X[7, 2] = np.nan
+
+    compiled = CompiledForest.from_sklearn(model)
+    assert np.array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+    compiled.save(str(tmp_path / "forest"))
+    loaded = CompiledForest.load(str(tmp_path / "forest"))
+    assert np.array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+
+def test_compact_forest_is_equivalent_and_smaller(tmp_path, model):
+    """compact forest (float32 / uint16) ต้องให้ label เดิมทุกแถว รวมแถวที่มีค่าตรง threshold พอดี"""
+    from forest_engine import CompiledForest, check_equivalence, compaction_report, equivalence_samples
+
+    compiled = CompiledForest.from_sklearn(model)
+    for value_dtype in ("float32", "uint16"):
+        compact = compiled.compact(value_dtype)
+        assert compact.threshold.dtype == np.float32
+        assert check_equivalence(model, compact)["equivalent"]
+        assert compaction_report(model, compact)["saved_bytes"] > 0
+
+        compact.save(str(tmp_path / value_dtype))
+        loaded = CompiledForest.load(str(tmp_path / value_dtype))
+        X = equivalence_samples(loaded, n_random=500)
+        assert np.array_equal(loaded.predict(X), model.predict(X))
+
+
+def test_anytime_prediction_exit_is_exact(model):
+    """โหมด anytime: ผลที่บอกว่า exact ต้องตรงกับการประเมินครบทุก tree และงบ tree ต้องถูกเคารพ"""
+    from forest_engine import predict_anytime
+
+    X = np.random.default_rng(1).normal(size=(200, model.n_features_in_)).astype(np.float32)
+    labels = model.predict(X)
+    proba = model.predict_proba(X)
+    for i in range(len(X)):
+        label, row_proba, info = predict_anytime(model, X[i:i + 1])
+        assert info["exact"] and label == labels[i]
+        if info["trees_evaluated"] == info["trees_total"]:
+            assert np.array_equal(row_proba, proba[i])
+
+    label, _, info = predict_anytime(model, X[:1], max_trees=1)
+    assert info["trees_evaluated"] == 1
+    assert info["exact"] == (info["trees_total"] == 1)
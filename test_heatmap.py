@@ -0,0 +1,36 @@
+"""
+ทดสอบ Congestion heatmap (heatmap)
+"""
+
+import os
+
+
+def test_heatmap_matches_model_and_recomputes_on_version_change(tmp_path, model):
+    """heatmap ต้องตรงกับการทำนายทีละจุด และ precompute ใหม่เมื่อ version ของโมเดลเปลี่ยน"""
+    from feature_schema import SCHEMA
+    from heatmap import HeatmapStore, HeatmapNotReadyError
+
+    store = HeatmapStore(root=str(tmp_path), bbox=(13.7, 100.5, 13.75, 100.56), step=0.01)
+    try:
+        store.query(8)
+        assert False, "expected HeatmapNotReadyError"
+    except HeatmapNotReadyError:
+        pass
+    store.start(model, "v1")
+    assert store.wait(5)
+    latitudes, longitudes, congestion = store.query(8, "13.72,100.52,13.75,100.54")
+    assert congestion.shape == (len(latitudes), len(longitudes)) == (4, 3)
+    expected = model.predict_proba(SCHEMA.extract_dict({"latitude": latitudes[1], "longitude": longitudes[2], "hour": 8}))[0, 1]
+    assert abs(float(congestion[1, 2]) - expected) < 1e-3
+
+    store.start(model, "v1")
+    store.wait(5)
+    assert store.stats()["precomputes"] == 1
+    store.start(model, "v2")
+    store.wait(5)
+    assert store.stats()["precomputes"] == 2 and store.stats()["model_version"] == "v2"
+    assert len(os.listdir(tmp_path)) == 1
+
+    # ค่าเริ่มต้นอยู่นอก static/ ซึ่ง app mount เป็นไฟล์สาธารณะ
+    import heatmap
+    assert not os.path.abspath(heatmap.HEATMAP_DIR).startswith(os.path.abspath("static"))
@@ -0,0 +1,24 @@
+"""
+ทดสอบการเลือก parallelism ตามขนาด batch (inference_policy)
+"""
+
+import numpy as np
+
+
+def test_inference_policy_picks_parallelism_by_batch_size(model, make_frame):
+    """batch เล็กใช้ n_jobs=1, batch ใหญ่แบ่งงบ thread ตามจำนวนการเรียกที่ทำงานพร้อมกัน"""
+    from inference_policy import InferencePolicy
+
+    policy = InferencePolicy(min_parallel_rows=1000, workers=2, max_threads=8, blas_threads=1)
+    assert policy.plan(1) == 1
+    assert policy.plan(5000) == 8
+    with policy.limit(5000) as n_jobs:
+        assert n_jobs == 8
+        assert policy.plan(5000) == 4
+    assert policy.stats()["calls"] == {"serial": 0, "parallel": 1}
+
+    model.n_jobs = -1
+    policy.prepare(model)
+    assert model.n_jobs is None
+    X = make_frame(10).to_numpy(dtype=np.float32)
+    assert np.array_equal(policy.predict_proba(model, X), model.predict_proba(X))
@@ -0,0 +1,57 @@
+"""
+ทดสอบ Background batch jobs (jobs)
+"""
+
+
+def test_job_manager_runs_and_cancels():
+    """JobManager ต้องรันงานตามลำดับ จำกัดจำนวนพร้อมกัน และยกเลิกงานที่รอคิวได้"""
+    import asyncio
+    from jobs import JobManager
+
+    async def scenario():
+        manager = JobManager(max_concurrent=1, max_pending=4)
+
+        async def runner(job):
+            for done in range(0, 100, 25):
+                job.check_cancelled()
+                await asyncio.sleep(0)
+                job.progress(done + 25, 100)
+            return {"download_url": "/download/x.xlsx"}
+
+        first = manager.submit("a.csv", runner)
+        second = manager.submit("b.csv", runner)
+        manager.cancel(second.id)
+        await asyncio.gather(first.task, second.task)
+        return first.to_dict(), second.to_dict()
+
+    first, second = asyncio.run(scenario())
+    assert first["status"] == "completed"
+    assert first["rows_done"] == 100
+    assert first["download_url"] == "/download/x.xlsx"
+    assert second["status"] == "cancelled"
+
+    async def trimmed_while_queued():
+        # history=1: job ที่ยกเลิกระหว่างรอคิวยังต้องดูสถานะได้จนกว่า task จะจบและ cleanup แล้ว
+        manager = JobManager(max_concurrent=1, max_pending=4, history=1)
+        gate = asyncio.Event()
+        cleaned = []
+
+        async def blocker(job):
+            await gate.wait()
+            return {"download_url": f"/download/{job.filename}.xlsx"}
+
+        first = manager.submit("a.csv", blocker)
+        cancelled = [manager.submit(name, blocker, cleanup=lambda name=name: cleaned.append(name)) for name in ("b.csv", "c.csv")]
+        for job in cancelled:
+            manager.cancel(job.id)
+        third = manager.submit("d.csv", blocker)
+        queued = [manager.get(job.id).to_dict()["status"] for job in cancelled]
+        gate.set()
+        await asyncio.gather(first.task, third.task, *(job.task for job in cancelled))
+        return queued, cleaned, manager.get(third.id).to_dict(), manager.get(first.id), manager.stats()["live_tasks"]
+
+    queued, cleaned, third, trimmed, live = asyncio.run(trimmed_while_queued())
+    assert queued == ["cancelled", "cancelled"] and sorted(cleaned) == ["b.csv", "c.csv"]
+    # job ล่าสุดที่เสร็จแล้วยังมีสถานะและผลลัพธ์ ส่วน job เก่ากว่า history ถูกลบ
+    assert third["status"] == "completed" and third["download_url"] == "/download/d.csv.xlsx"
+    assert trimmed is None and live == 0
@@ -0,0 +1,78 @@
+"""
+ทดสอบ Model registry และ hot reload (model_registry)
+"""
+
+import os
+
+import numpy as np
+
+
+def test_model_registry_shares_one_instance(tmp_path, monkeypatch, model, make_frame):
+    """registry ต้องโหลดไฟล์เดียวครั้งเดียว และคืน object เดียวกันทุกครั้ง"""
+    import joblib
+    import model_registry
+    from model_registry import ModelRegistry
+
+    monkeypatch.setattr(model_registry, "INFERENCE_BACKEND", "sklearn")
+
+    path = str(tmp_path / "rf_model.pkl")
+    joblib.dump(model, path, compress=3)
+
+    registry = ModelRegistry(mmap_mode="r")
+    jam_model = registry.get(path)
+    day_model = registry.get(path)
+
+    assert jam_model is day_model
+    X = make_frame(20).to_numpy(dtype=float)
+    assert np.array_equal(jam_model.predict_proba(X), model.predict_proba(X))
+    info = registry.info()["models"][f"{path} (sklearn)"]
+    # sklearn คัดลอก node arrays ตอน unpickle: ไม่มีสำเนา mmap สำหรับ backend นี้
+    assert info["mmap_path"] is None
+    assert info["version"] == registry.version(path)
+    # การแชร์ผ่าน page cache ใช้ backend compiled
+    registry.get(path, "compiled")
+    assert registry.info()["models"][f"{path} (compiled)"]["mmap_path"] is not None
+
+    # get() กับ version() ใช้ backend เริ่มต้นเดียวกันจาก INFERENCE_BACKEND
+    monkeypatch.setattr(model_registry, "INFERENCE_BACKEND", "compact")
+    registry.get(path)
+    assert registry.version(path) is not None
+    assert f"{path} (compact)" in registry.info()["models"]
+
+
+def test_model_registry_hot_reloads_after_self_test(tmp_path, make_model, make_frame):
+    """เมื่อไฟล์โมเดลเปลี่ยน registry ต้องโหลด ทดสอบ แล้วสลับและแจ้ง listener ส่วนไฟล์เสียต้องไม่ถูกสลับ"""
+    import joblib
+    from model_registry import ModelRegistry
+
+    path = str(tmp_path / "rf_model.pkl")
+    joblib.dump(make_model(0), path)
+    registry = ModelRegistry(mmap_mode=None)
+    old = registry.get(path, "sklearn")
+    old_version = registry.version(path, "sklearn")
+    swapped = []
+    registry.subscribe(lambda p, backend, model: swapped.append(model))
+    registry.watch(path, "sklearn")
+
+    def replace(obj, tick):
+        joblib.dump(obj, path)
+        os.utime(path, ns=(tick, tick))
+
+    new_model = make_model(1)
+    replace(new_model, 10**18)
+    assert registry.check_for_updates() == []  # รอให้ไฟล์นิ่งก่อน
+    assert registry.check_for_updates() == [path]
+    new = registry.get(path, "sklearn")
+    assert new is not old and swapped == [new]
+    assert registry.version(path, "sklearn") != old_version
+    assert registry.describe(path, "sklearn")["reloads"] == 1
+    assert registry.version_headers(path, "sklearn")["X-Model-Version"] == registry.version(path, "sklearn")
+    X = make_frame(10).to_numpy(dtype=float)
+    assert np.array_equal(new.predict_proba(X), new_model.predict_proba(X))
+
+    # จำนวนฟีเจอร์ไม่ตรงกับโมเดลเดิม: ใช้โมเดลเดิมต่อไป
+    from sklearn.ensemble import RandomForestClassifier
+    replace(RandomForestClassifier(n_estimators=2).fit(np.random.rand(20, 3), np.arange(20) % 2), 2 * 10**18)
+    registry.check_for_updates()
+    assert registry.check_for_updates() == []
+    assert registry.get(path, "sklearn") is new and len(swapped) == 1
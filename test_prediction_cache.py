@@ -0,0 +1,28 @@
+"""
+ทดสอบ Prediction cache แบบ quantized (prediction_cache)
+"""
+
+from simple_rf import create_jam_features
+
+
+def test_prediction_cache_quantizes_and_invalidates():
+    """cache ต้องใช้ key ที่ quantize แล้ว, evict แบบ LRU และล้างเมื่อ version ของโมเดลเปลี่ยน"""
+    from prediction_cache import PredictionCache
+
+    version = {"value": "v1"}
+    cache = PredictionCache(max_entries=2, ttl_seconds=60, version_fn=lambda: version["value"])
+
+    a = create_jam_features({"latitude": 13.756301, "speed": 45.2})
+    b = create_jam_features({"latitude": 13.756349, "speed": 44.9})
+    assert cache.quantize(a).tobytes() == cache.quantize(b).tobytes()
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    version["value"] = "v2"
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,62 @@
+"""
+ทดสอบ Result store ของไฟล์ผลลัพธ์ (result_store)
+"""
+
+import os
+
+
+def test_result_store_reuses_and_evicts(tmp_path, monkeypatch, make_frame):
+    """result store ต้องคืนผลลัพธ์เดิมจาก key เดียวกัน และลบแบบ LRU / TTL ตามงบ"""
+    import time
+    from result_store import ResultStore, result_key
+
+    store = ResultStore(root=str(tmp_path), max_bytes=250, ttl_seconds=3600)
+    keys = [result_key(f"digest{i}", "v1", "csv") for i in range(3)]
+    assert result_key("digest0", "v2", "csv") != keys[0]
+
+    for i, key in enumerate(keys[:2]):
+        temp_path = store.temp_path(".csv")
+        with open(temp_path, "w") as f:
+            f.write("x" * 100)
+        store.commit(key, ".csv", temp_path, {"total_rows": i})
+        time.sleep(0.01)
+
+    # ใช้ key แรกล่าสุด: key ที่สองจึงถูกลบเมื่อเกินงบ
+    assert store.lookup(keys[0])["total_rows"] == 0
+    temp_path = store.temp_path(".csv")
+    with open(temp_path, "w") as f:
+        f.write("x" * 100)
+    store.commit(keys[2], ".csv", temp_path, {"total_rows": 2})
+    assert store.lookup(keys[1]) is None
+    assert store.resolve(f"{keys[0]}.csv") is not None
+    assert store.resolve("../test_rf.py") is None
+
+    # stats ตรงกับ store ใหม่ที่อ่านจากดิสก์
+    stats = store.stats()
+    assert (stats["entries"], stats["total_bytes"]) == (2, 200)
+    reopened = ResultStore(root=str(tmp_path), max_bytes=250, ttl_seconds=3600).stats()
+    assert (reopened["entries"], reopened["total_bytes"]) == (2, 200)
+
+    store.ttl_seconds = 0
+    time.sleep(0.01)
+    assert store.lookup(keys[2]) is None
+    assert store.stats()["entries"] == 1
+
+    # ค่าเริ่มต้นอยู่นอก static/ ซึ่ง simple_rf mount เป็นไฟล์สาธารณะ
+    import result_store
+    assert not os.path.abspath(result_store.RESULT_STORE_DIR).startswith(os.path.abspath("static"))
+
+    # อัปโหลดไฟล์เดิมซ้ำ: ได้ผลลัพธ์เดิมจาก store และดาวน์โหลดได้ผ่าน /download เท่านั้น
+    from fastapi.testclient import TestClient
+    import simple_rf
+    monkeypatch.setattr(simple_rf, "result_store", ResultStore(root=str(tmp_path / "app")))
+    client = TestClient(simple_rf.app)
+    upload = make_frame(5).to_csv(index=False).encode()
+    first = client.post("/upload-traffic-excel?output_format=csv", files={"file": ("a.csv", upload, "text/csv")}).json()
+    second = client.post("/upload-traffic-excel?output_format=csv", files={"file": ("b.csv", upload, "text/csv")}).json()
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["download_url"] == first["download_url"] and second["total_rows"] == 5
+    filename = first["download_url"].rsplit("/", 1)[1]
+    assert client.get(first["download_url"]).status_code == 200
+    assert client.get(f"/static/{filename}").status_code == 404
+    assert client.get(f"/static/results/{filename}").status_code == 404
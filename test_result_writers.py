@@ -0,0 +1,42 @@
+"""
+ทดสอบการเขียนไฟล์ผลลัพธ์หลายรูปแบบ (result_writers)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def test_result_writers_round_trip(tmp_path, model, make_frame):
+    """ไฟล์ผลลัพธ์ทุกรูปแบบต้องอ่านกลับได้ โดยความน่าจะเป็นเป็นตัวเลขและแถวที่ผิดมีข้อความ error"""
+    from batch_engine import predict_frame, result_frame
+    from result_writers import OUTPUT_EXTENSIONS, write_result_frame
+
+    df = make_frame(25).astype(object)
+    df.loc[4, "speed"] = "ไม่ทราบ"
+    batch = predict_frame(df, model, model)
+    frame = result_frame(df, batch, {"0": "ไม่ติด", "1": "ติด"}, {"0": "วันทำงาน", "1": "วันหยุด"})
+    expected = batch["jam_proba"][:, 1]
+
+    formats = ["xlsx", "csv", "csv.gz"]
+    try:
+        import pyarrow  # noqa: F401
+        formats.append("parquet")
+    except ImportError:
+        pass
+
+    for fmt in formats:
+        path = str(tmp_path / f"out{OUTPUT_EXTENSIONS[fmt]}")
+        write_result_frame(path, fmt, frame, chunk_rows=10)
+        if fmt == "xlsx":
+            loaded = pd.read_excel(path)
+        elif fmt == "parquet":
+            loaded = pd.read_parquet(path)
+        else:
+            loaded = pd.read_csv(path)
+        assert len(loaded) == 25
+        assert list(loaded["row"]) == list(range(1, 26))
+        proba = loaded["traffic_proba_jam"].to_numpy(dtype=float)
+        assert np.isnan(proba[4])
+        assert np.allclose(np.delete(proba, 4), expected)
+        assert loaded["error"].notna().sum() == 1
+        assert "speed" in loaded.loc[4, "error"]
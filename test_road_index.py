@@ -0,0 +1,29 @@
+"""
+ทดสอบการ snap พิกัดเข้ากับถนน (road_index)
+"""
+
+import pandas as pd
+
+
+def test_road_index_snaps_points_and_frames():
+    """จุดใกล้ถนนต้อง snap เป็นจุดอ้างอิงเดียวกันและได้ capacity ของ segment ส่วนจุดไกลไม่เปลี่ยน"""
+    from road_index import RoadIndex
+
+    index = RoadIndex([
+        {"id": "rama4", "points": [[13.7300, 100.5300], [13.7250, 100.5500]], "defaults": {"capacity": 2400}},
+        {"id": "asok", "latitude": 13.7370, "longitude": 100.5603},
+    ], tolerance_m=100)
+    a, info_a = index.snap_dict({"latitude": 13.7299, "longitude": 100.5302})
+    b, info_b = index.snap_dict({"latitude": 13.7252, "longitude": 100.5497, "capacity": 999})
+    assert info_a["id"] == info_b["id"] == "rama4"
+    assert (a["latitude"], a["longitude"]) == (b["latitude"], b["longitude"])
+    assert a["capacity"] == 2400 and b["capacity"] == 999
+    far = {"latitude": 13.80, "longitude": 100.60}
+    assert index.snap_dict(far) == (far, None)
+
+    df = pd.DataFrame({"latitude": [13.7371, 13.7299, 13.80], "longitude": [100.5604, 100.5302, 100.60]})
+    snapped = index.snap_frame(df)
+    assert list(snapped["road_segment_id"].iloc[:2]) == ["asok", "rama4"]
+    assert pd.isna(snapped["road_segment_id"].iloc[2])
+    assert snapped["latitude"].iloc[0] == 13.7370 and snapped["latitude"].iloc[2] == 13.80
+    assert list(snapped["capacity"]) == [1.0, 2400.0, 1.0]
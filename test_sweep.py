@@ -0,0 +1,38 @@
+"""
+ทดสอบ What-if sweep (sweep)
+"""
+
+from simple_rf import create_jam_features
+
+
+def test_sweep_grid_matches_single_predictions(model):
+    """ทุกจุดใน sweep ต้องตรงกับการทำนาย record เดียวกันทีละแถว"""
+    from sweep import run_sweep
+
+    base = {"latitude": 13.75, "longitude": 100.5, "volume": 1500, "capacity": 2000, "hour": 3}
+    result = run_sweep(base, {"hour": {"start": 0, "stop": 23}, "speed": {"start": 0, "stop": 120, "step": 5}}, model, model)
+    assert result["shape"] == [24, 25]
+    assert result["traffic_proba"].shape == (24, 25)
+    for i, j in [(0, 0), (8, 3), (23, 24)]:
+        features = create_jam_features(dict(base, hour=i, speed=5 * j))
+        assert result["traffic_proba"][i, j] == model.predict_proba(features)[0, 1]
+
+    try:
+        run_sweep(base, {"hour": list(range(24)), "speed": list(range(121))}, model, model, max_points=1000)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+    # ช่วงใหญ่มากต้องถูกปฏิเสธก่อนสร้าง array และค่าไม่จำกัดต้องเป็น ValueError
+    import tracemalloc
+    from sweep import axis_length
+    tracemalloc.start()
+    for spec in ({"start": 0, "stop": 1e9}, {"start": 0, "stop": float("inf")}, {"start": -1e308, "stop": 1e308, "step": 1e-300}):
+        try:
+            run_sweep(base, {"speed": spec, "hour": [1, 2]}, model, model)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+    assert tracemalloc.get_traced_memory()[1] < 10_000_000
+    tracemalloc.stop()
+    assert axis_length({"start": 0, "stop": 1e9}) == 10**9 + 1
@@ -0,0 +1,89 @@
+"""
+ทดสอบ Streaming upload และ NDJSON response (uploads, simple_rf)
+"""
+
+import os
+import json
+
+
+def test_upload_streams_to_disk_and_enforces_size_cap(monkeypatch, tmp_path, make_frame):
+    """ไฟล์ที่ใหญ่เกิน MAX_UPLOAD_BYTES ต้องได้ 413 ทั้งแบบมี Content-Length และแบบ chunked"""
+    from fastapi.testclient import TestClient
+    from result_store import ResultStore
+    import uploads
+    import simple_rf
+
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 2000)
+    monkeypatch.setattr(uploads, "UPLOAD_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(simple_rf, "result_store", ResultStore(root=str(tmp_path / "results")))
+    client = TestClient(simple_rf.app)
+
+    small = make_frame(5).to_csv(index=False).encode()
+    response = client.post("/upload-traffic-excel", files={"file": ("small.csv", small, "text/csv")})
+    assert response.status_code == 200 and response.json()["total_rows"] == 5
+
+    large = make_frame(200).to_csv(index=False).encode()
+    response = client.post("/upload-traffic-excel", files={"file": ("large.csv", large, "text/csv")})
+    assert response.status_code == 413
+
+    boundary = "testboundary"
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="large.csv"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + large + f"\r\n--{boundary}--\r\n".encode()
+    chunks = (body[i:i + 1024] for i in range(0, len(body), 1024))
+    response = client.post("/jobs", content=chunks, headers={"content-type": f"multipart/form-data; boundary={boundary}"})
+    assert response.status_code == 413
+    # ไฟล์ชั่วคราวของ upload ที่ถูกปฏิเสธต้องถูกลบ
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("upload_")]
+
+    # NDJSON: ไฟล์ที่อัปโหลดถูกปิดและลบ ทั้งเมื่ออ่านครบ เมื่อหยุดกลางทาง และเมื่อ client หลุดก่อนเริ่มอ่าน body
+    import asyncio
+    import time
+
+    def uploads_left():
+        # reader ถูกปิดใน I/O pool หลังส่ง response: รอจนไฟล์ถูกลบ
+        deadline = time.time() + 5
+        while [n for n in os.listdir(tmp_path) if n.startswith("upload_")] and time.time() < deadline:
+            time.sleep(0.01)
+        return [n for n in os.listdir(tmp_path) if n.startswith("upload_")]
+
+    ndjson = {"accept": "application/x-ndjson"}
+    response = client.post("/upload-traffic-excel", files={"file": ("small.csv", small, "text/csv")}, headers=ndjson)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["row"] for line in response.text.splitlines()] == list(range(1, 6))
+    assert not uploads_left()
+
+    missing = make_frame(5).drop(columns=["speed"]).to_csv(index=False).encode()
+    response = client.post("/upload-traffic-excel", files={"file": ("missing.csv", missing, "text/csv")}, headers=ndjson)
+    assert "error" in json.loads(response.text.splitlines()[0])
+    assert not uploads_left()
+
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="small.csv"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + small + f"\r\n--{boundary}--\r\n".encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/upload-traffic-excel", "raw_path": b"/upload-traffic-excel",
+        "query_string": b"", "root_path": "", "client": ("testclient", 50000), "server": ("testserver", 80),
+        "headers": [(b"content-type", f"multipart/form-data; boundary={boundary}".encode()),
+                    (b"content-length", str(len(body)).encode()), (b"accept", b"application/x-ndjson")],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def disconnected_send(message):
+        raise OSError("client disconnected")
+
+    # ไฟล์ใหญ่ที่อ่านช้า: client หลุดระหว่างที่ chunk แรกยังอ่านอยู่ใน I/O pool
+    def slow_chunks(path, fmt):
+        for chunk in iter_table_chunks(path, fmt):
+            time.sleep(0.3)
+            yield chunk
+
+    from batch_io import iter_table_chunks
+    monkeypatch.setattr(simple_rf, "iter_table_chunks", slow_chunks)
+    try:
+        asyncio.run(simple_rf.app(scope, receive, disconnected_send))
+    except Exception:
+        pass
+    assert not uploads_left()
@@ -0,0 +1,25 @@
+"""
+ทดสอบ Startup warm-up และ /ready (warmup)
+"""
+
+
+def test_readiness_warms_up_models_before_ready(monkeypatch, model):
+    """/ready ต้องตอบ 503 จนกว่าทุกโมเดลจะโหลดและ warm-up เสร็จ พร้อมผล benchmark"""
+    from fastapi.testclient import TestClient
+    from warmup import Readiness
+    import app as api
+
+    readiness = Readiness()
+    readiness.run({"jam": None, "day": model})
+    assert readiness.state == "not_loaded"
+    monkeypatch.setattr(api, "readiness", readiness)
+    client = TestClient(api.app)
+    assert client.get("/ready").status_code == 503
+
+    readiness.start(lambda: {"jam": model, "day": model})
+    assert readiness.wait(30)
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["status"] == "ready"
+    bench = response.json()["benchmark"]
+    assert bench["jam"] == bench["day"]
+    assert bench["jam"]["single_row"]["p50_ms"] > 0 and bench["jam"]["batch"]["rows_per_second"] > 0
@@ -0,0 +1,181 @@
+"""
+Streaming upload handling
+
+อ่าน body แบบ multipart/form-data จาก request.stream() ทีละ chunk ผ่าน parser แบบ streaming
+(python-multipart) แล้วเขียนเฉพาะ part ของไฟล์ลงไฟล์ชั่วคราวโดยตรง จากนั้นให้ parser
+ของตารางอ่านจาก path ของไฟล์ ไม่ต้องให้ Starlette spool ทั้งไฟล์ก่อนแล้วคัดลอกซ้ำ
+
+ขนาดสูงสุดถูกตรวจก่อนอ่าน (จาก Content-Length) และระหว่างอ่าน (จำนวน bytes ที่ได้รับจริง)
+body ที่ใหญ่เกินจึงถูกปฏิเสธทันทีโดยไม่ต้องรับทั้งไฟล์
+
+ตั้งค่าผ่าน environment variables:
+    MAX_UPLOAD_BYTES     ขนาดไฟล์สูงสุด (ค่าเริ่มต้น 200 MB)
+    UPLOAD_TMP_DIR       โฟลเดอร์สำหรับไฟล์ชั่วคราว (ค่าเริ่มต้น: temp ของระบบ)
+"""
+
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    try:
+        import multipart
+        from multipart.exceptions import FormParserError
+        from multipart.multipart import parse_options_header
+    except ImportError:
+        multipart = None
+
+from executors import run_io
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR") or None
+
+# ส่วนของ body ที่ไม่ใช่เนื้อไฟล์ (boundary, header ของแต่ละ part, field อื่น)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """ไฟล์ที่อัปโหลดใหญ่เกิน MAX_UPLOAD_BYTES"""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"ไฟล์มีขนาดเกินกำหนด ({max_bytes:,} bytes)")
+        self.max_bytes = max_bytes
+
+
+class StreamedUpload:
+    """ไฟล์ที่รับมาแล้ว: path ของไฟล์ชั่วคราว, ชื่อไฟล์และ content type จาก part ของฟอร์ม"""
+
+    def __init__(self, path, filename, content_type):
+        self.path = path
+        self.filename = filename
+        self.content_type = content_type
+
+
+class _FilePart:
+    """callback ของ MultipartParser: เก็บเนื้อของ part แรกที่เป็นไฟล์ของ field ที่ต้องการ"""
+
+    def __init__(self, field):
+        self.field = field
+        self.filename = None
+        self.content_type = None
+        self._headers = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._active = False
+        self._pending = []
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._active = False
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name == self.field and b"filename" in options and self.filename is None:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+            self._active = True
+
+    def on_part_data(self, data, start, end):
+        # part อื่น (field ธรรมดา / ไฟล์ที่สอง) ถูกข้ามโดยไม่เก็บ
+        if self._active:
+            self._pending.append(data[start:end])
+
+    def on_part_end(self):
+        self._active = False
+
+    def take(self):
+        """ข้อมูลไฟล์ที่ parse ได้ตั้งแต่ครั้งก่อน"""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def callbacks(self):
+        names = ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                 "on_headers_finished", "on_part_data", "on_part_end")
+        return {name: getattr(self, name) for name in names}
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def stream_upload(request, field="file", max_bytes=None, hasher=None):
+    """รับไฟล์จาก multipart body ของ request ลงไฟล์ชั่วคราว คืน StreamedUpload
+
+    ถ้าส่ง hasher (เช่น hashlib.sha256()) มาด้วย จะ hash เนื้อไฟล์ไปพร้อมกับการเขียน
+    UploadTooLargeError ถ้าไฟล์ใหญ่เกิน max_bytes และ ValueError ถ้า body ไม่ใช่ฟอร์มที่มีไฟล์
+    """
+    if multipart is None:
+        raise RuntimeError("ต้องติดตั้ง python-multipart เพื่อรับไฟล์ที่อัปโหลด")
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    body_limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    # ปฏิเสธทันทีถ้ารู้ขนาดล่วงหน้าแล้ว (ยังไม่ได้อ่าน body เลย)
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > body_limit:
+        raise UploadTooLargeError(max_bytes)
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise ValueError("กรุณาส่งไฟล์แบบ multipart/form-data")
+
+    part = _FilePart(field)
+    parser = multipart.MultipartParser(boundary, part.callbacks())
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=UPLOAD_TMP_DIR)
+    received = written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > body_limit:
+                    raise UploadTooLargeError(max_bytes)
+                parser.write(chunk)
+                pieces = part.take()
+                for piece in pieces:
+                    written += len(piece)
+                    if hasher is not None:
+                        hasher.update(piece)
+                if written > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                if pieces:
+                    await run_io(out.writelines, pieces)
+            parser.finalize()
+        if part.filename is None:
+            raise ValueError(f"ไม่พบไฟล์ในฟอร์ม (field: {field})")
+        # นามสกุลเดิมของไฟล์ (reader บางตัวดูจากนามสกุล)
+        final_path = path + os.path.splitext(part.filename)[1]
+        os.replace(path, final_path)
+    except FormParserError as e:
+        _remove_quietly(path)
+        raise ValueError("ข้อมูล multipart ไม่ถูกต้อง") from e
+    except BaseException:
+        _remove_quietly(path)
+        raise
+    return StreamedUpload(final_path, part.filename, part.content_type)
+
+
+@asynccontextmanager
+async def streamed_upload(request, field="file", max_bytes=None, hasher=None):
+    """async with streamed_upload(request) as upload: ... (ลบไฟล์ชั่วคราวเมื่อออกจาก block)"""
+    upload = await stream_upload(request, field=field, max_bytes=max_bytes, hasher=hasher)
+    try:
+        yield upload
+    finally:
+        _remove_quietly(upload.path)
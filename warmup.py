@@ -0,0 +1,150 @@
+"""
+Startup warm-up และ readiness
+
+request แรกหลัง deploy ต้องจ่ายค่า import / allocation แบบ lazy ของ sklearn และ numpy
+โมดูลนี้จึงส่ง batch สังเคราะห์ผ่านทุกโมเดลที่โหลดไว้ในเบื้องหลังตอนเริ่ม process
+(ผ่านเส้นทางเดียวกับ request จริง: feature_schema -> inference_policy) พร้อมวัด latency
+ของการทำนายแถวเดียวและ throughput ของ batch
+
+/health (liveness) ตอบได้ทันที ส่วน /ready (readiness) ตอบ 503 จนกว่า warm-up เสร็จ
+load balancer จึงส่ง traffic ให้ worker ที่พร้อมแล้วเท่านั้น
+
+ตั้งค่าผ่าน environment variables:
+    WARMUP_ENABLED        0 เพื่อข้าม warm-up (พร้อมทันทีที่โหลดโมเดลได้)
+    WARMUP_SINGLE_CALLS   จำนวนการทำนายแถวเดียวที่ใช้วัด latency (ค่าเริ่มต้น 200)
+    WARMUP_BATCH_ROWS     จำนวนแถวของ batch ที่ใช้วัด throughput (ค่าเริ่มต้น 10000)
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import SCHEMA
+from forest_engine import as_compiled, equivalence_samples
+from inference_policy import inference_policy
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+WARMUP_SINGLE_CALLS = int(os.environ.get("WARMUP_SINGLE_CALLS", "200"))
+WARMUP_BATCH_ROWS = int(os.environ.get("WARMUP_BATCH_ROWS", "10000"))
+
+
+def synthetic_rows(model, n_rows, seed=0):
+    """แถวสังเคราะห์ในช่วงของ threshold ของ forest (ครอบคลุมทุกกิ่ง)"""
+    try:
+        return equivalence_samples(as_compiled(model), n_random=n_rows, seed=seed)[:n_rows]
+    except (AttributeError, ValueError, TypeError):
+        # ไม่ใช่ forest: ใช้ค่าสุ่มธรรมดา
+        n_features = getattr(model, "n_features_in_", SCHEMA.n_features)
+        return np.random.default_rng(seed).normal(scale=100.0, size=(n_rows, n_features)).astype(np.float32)
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 4)
+
+
+def benchmark(model, schema=SCHEMA, single_calls=WARMUP_SINGLE_CALLS, batch_rows=WARMUP_BATCH_ROWS):
+    """warm-up และวัดเวลาของ model: แถวเดียว (dict -> features -> proba) และ batch (DataFrame -> proba)"""
+    X = synthetic_rows(model, max(batch_rows, single_calls, 1))
+    records = pd.DataFrame(X[:max(single_calls, 1)], columns=schema.names).to_dict("records")
+
+    started = time.perf_counter()
+    inference_policy.predict_proba(model, schema.extract_dict(records[0]))
+    first_call = time.perf_counter() - started
+
+    latencies = np.empty(single_calls)
+    for i in range(single_calls):
+        started = time.perf_counter()
+        inference_policy.predict_proba(model, schema.extract_dict(records[i]))
+        latencies[i] = time.perf_counter() - started
+
+    frame = pd.DataFrame(X[:batch_rows], columns=schema.names)
+    # รอบแรกเป็น warm-up ของเส้นทาง batch รอบที่สองคือค่าที่รายงาน
+    for _ in range(2):
+        started = time.perf_counter()
+        inference_policy.predict_proba(model, schema.extract(frame))
+        batch_seconds = time.perf_counter() - started
+
+    single = {"calls": single_calls}
+    if single_calls:
+        single.update(
+            p50_ms=_ms(np.percentile(latencies, 50)),
+            p99_ms=_ms(np.percentile(latencies, 99)),
+            max_ms=_ms(latencies.max()),
+        )
+    return {
+        "first_call_ms": _ms(first_call),
+        "single_row": single,
+        "batch": {
+            "rows": batch_rows,
+            "ms": _ms(batch_seconds),
+            "rows_per_second": round(batch_rows / batch_seconds) if batch_seconds > 0 else None,
+        },
+    }
+
+
+class Readiness:
+    """สถานะ readiness ของ worker: starting -> warming -> ready (หรือ not_loaded / failed)"""
+
+    def __init__(self, schema=SCHEMA, enabled=WARMUP_ENABLED):
+        self.schema = schema
+        self.enabled = enabled
+        self.state = "starting"
+        self.error = None
+        self.results = {}
+        self.seconds = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def run(self, models):
+        """warm-up ทุกโมเดลใน dict {ชื่อ: model} (โมเดลที่เป็น object เดียวกันวัดครั้งเดียว)"""
+        if any(model is None for model in models.values()):
+            self.state = "not_loaded"
+            return
+        self.state = "warming"
+        started = time.perf_counter()
+        try:
+            results, seen = {}, {}
+            for name, model in models.items():
+                if id(model) not in seen:
+                    seen[id(model)] = benchmark(model, self.schema) if self.enabled else None
+                results[name] = seen[id(model)]
+        except Exception as e:
+            self.state, self.error = "failed", str(e)
+            print(f"[WARN] Warm-up failed: {e}")
+            return
+        self.results = results
+        self.seconds = round(time.perf_counter() - started, 4)
+        self.state = "ready"
+
+    def start(self, models_fn):
+        """เริ่ม warm-up ใน thread เบื้องหลัง models_fn() คืน dict ของโมเดลปัจจุบัน"""
+        with self._lock:
+            if self.ready or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=lambda: self.run(models_fn()), name="warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        """รอให้ warm-up ที่เริ่มไว้เสร็จ (สำหรับ test / script)"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    def stats(self):
+        """ข้อมูลสำหรับ /ready และ /health"""
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "warmup_enabled": self.enabled,
+            "warmup_seconds": self.seconds,
+            "error": self.error,
+            "benchmark": self.results,
+        }